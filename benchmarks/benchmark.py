@@ -0,0 +1,250 @@
+#!/usr/bin/python
+# ===============================================================================================
+# Name: benchmark
+# Description: Micro-benchmarks for the per-tick hot paths of malmoext. Agents are served synthetic
+#              observations by a FakeAgentHost, so no Minecraft client is required. Results can be
+#              saved as a baseline, and later runs compared against it.
+#
+# Usage:       python3 benchmark.py [--filter TEXT] [--save FILE] [--compare FILE] [--threshold RATIO]
+# ===============================================================================================
+
+import sys              # <--- Delete this line if you installed malmoext using pip
+sys.path.append("..")   # <--- Delete this line if you installed malmoext using pip
+import argparse
+import itertools
+import json
+import time
+import tracemalloc
+from malmoext import *
+
+ENTITY_COUNTS = [10, 100, 1000, 5000]       # Numbers of nearby entities to benchmark entity queries with
+INVENTORY_SIZES = [0, 10, 40]               # Numbers of occupied inventory slots to benchmark inventory syncing with
+MIN_TIME = 0.5                              # Minimum time (in seconds) spent timing each benchmark
+MIN_CALLS = 20                              # Minimum number of timed calls for each benchmark
+MAX_CALLS = 20000                           # Maximum number of timed calls for each benchmark
+ALLOCATION_CALLS = 10                       # Number of calls traced when measuring memory allocations
+
+
+
+# SETUP ============================================================================================================
+
+def createAgent(agentID, numberOfEntities=0, numberOfInventorySlots=0, entityTypes=None):
+    '''
+    Create an agent whose host serves the same synthetic observation on every tick.
+    '''
+    generator = ObservationGenerator(agentID, numberOfEntities=numberOfEntities, numberOfInventorySlots=numberOfInventorySlots, entityTypes=entityTypes)
+    text = json.dumps(generator.observation())
+    Agent.setHostFactory(lambda x: FakeAgentHost(itertools.repeat(text)))
+    agent = Agent(agentID, AgentType.Hardcoded)
+    Agent.setHostFactory(None)
+    return agent
+
+def resetAgents():
+    '''
+    Remove all agents created by a previous benchmark.
+    '''
+    Agent.allAgents.clear()
+
+def nextTick():
+    '''
+    Begin a new tick for all agents, so that each benchmarked call decodes a fresh observation.
+    '''
+    for agent in list(Agent.allAgents.values()):
+        agent.nextTick()
+
+
+
+# MEASUREMENT ======================================================================================================
+
+def measure(name, call, setup=nextTick):
+    '''
+    Time repeated calls of a function, calling a setup function before each call. Returns a dictionary of results,
+    or None if the benchmark was filtered out.
+    '''
+    if args.filter not in name:
+        return None
+
+    setup()
+    call()  # Warm up
+
+    # Time each call individually
+    timings = []
+    start = time.perf_counter()
+    while len(timings) < MAX_CALLS and (len(timings) < MIN_CALLS or time.perf_counter() - start < MIN_TIME):
+        setup()
+        callStart = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - callStart)
+
+    # Trace the memory allocated by a few calls. The peak is the most memory in use at once during a call, while the
+    # blocks and bytes are those allocated by a call and not yet freed once it returns, from a snapshot diff.
+    peaks = []
+    blocks = 0
+    size = 0
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    tracemalloc.start()
+    for i in range(0, ALLOCATION_CALLS):
+        setup()
+        before = tracemalloc.take_snapshot().filter_traces(filters)
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        call()
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        after = tracemalloc.take_snapshot().filter_traces(filters)
+        for stat in after.compare_to(before, "lineno"):
+            blocks += stat.count_diff
+            size += stat.size_diff
+    tracemalloc.stop()
+
+    timings.sort()
+    mean = sum(timings) / len(timings)
+    return {
+        "name": name,
+        "calls": len(timings),
+        "opsPerSec": 1.0 / mean if mean > 0 else float("inf"),
+        "p50": timings[int(0.50 * (len(timings) - 1))],
+        "p99": timings[int(0.99 * (len(timings) - 1))],
+        "peakKiB": sum(peaks) / len(peaks) / 1024.0,
+        "blocksPerCall": blocks / ALLOCATION_CALLS,
+        "bytesPerCall": size / ALLOCATION_CALLS
+    }
+
+
+
+# BENCHMARKS =======================================================================================================
+
+def benchmarkClosest():
+    '''
+    Benchmark closestMob and closestItem for every variant, and closestByVariant for all variants at once.
+    '''
+    results = []
+    for count in ENTITY_COUNTS:
+        resetAgents()
+        agent = createAgent("Agent", count)
+        for variant in [Mobs.All, Mobs.Peaceful, Mobs.Hostile, Mobs.Food]:
+            results.append(measure("closestMob[{}]/{}".format(variant.__name__, count), lambda: agent.closestMob(variant)))
+        for variant in [Items.All, Items.Food]:
+            results.append(measure("closestItem[{}]/{}".format(variant.__name__, count), lambda: agent.closestItem(variant)))
+        results.append(measure("closestByVariant/{}".format(count), agent.closestByVariant))
+        agent.getAndClearLogReports()
+    return results
+
+def benchmarkLookAtMoveTo():
+    '''
+    Benchmark lookAt and moveTo against the closest mob.
+    '''
+    results = []
+    for count in ENTITY_COUNTS:
+        resetAgents()
+        agent = createAgent("Agent", count, 0, [x.value for x in Mobs.All])
+        target = agent.closestMob()
+        host = agent.getMalmoAgent()
+        results.append(measure("lookAt/{}".format(count), lambda: agent.lookAt(target)))
+        results.append(measure("moveTo/{}".format(count), lambda: agent.moveTo(target)))
+        host.commands.clear()
+        agent.getAndClearLogReports()
+    return results
+
+def benchmarkInventory():
+    '''
+    Benchmark Inventory.sync for various inventory sizes.
+    '''
+    results = []
+    for size in INVENTORY_SIZES:
+        resetAgents()
+        agent = createAgent("Agent", 0, size)
+        results.append(measure("Inventory.sync/{}".format(size), agent.inventory.sync))
+    return results
+
+def benchmarkLogger():
+    '''
+    Benchmark Logger.update, with each agent reporting its closest mobs and items every tick.
+    '''
+    results = []
+    for count in ENTITY_COUNTS:
+        resetAgents()
+        agent = createAgent("Agent", count, 10)
+        logger = Logger()
+        logger.start()
+
+        def setup():
+            nextTick()
+            agent.closestMob()
+            agent.closestMob(Mobs.Hostile)
+            agent.closestItem()
+        results.append(measure("Logger.update/{}".format(count), logger.update, setup))
+    return results
+
+def benchmarkStatistics():
+    '''
+    Benchmark Statistics.update, sampling on every call.
+    '''
+    results = []
+    for size in INVENTORY_SIZES:
+        resetAgents()
+        createAgent("Agent", 10, size)
+        stats = Statistics()
+        stats.setUpdateInterval(0)
+        stats.start()
+        results.append(measure("Statistics.update/{}".format(size), stats.update))
+    return results
+
+BENCHMARKS = [benchmarkClosest, benchmarkLookAtMoveTo, benchmarkInventory, benchmarkLogger, benchmarkStatistics]
+
+
+
+# REPORTING ========================================================================================================
+
+def printResults(results, baseline):
+    '''
+    Print a table of benchmark results, including the change in median latency relative to a baseline if given.
+    '''
+    print("{:<34} {:>8} {:>12} {:>11} {:>11} {:>11} {:>12} {:>9}".format("benchmark", "calls", "ops/sec", "p50 (us)", "p99 (us)", "peak (KiB)", "blocks/call", "vs base"))
+    for result in results:
+        change = ""
+        if result["name"] in baseline:
+            change = "{:+.1%}".format(result["p50"] / baseline[result["name"]]["p50"] - 1.0)
+        print("{:<34} {:>8} {:>12.1f} {:>11.1f} {:>11.1f} {:>11.1f} {:>12.1f} {:>9}".format(
+            result["name"], result["calls"], result["opsPerSec"], result["p50"] * 1e6, result["p99"] * 1e6, result["peakKiB"],
+            result["blocksPerCall"], change))
+
+def findRegressions(results, baseline, threshold):
+    '''
+    Returns the names of all benchmarks whose median latency exceeds that of the baseline by more than the threshold.
+    '''
+    regressions = []
+    for result in results:
+        if result["name"] in baseline and result["p50"] > baseline[result["name"]]["p50"] * (1.0 + threshold):
+            regressions.append(result["name"])
+    return regressions
+
+
+
+# MAIN =============================================================================================================
+
+parser = argparse.ArgumentParser(description="Run micro-benchmarks for the per-tick hot paths of malmoext.")
+parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this text")
+parser.add_argument("--save", help="Save the results as a baseline to this JSON file")
+parser.add_argument("--compare", help="Compare the results against a baseline saved to this JSON file")
+parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown of median latency relative to the baseline (default 0.25)")
+args = parser.parse_args()
+
+results = []
+for benchmark in BENCHMARKS:
+    results += [x for x in benchmark() if x != None]
+
+baseline = {}
+if args.compare:
+    with open(args.compare, "r") as f:
+        baseline = {x["name"]: x for x in json.load(f)}
+printResults(results, baseline)
+
+if args.save:
+    with open(args.save, "w+") as f:
+        json.dump(results, f, indent=4)
+    print("Benchmark baseline has been saved to: " + args.save)
+
+regressions = findRegressions(results, baseline, args.threshold)
+if len(regressions) > 0:
+    print("Benchmarks slower than baseline by more than {:.0%}: {}".format(args.threshold, ", ".join(regressions)))
+    sys.exit(1)
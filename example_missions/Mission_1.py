@@ -52,45 +52,41 @@ builder.environment.addMob(Mobs.Hostile.Zombie, Vector(5, 4, -11))
 logger = Logger()
 logger.setLoggingLevel(player_agent, Logger.Flags.ClosestMob_Hostile)
 stats = Statistics()
+stats.setUpdateInterval(20)     # sample statistical data once per second
 
 # Start mission
 malmoutils.loadMission(builder)
 malmoutils.startMission()
 
-# Start loggers
-logger.start()
-stats.start()
-
 
 # DEFINE AGENT ACTIONS ===========================================================================================
 
-while malmoutils.isMissionActive():
-    logger.update()         # update the log
-    stats.update()          # update statistical data
-
-
+def defend():
     defender_agent.equip(Items.All.diamond_sword)   # ensure sword is equipped
 
     zombie = player_agent.closestMob(Mobs.Hostile)    # target closest zombie to the player
     if zombie != None:
         if not defender_agent.lookAt(zombie):
-            continue
+            return
         if not defender_agent.moveTo(zombie):
-            continue
+            return
         defender_agent.attackMob(zombie)
-        continue
+        return
 
     if not defender_agent.lookAt(player_agent):     # no zombies.. move to player
-        continue
+        return
     if not defender_agent.moveTo(player_agent):
-        continue
+        return
 
     defender_agent.stopMoving()     # Nothing to do...
 
 
-# Stop the loggers
-logger.stop()
-stats.stop()
+# Run the mission loop at 20 ticks per second, updating the loggers before the agent acts on each tick
+loop = MissionLoop(20)
+loop.addPlugin(logger)
+loop.addPlugin(stats)
+loop.addPlugin(defend)
+loop.run()
 
 
 # FINISH ==========================================================================================================
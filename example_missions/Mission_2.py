@@ -43,55 +43,51 @@ logger.setLoggingLevel(farmer_agent,
     Logger.Flags.ClosestItem_Food)
 stats = Statistics()
 stats.setItemTracking(Items.Food.beef)
+stats.setUpdateInterval(20)     # sample statistical data once per second
 
 # Start mission
 malmoutils.loadMission(builder)
 malmoutils.startMission()
 
-# Start loggers
-logger.start()
-stats.start()
-
-
 
 # DEFINE AGENT ACTIONS ===========================================================================================
 
-while malmoutils.isMissionActive():
-    logger.update()         # update the log
-    stats.update()          # update statistical data
-
+def farm():
     if farmer_agent.inventory.amountOfItem(Items.Food.beef) > 0:  # Give any held beef to the player
         if not farmer_agent.lookAt(player_agent):
-            continue
+            return
         if not farmer_agent.moveTo(player_agent):
-            continue
+            return
         farmer_agent.equip(Items.Food.beef)
         farmer_agent.giveItem(Items.Food.beef, player_agent)
-        continue
+        return
 
     closestFood = farmer_agent.closestItem(Items.Food)  # Collect any beef laying on the ground nearby
     if closestFood != None:
         if not farmer_agent.pickUpItem(closestFood):
-            continue
-        continue
+            return
+        return
 
     farmer_agent.equip(Items.All.diamond_sword)     # Harvest any nearby cows
     closestCow = farmer_agent.closestMob(Mobs.Food)
     if closestCow != None:
         if not farmer_agent.lookAt(closestCow):
-            continue
+            return
         if not farmer_agent.moveTo(closestCow):
-            continue
+            return
         if not farmer_agent.attackMob(closestCow):
-            continue
-        continue
+            return
+        return
 
     farmer_agent.stopMoving()   # Nothing to do...
 
-# Stop the loggers
-logger.stop()
-stats.stop()
 
+# Run the mission loop at 20 ticks per second, updating the loggers before the agent acts on each tick
+loop = MissionLoop(20)
+loop.addPlugin(logger)
+loop.addPlugin(stats)
+loop.addPlugin(farm)
+loop.run()
 
 
 # FINISH ==========================================================================================================
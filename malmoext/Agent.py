@@ -1,12 +1,17 @@
 import malmoext.MalmoPython as MalmoPython
-import json
 import math
 import time
+import threading
 import copy
+import numpy
 from enum import Enum
 from collections import namedtuple
-from malmoext.Utils import MathUtils, Mobs, Items, LogUtils, Vector, Entity, numerifyId, STRIKING_DISTANCE, GIVING_DISTANCE, PICK_UP_ITEM_LOCKDOWN_DISTANCE
+from malmoext.Utils import MathUtils, Mobs, Items, TypeTable, EntityIds, LogUtils, Vector, Entity, ActionStatus, STRIKING_DISTANCE, GIVING_DISTANCE, PICK_UP_ITEM_LOCKDOWN_DISTANCE
 from malmoext.Inventory import Inventory
+from malmoext.Observation import Observation
+from malmoext.EntityTable import EntityTable
+from malmoext.BlockGrid import BlockGrid
+from malmoext.CommandBuffer import CommandBuffer
 
 class Agent:
     '''
@@ -15,22 +20,57 @@ class Agent:
     agent automatically triggers logging by any loggers that get updated.
     '''
     allAgents = {}  # A map containing all agents that were created, accessible by ID
+    MobVariants = [Mobs.All, Mobs.Peaceful, Mobs.Hostile, Mobs.Food]    # Enumerated types accepted when finding the closest mob
+    ItemVariants = [Items.All, Items.Food]                              # Enumerated types accepted when finding the closest item
     ActionOverride = namedtuple("ActionOverride", "function args")  # Representation of an action w/ args and cached data that should internally override any other action called
+    SnapshotStats = namedtuple("SnapshotStats", "decodes decodesAvoided bytesDecoded bytesSkipped")  # Counters describing how often and how much of the observation snapshot was decoded
+    __hostFactory = None    # Function accepting an agent ID and returning the AgentHost for that agent. If None, Malmo AgentHosts are created
+    snapshotMaxAge = 0.05   # Age (in seconds) after which an observation snapshot is automatically refreshed. Set to None to only refresh once per tick
+    attackTimeout = 0.7     # Time (in seconds) to wait for an attack to kill its target before the attack fails
+    craftTimeout = 0.5      # Time (in seconds) to wait for a crafted item to appear in the inventory before crafting fails
+    giveItemTimeout = 2.8   # Time (in seconds) to wait for a given item to appear in the receiving agent's inventory before giving fails
+    pickUpItemTimeout = 3.0 # Time (in seconds) to wait for an item to be picked up, once close to it, before picking it up fails
 
     def __init__(self, agentID, agentType):
         if agentID in Agent.allAgents:
             raise Exception("Two agents can not have the same ID")
 
-        self.__host = MalmoPython.AgentHost()   # Reference to wrapped Malmo AgentHost
-        self.__json = None                      # Cache of the last obtained JSON representation of this Agent from Malmo
+        self.__host = Agent.__hostFactory(agentID) if Agent.__hostFactory != None else MalmoPython.AgentHost()   # Reference to wrapped Malmo AgentHost
+        self.__commands = CommandBuffer(self.__host)   # Buffer for commands sent to the AgentHost, flushed once per tick once ticked
+        self.__json = None                      # Snapshot of the last decoded JSON representation of this Agent from Malmo
+        self.__isSnapshotStale = True           # Whether the snapshot must be refreshed before it is next used
+        self.__snapshotTime = 0.0               # Time at which the snapshot was last refreshed
+        self.__decodes = 0                      # Number of observations decoded into a snapshot
+        self.__decodesAvoided = 0               # Number of requests for the JSON representation served without decoding
+        self.__entityTable = None               # Table of the nearby entities in the snapshot, created once it is first needed
+        self.__blockGrid = None                 # Block grid in the snapshot, decoded once it is first needed
+        self.__turnRateCache = {}               # A map of (x,y,z) positions to the turning rates needed to face each, for the snapshot
+        self.__snapshotLock = threading.RLock() # Guards the snapshot when agents are stepped concurrently
         self.__actionOverride = None            # Possible action override of whatever action was called
+        self.__planner = None                   # Optional PathPlanner used by moveTo to walk around obstacles
         self.__logReports = []                  # A list of log reports to be read by the Logger next iteration
         self.id = agentID                       # The ID of this agent
         self.type = agentType                   # The AgentType of this agent
         self.inventory = Inventory(self)        # Reference to this agent's inventory
 
-        # Add this agent to the global registry
+        # Add this agent to the global registry, and make sure no entity is given the same name
         Agent.allAgents[self.id] = self
+        EntityIds.reserve(self.id)
+
+    @staticmethod
+    def setHostFactory(factory):
+        '''
+        Set the function used to create the AgentHost wrapped by each agent created from now on. The function is given
+        the ID of the agent being created. Passing None restores the default, which creates a Malmo AgentHost.
+        '''
+        Agent.__hostFactory = factory
+
+    def setPlanner(self, planner):
+        '''
+        Set a PathPlanner used by moveTo to walk around any obstacles between this agent and its target. Passing None
+        restores walking in a straight line.
+        '''
+        self.__planner = planner
 
     def isMissionActive(self):
         '''
@@ -46,12 +86,70 @@ class Agent:
 
     def toJSON(self):
         '''
-        Returns the JSON representation of this agent output by Malmo.
+        Returns the JSON representation of this agent output by Malmo. The latest observation is decoded at most once
+        per mission loop iteration, and the resulting snapshot is shared by every caller until it is refreshed.
+        '''
+        with self.__snapshotLock:
+            if self.__json == None or self.__isSnapshotStale:
+                return self.refresh()
+            if Agent.snapshotMaxAge != None and time.time() - self.__snapshotTime > Agent.snapshotMaxAge:
+                return self.refresh()
+            self.__decodesAvoided += 1
+            return self.__json
+
+    def refresh(self):
+        '''
+        Immediately replace the observation snapshot of this agent with the latest observation output by Malmo, and
+        return it. If no new observation has arrived, the previous snapshot is kept.
+        '''
+        with self.__snapshotLock:
+            worldState = self.__host.getWorldState()
+            if len(worldState.observations) > 0:
+                self.__json = Observation(worldState.observations[-1].text)
+                self.__entityTable = None
+                self.__blockGrid = None
+                self.__turnRateCache = {}
+                self.__decodes += 1
+            self.__isSnapshotStale = False
+            self.__snapshotTime = time.time()
+            return self.__json
+
+    def nextTick(self):
+        '''
+        Mark the start of a new mission loop iteration. Any commands buffered during the previous iteration are sent,
+        and the observation snapshot of this agent will be refreshed the next time it is used.
+
+        Until this is first called, commands are sent as soon as they are given. From then on, steering commands (such
+        as move and turn) are only sent here, once per iteration, taking on the last value given during the iteration.
+        Scripts that drive agents without a mission loop (see MissionLoop and malmoutils.isMissionActive) must therefore
+        either never call this, or call it once per iteration.
+        '''
+        self.__commands.setBuffering(True)
+        self.flushCommands()
+        self.__isSnapshotStale = True
+
+    def flushCommands(self):
+        '''
+        Immediately send any commands buffered for this agent to Malmo. Redundant commands are never sent.
+        '''
+        self.__commands.flush()
+
+    def commandStats(self):
+        '''
+        Returns a tuple containing the number of commands sent to Malmo by this agent, and the number of redundant
+        commands that were suppressed.
+        '''
+        return self.__commands.stats()
+
+    def snapshotStats(self):
+        '''
+        Returns an Agent.SnapshotStats tuple containing the number of observations decoded by this agent, the
+        number of requests for its JSON representation that were served from the snapshot instead, and the number
+        of bytes of the current snapshot that have been decoded versus skipped so far this tick.
         '''
-        malmoJSON = self.__host.getWorldState()
-        if len(malmoJSON.observations) > 0:
-            self.__json = json.loads(malmoJSON.observations[-1].text)
-        return self.__json
+        bytesDecoded = self.__json.bytesDecoded if self.__json != None else 0
+        bytesSkipped = self.__json.bytesSkipped if self.__json != None else 0
+        return Agent.SnapshotStats(self.__decodes, self.__decodesAvoided, bytesDecoded, bytesSkipped)
 
     def getAndClearLogReports(self):
         '''
@@ -75,6 +173,22 @@ class Agent:
         agentJSON = self.toJSON()
         return Vector(agentJSON["XPos"], agentJSON["YPos"] + 1, agentJSON["ZPos"])
 
+    def __cell(self):
+        '''
+        Returns the (x,y,z) cell containing this agent's feet.
+        '''
+        agentJSON = self.toJSON()
+        return (math.floor(agentJSON["XPos"]), math.floor(agentJSON["YPos"]), math.floor(agentJSON["ZPos"]))
+
+    @staticmethod
+    def __entityCell(entity):
+        '''
+        Returns the (x,y,z) cell containing the feet of an entity. The positions of agents represented as entities are
+        at eye level, one block above their feet.
+        '''
+        feetY = entity.position.y - 1 if entity.type == "agent" else entity.position.y
+        return (math.floor(entity.position.x), math.floor(feetY), math.floor(entity.position.z))
+
     def __mobsKilled(self):
         '''
         Returns the number of mobs this agent has killed.
@@ -85,50 +199,62 @@ class Agent:
         '''
         Start walking forwards or backwards. Accepts speed of [-1, 1].
         '''
-        self.__host.sendCommand("move {}".format(speed))
+        self.__commands.send("move {}".format(speed))
 
     def __stopWalking(self):
         '''
         Stop walking.
         '''
-        self.__host.sendCommand("move 0")
+        self.__commands.send("move 0")
 
     def __startChangingPitch(self, speed):
         '''
         Start moving the agent's POV up or down. Accepts speeds of [-1, 1].
         '''
-        self.__host.sendCommand("pitch {}".format(speed))
+        self.__commands.send("pitch {}".format(speed))
 
     def __startChangingYaw(self, speed):
         '''
         Start moving the agent's POV left or right. Accepts speeds of [-1, 1].
         '''
-        self.__host.sendCommand("turn {}".format(speed))
+        self.__commands.send("turn {}".format(speed))
 
     def __stopTurning(self):
         '''
         Stop moving the agent's POV in all directions.
         '''
-        self.__host.sendCommand("pitch 0")
-        self.__host.sendCommand("turn 0")
+        self.__commands.send("pitch 0")
+        self.__commands.send("turn 0")
 
     def __startAttacking(self):
         '''
         Causes the agent to begin attacking continuously.
         '''
-        self.__host.sendCommand("attack 1")
+        self.__commands.send("attack 1")
 
     def __stopAttacking(self):
         '''
         Causes the agent to stop attacking.
         '''
-        self.__host.sendCommand("attack 0")
+        self.__commands.send("attack 0")
+
+    def __startJumping(self):
+        '''
+        Causes the agent to begin jumping continuously.
+        '''
+        self.__commands.send("jump 1")
+
+    def __stopJumping(self):
+        '''
+        Causes the agent to stop jumping.
+        '''
+        self.__commands.send("jump 0")
 
     def __throwItem(self):
         '''
         Causes the agent to throw the currently held item.
         '''
-        self.__host.sendCommand("discardCurrentItem")
+        self.__commands.send("discardCurrentItem")
 
     def __checkPreconditions(self, *preconditionResults):
         '''
@@ -164,12 +290,63 @@ class Agent:
         self.__stopWalking()
         self.__stopAttacking()
 
+    def __getEntityTable(self):
+        '''
+        Returns the EntityTable for the nearby entities in the current observation snapshot of this agent.
+        '''
+        with self.__snapshotLock:
+            agentJSON = self.toJSON()
+            if self.__entityTable == None:
+                self.__entityTable = EntityTable(agentJSON["nearby_entities"])
+            return self.__entityTable
+
+    def blockGrid(self):
+        '''
+        Returns the blocks surrounding this agent as a uint16 NumPy array of block IDs shaped (Y, Z, X), with the agent's
+        feet at the center cell. See BlockGrid for the meaning of each ID, and for navigation queries over the grid.
+        The array is shared by every caller until the snapshot is refreshed, and should not be modified.
+        '''
+        with self.__snapshotLock:
+            agentJSON = self.toJSON()
+            if self.__blockGrid is None:
+                self.__blockGrid = BlockGrid.decode(agentJSON["blockgrid"])
+            return self.__blockGrid
+
     def nearbyEntities(self):
         '''
         Returns a list of all nearby entities to this agent.
         '''
-        agentJSON = self.toJSON()
-        return [Entity("{}{}".format(k["name"], numerifyId(k["id"]).replace("-", "")), k["name"], Vector(k["x"], k["y"], k["z"]), k.get("quantity")) for k in agentJSON["nearby_entities"]]
+        return self.__getEntityTable().entities()
+
+    def entitiesWithin(self, radius, variant=None):
+        '''
+        Returns a list of all nearby entities within the given distance of this agent, sorted from closest to farthest.
+        Optionally specify an enumerated type of mob or item to filter entities by.
+        '''
+        return self.__getEntityTable().within(self.__position(), radius, variant)
+
+    def entitiesWithinXZ(self, radius, variant=None):
+        '''
+        Returns a list of all nearby entities within the given distance of this agent, taking only the x-axis and z-axis
+        into account, sorted from closest to farthest. Optionally specify an enumerated type of mob or item to filter
+        entities by.
+        '''
+        return self.__getEntityTable().within(self.__position(), radius, variant, True)
+
+    def kNearest(self, k, variant=None):
+        '''
+        Returns a list of the (up to) k nearby entities closest to this agent, sorted from closest to farthest.
+        Optionally specify an enumerated type of mob or item to filter entities by.
+        '''
+        return self.__getEntityTable().nearest(self.__position(), k, variant)
+
+    def kNearestXZ(self, k, variant=None):
+        '''
+        Returns a list of the (up to) k nearby entities closest to this agent, taking only the x-axis and z-axis into
+        account, sorted from closest to farthest. Optionally specify an enumerated type of mob or item to filter
+        entities by.
+        '''
+        return self.__getEntityTable().nearest(self.__position(), k, variant, True)
 
     def closestMob(self, variant=Mobs.All):
         '''
@@ -181,28 +358,42 @@ class Agent:
             self.__actionOverride.function(*self.__actionOverride.args)
             return None
 
-        aPos = self.__position()
-        nearbyEntities = self.nearbyEntities()
-        if variant == Mobs.All:
-            comparator = Mobs.All.isMember
-        elif variant == Mobs.Peaceful:
-            comparator = Mobs.Peaceful.isMember
-        elif variant == Mobs.Hostile:
-            comparator = Mobs.Hostile.isMember
-        elif variant == Mobs.Food:
-            comparator = Mobs.Food.isMember
-        else:
+        if variant not in Agent.MobVariants:
             raise Exception("Closest mob variant must be an enumerated type")
+        closestMob = self.__getEntityTable().closest(self.__position(), variant)
+        self.__logReports.append(LogUtils.ClosestMobReport(variant, closestMob))
+        return closestMob
 
-        closestDistance = 1000000.0
-        closestMob = None
-        for entity in nearbyEntities:
-            if comparator(entity.type):
-                ePos = entity.position
-                distance = MathUtils.distanceBetweenPoints(aPos, ePos)
-                if distance < closestDistance:
-                    closestDistance = distance
-                    closestMob = entity
+    def rankByPathDistance(self, entities):
+        '''
+        Returns a list of the given entities that this agent can walk to, sorted by the number of steps needed to walk to
+        each of them rather than by straight-line distance. Requires a planner to be set (see setPlanner()).
+        '''
+        if self.__planner == None:
+            raise Exception("A planner must be set to rank entities by path distance")
+        ranking = self.__planner.rankByPathDistance(self.__cell(), [Agent.__entityCell(entity) for entity in entities])
+        return [entities[i] for i, _ in ranking]
+
+    def closestMobByPath(self, variant=Mobs.All):
+        '''
+        Get the mob that this agent can walk to in the fewest steps, taking obstacles into account. Optionally specify
+        additional modifiers for filtering mobs by an enumerated type. Returns None if no mob nearby to this agent can be
+        reached. If no planner is set, this is the same as closestMob().
+        '''
+        if self.__planner == None:
+            return self.closestMob(variant)
+
+        # Check for override
+        if self.__shouldPerformActionOverride(self.closestMobByPath):
+            self.__actionOverride.function(*self.__actionOverride.args)
+            return None
+
+        if variant not in Agent.MobVariants:
+            raise Exception("Closest mob variant must be an enumerated type")
+        entityTable = self.__getEntityTable()
+        mobs = entityTable.nearest(self.__position(), len(entityTable), variant)
+        ranking = self.rankByPathDistance(mobs)
+        closestMob = ranking[0] if len(ranking) > 0 else None
         self.__logReports.append(LogUtils.ClosestMobReport(variant, closestMob))
         return closestMob
 
@@ -216,122 +407,73 @@ class Agent:
             self.__actionOverride.function(*self.__actionOverride.args)
             return None
 
-        aPos = self.__position()
-        nearbyEntities = self.nearbyEntities()
-        if variant == Items.All:
-            comparator = Items.All.isMember
-        elif variant == Items.Food:
-            comparator = Items.Food.isMember
-        else:
+        if variant not in Agent.ItemVariants:
             raise Exception("Closest item variant must be an enumerated type")
-
-        closestDistance = 1000000.0
-        closestItem = None
-        for entity in nearbyEntities:
-            if comparator(entity.type):
-                ePos = entity.position
-                distance = MathUtils.distanceBetweenPoints(aPos, ePos)
-                if distance < closestDistance:
-                    closestDistance = distance
-                    closestItem = entity
+        closestItem = self.__getEntityTable().closest(self.__position(), variant)
         self.__logReports.append(LogUtils.ClosestItemReport(variant, closestItem))
         return closestItem
 
-    def __calculateTargetPitchRate(self, targetPos):
+    def closestByVariant(self, *variants):
         '''
-        Calculate the rate at which to move the agent's POV up/down in order to face an (x,y,z) position.
+        Get the closest mob or item to this agent for each of the given enumerated types, scanning all nearby entities
+        only once. If no types are given, all mob and item types are used. Returns a map of each type to the closest
+        entity of that type, or None if no such entity was found nearby to this agent.
         '''
-        aJSON = self.toJSON()
-        aPos = self.__position()
-        currAngle = aJSON["Pitch"]
-        vec = MathUtils.vectorFromPoints(aPos, targetPos)
-        vec = MathUtils.normalizeVector(vec)
-        trimmedVec = Vector(vec.x, 0, vec.z)
-
-        # Convert target position to a target angle (-90 to 90 degrees)
-        if MathUtils.isZeroVector(trimmedVec):
-            return 0.0
-        cos = MathUtils.dotProduct(vec, trimmedVec) / (MathUtils.vectorMagnitude(vec) * MathUtils.vectorMagnitude(trimmedVec))
-        if cos > 1:
-            cos = 1
-        elif cos < -1:
-            cos = -1
-        targetAngle = math.acos(cos)
-        if vec.y > 0:
-            targetAngle = -targetAngle
-        targetAngle = math.degrees(targetAngle)
-
-        # Get difference between current and target angle
-        if currAngle <= targetAngle:
-            angleDiff = targetAngle - currAngle
-        else:
-            angleDiff = currAngle - targetAngle
+        variants = variants if len(variants) > 0 else Agent.MobVariants + Agent.ItemVariants
+        for variant in variants:
+            if variant not in Agent.MobVariants and variant not in Agent.ItemVariants:
+                raise Exception("Closest entity variant must be an enumerated type")
 
-        # Get the turning direction
-        if currAngle > targetAngle:
-            turnDirection = -1
-        else:
-            turnDirection = 1
+        # Check for override
+        if self.__shouldPerformActionOverride(self.closestByVariant):
+            self.__actionOverride.function(*self.__actionOverride.args)
+            return {variant: None for variant in variants}
 
-        # Calculate the turning rate
-        rate = MathUtils.affineTransformation(angleDiff, 0.0, 180.0, 0, 1.0) * 4 * turnDirection
-        rate = min(rate, 1) if rate >= 0 else max(rate, -1)
-        return rate
+        result = self.__getEntityTable().closestByVariant(self.__position(), variants)
+        for variant in variants:
+            if variant in Agent.MobVariants:
+                self.__logReports.append(LogUtils.ClosestMobReport(variant, result[variant]))
+            else:
+                self.__logReports.append(LogUtils.ClosestItemReport(variant, result[variant]))
+        return result
 
-    def __calculateTargetYawRate(self, targetPos):
+    def __calculateTargetRates(self, targetPos):
         '''
-        Calculate the rate at which to move the agent's POV left/right in order to face an (x,y,z) position.
+        Calculate the rates at which to move the agent's POV up/down and left/right in order to face an (x,y,z) position.
+        Returns a (pitch rate, yaw rate) tuple. The rates are calculated at most once per observation snapshot for each
+        position.
         '''
-        aJSON = self.toJSON()
-        aPos = self.__position()
-        currAngle = aJSON["Yaw"] if aJSON["Yaw"] >= 0 else 360.0 - abs(aJSON["Yaw"])
-        vec = MathUtils.vectorFromPoints(aPos, targetPos)
-        vec = MathUtils.normalizeVector(vec)
-
-        # Convert target position to a target angle (360 degrees)
-        if MathUtils.valuesAreEqual(vec.x, 0):
-            if vec.z >= 0:
-                targetAngle = -MathUtils.PI_OVER_TWO
-            else:
-                targetAngle = MathUtils.PI_OVER_TWO
-        else:
-            targetAngle = math.atan(vec.z / vec.x)
-
-        # Modify target angle based on which quadrant the vector lies in
-        if vec.x <= 0:   # quadrant 1 or 2
-            targetAngle = MathUtils.PI_OVER_TWO + targetAngle
-        else:
-            targetAngle = MathUtils.THREE_PI_OVER_TWO + targetAngle
-        targetAngle = math.degrees(targetAngle)
-        if MathUtils.valuesAreEqual(targetAngle, 360.0):
-            targetAngle = 0
-
-        # Get difference between current and target angle
-        if currAngle <= targetAngle:
-            angleDiff = min(targetAngle - currAngle, 360 - targetAngle + currAngle)
-        else:
-            angleDiff = min(currAngle - targetAngle, 360 - currAngle + targetAngle)
+        with self.__snapshotLock:
+            aJSON = self.toJSON()
+            key = (targetPos.x, targetPos.y, targetPos.z)
+            rates = self.__turnRateCache.get(key)
+            if rates == None:
+                yawError, pitchError = MathUtils.headingError(self.__position(), aJSON["Yaw"], aJSON["Pitch"], key)
+                rates = (MathUtils.turnRate(pitchError), MathUtils.turnRate(yawError))
+                self.__turnRateCache[key] = rates
+            return rates
 
-        # Get the turning direction
-        if currAngle > targetAngle and currAngle - targetAngle < 180:
-            turnDirection = -1
-        elif targetAngle > currAngle and targetAngle - currAngle > 180:
-            turnDirection = -1
-        else:
-            turnDirection = 1
-
-        # Calculate the turning rate
-        rate = MathUtils.affineTransformation(angleDiff, 0.0, 180.0, 0, 1.0) * 4 * turnDirection
-        rate = min(rate, 1) if rate >= 0 else max(rate, -1)
-        return rate
+    def facingScores(self, entities):
+        '''
+        Returns a list of scores (from 0 to 1) describing how well this agent currently faces each of the given entities
+        or agents, where 1 means looking directly at it and 0 means facing directly away from it. Useful for preferring
+        targets that can be looked at without turning.
+        '''
+        if len(entities) == 0:
+            return []
+        positions = [entity.__position() if isinstance(entity, Agent) else entity.position for entity in entities]
+        aJSON = self.toJSON()
+        yawErrors, pitchErrors = MathUtils.headingErrors(self.__position(), aJSON["Yaw"], aJSON["Pitch"], positions)
+        scores = 1.0 - numpy.maximum(numpy.abs(yawErrors), numpy.abs(pitchErrors)) / 180.0
+        return scores.tolist()
 
     def __isLookingAt(self, targetPos, pitchRate=None, yawRate=None):
         '''
         Returns true if the agent is currently looking at the given (x,y,z) position.
         Optionally provide the pitch and yaw turning rates if they were already previously calculated.
         '''
-        pitchRate = pitchRate if pitchRate != None else self.__calculateTargetPitchRate(targetPos)
-        yawRate = yawRate if yawRate != None else self.__calculateTargetYawRate(targetPos)
+        if pitchRate == None or yawRate == None:
+            pitchRate, yawRate = self.__calculateTargetRates(targetPos)
 
         # Tolerance depends on how close we are to the target
         aPos = self.__position()
@@ -369,8 +511,7 @@ class Agent:
         # Preconditions - None
 
         # Action
-        pitchRate = self.__calculateTargetPitchRate(entity.position)
-        yawRate = self.__calculateTargetYawRate(entity.position)
+        pitchRate, yawRate = self.__calculateTargetRates(entity.position)
         if self.__isLookingAt(entity.position, pitchRate, yawRate):
             self.__stopTurning()
             if not Items.All.isMember(entity.type):  # Items are a special case for which we do not log
@@ -424,7 +565,8 @@ class Agent:
     def moveTo(self, entity):
         '''
         Begin moving the agent to the given entity. Returns true if the agent is at the entity,
-        false otherwise.
+        false otherwise. If a planner is set and no path to the entity can be found, returns ActionStatus.Failed
+        (which is false as well).
 
             Preconditions:
                 - The agent is looking at the entity
@@ -451,9 +593,13 @@ class Agent:
         if Items.All.isMember(entity.type):
             distanceToItem = MathUtils.distanceBetweenPointsXZ(self.__position(), entity.position)
             if distanceToItem <= PICK_UP_ITEM_LOCKDOWN_DISTANCE:
-                currentInventoryAmt = self.inventory.amountOfItem(entity.type)
-                self.__actionOverride = Agent.ActionOverride(self.__pickUpItem, [entity, currentInventoryAmt])
-                return self.__pickUpItem(entity, currentInventoryAmt)
+                return self.__startPickingUp(entity)
+
+        # If a planner is set and the way is not clear, lock down on following a path around any obstacles
+        if self.__planner != None and not self.__isAt(entity.position, minTol, maxTol):
+            if not self.__planner.isDirect(self.__cell(), Agent.__entityCell(entity)):
+                self.__actionOverride = Agent.ActionOverride(self.__followPath, [entity, minTol, maxTol])
+                return self.__followPath(entity, minTol, maxTol)
 
         # Action
         if self.__moveToPosition(entity.position, minTol, maxTol):
@@ -463,55 +609,130 @@ class Agent:
         else:
             return False
 
-    def pickUpItem(self, item):
+    def trackEntity(self, entity):
+        '''
+        Returns an up-to-date copy of the given entity, or None if it can no longer be seen by this agent.
+        '''
+        if entity.type == "agent":
+            agent = Agent.allAgents.get(entity.id)
+            return Entity(agent.id, "agent", agent.__position(), 1) if agent != None else None
+        for nearbyEntity in self.nearbyEntities():
+            if nearbyEntity.id == entity.id:
+                return nearbyEntity
+        return None
+
+    def __followPath(self, entity, minTol, maxTol):
+        '''
+        Internal lockdown action for walking along the path planned to an entity, until either the agent is at the
+        entity, the agent can walk straight to the entity, or the entity can no longer be reached. Returns false, so that
+        the caller moves to the entity as normal once the lockdown ends, or ActionStatus.Failed if no path to the entity
+        can be found.
+        '''
+        # Do not check for action override. Otherwise, we'd get stuck in an infinite loop!
+        result = False
+        entity = self.trackEntity(entity)
+        if entity != None and not self.__isAt(entity.position, minTol, maxTol):
+            start = self.__cell()
+            goal = Agent.__entityCell(entity)
+            if not self.__planner.isDirect(start, goal):
+                waypoint = self.__planner.nextWaypoint(start, goal)
+                if waypoint != None:
+                    # Turn towards the waypoint at eye level, only walking once roughly facing it, and jump onto it if
+                    # it is a block higher
+                    _, yawRate = self.__calculateTargetRates(Vector(waypoint.x, waypoint.y + 1, waypoint.z))
+                    self.__startChangingPitch(0)
+                    self.__startChangingYaw(yawRate)
+                    self.__startWalking(1 if abs(yawRate) <= .5 else 0)
+                    if waypoint.y > start[1] and abs(yawRate) <= .5:
+                        self.__startJumping()
+                    else:
+                        self.__stopJumping()
+                    return False
+                result = ActionStatus.Failed
+
+        # Avoid stopMoving() function since it checks for action override
+        self.__stopTurning()
+        self.__stopWalking()
+        self.__stopJumping()
+        self.__actionOverride = None
+        return result
+
+    def pickUpItem(self, item, timeout=None):
         '''
         Commands the agent to look at and move to an item on the ground to pick it up. Is the equivalent of calling lookAt(item)
-        followed by moveTo(item). Is best used for items within close proximity to the agent.
+        followed by moveTo(item). Is best used for items within close proximity to the agent. Returns an ActionStatus, which
+        remains pending until the item shows up in the agent's inventory. Fails if the item can no longer be seen, or if it is
+        not picked up within the given timeout (in seconds, defaulting to Agent.pickUpItemTimeout) of the agent getting close.
         '''
         # Check for override
         if self.__shouldPerformActionOverride(self.pickUpItem):
             return self.__actionOverride.function(*self.__actionOverride.args)
 
-        # Note - Once we are close enough, moveTo will cause the agent to lock down on the internal __pickUpItem function,
-        #        which will return true once the item appears in inventory
+        # Follow the item if it has moved since it was found
+        item = self.trackEntity(item)
+        if item == None:
+            self.stopMoving()
+            return ActionStatus.Failed
+
+        # Note - Once we are close enough, lock down on the internal __pickUpItem function, which completes once the item
+        #        appears in inventory
         if not self.lookAt(item):
-            return False
-        if not self.moveTo(item):
-            return False
-        return True
+            return ActionStatus.Pending
+        if MathUtils.distanceBetweenPointsXZ(self.__position(), item.position) <= PICK_UP_ITEM_LOCKDOWN_DISTANCE:
+            return self.__startPickingUp(item, timeout)
+        self.moveTo(item)
+        return ActionStatus.Pending
+
+    def __startPickingUp(self, item, timeout=None):
+        '''
+        Lock down on moving towards an item until it has been picked up, giving up after the given timeout (in seconds,
+        defaulting to Agent.pickUpItemTimeout). Returns the ActionStatus of picking up the item.
+        '''
+        previousInventoryAmt = self.inventory.amountOfItem(item.type)
+        deadline = time.time() + (timeout if timeout != None else Agent.pickUpItemTimeout)
+        self.__actionOverride = Agent.ActionOverride(self.__pickUpItem, [item, previousInventoryAmt, deadline])
+        return self.__pickUpItem(item, previousInventoryAmt, deadline)
 
-    def __pickUpItem(self, item, previousInventoryAmt):
+    def __pickUpItem(self, item, previousInventoryAmt, deadline):
         '''
         Internal lockdown action for continuously moving an agent towards an item until it has been picked up and
-        shows up in the agent's inventory. Requires the previous amount of that item in the agent's inventory to be
-        passed in as a parameter.
+        shows up in the agent's inventory, or until either the item can no longer be seen or the deadline passes.
+        Requires the previous amount of that item in the agent's inventory to be passed in as a parameter.
         '''
         # Do not check for action override. Otherwise, we'd get stuck in an infinite loop!
         # Do not check any preconditions - we assume that if we locked down on this override that preconditions remain satisfied
 
-        # Move to the position, slowing down as we approach
-        self.__moveToPosition(item.position, 0, PICK_UP_ITEM_LOCKDOWN_DISTANCE, False)
+        # Move to the item's latest position, slowing down as we approach
+        currentItem = self.trackEntity(item)
+        if currentItem != None:
+            self.__moveToPosition(currentItem.position, 0, PICK_UP_ITEM_LOCKDOWN_DISTANCE, False)
 
         # Make sure we log that we picked up all kinds of items, regardless of what they are
         newInventoryItems, _ = self.inventory.sync()
-        for item in newInventoryItems:
-            self.__logReports.append(LogUtils.PickUpItemReport(item))
+        for newItem in newInventoryItems:
+            self.__logReports.append(LogUtils.PickUpItemReport(newItem))
 
-        # Only report true when we picked up the target item
+        # Only succeed when we picked up the target item
         newInventoryAmt = self.inventory.amountOfItem(item.type)
         if newInventoryAmt > previousInventoryAmt:
-            # Avoid stopMoving() function since it checks for action override
-            self.__stopTurning()
-            self.__stopWalking()
-            self.__stopAttacking()
-            self.__actionOverride = None
-            return True
-        return False
+            status = ActionStatus.Succeeded
+        elif currentItem == None or time.time() >= deadline:
+            status = ActionStatus.Failed
+        else:
+            return ActionStatus.Pending
+
+        # Avoid stopMoving() function since it checks for action override
+        self.__stopTurning()
+        self.__stopWalking()
+        self.__stopAttacking()
+        self.__actionOverride = None
+        return status
 
-    def attackMob(self, mob):
+    def attackMob(self, mob, timeout=None):
         '''
-        Direct this agent to attack a mob using the currently equipped item. Returns true if the agent successfully
-        swung, false otherwise.
+        Direct this agent to attack a mob using the currently equipped item. Returns an ActionStatus, which remains
+        pending until the mob is observed to have been killed, in which case the attack succeeds. Fails if the agent could
+        not swing, or if the mob is not killed within the given timeout (in seconds, defaulting to Agent.attackTimeout).
 
             Preconditions:
                 - The given entity is a mob
@@ -528,21 +749,34 @@ class Agent:
             self.__isLookingAt(mob.position),
             self.__isAt(mob.position)):
             self.stopMoving()
-            return False
+            return ActionStatus.Failed
 
         # Action
         oldMobsKilled = self.__mobsKilled()
         self.__startAttacking()
         self.stopMoving()
-        time.sleep(0.7)
-        newMobsKilled = self.__mobsKilled()
+        deadline = time.time() + (timeout if timeout != None else Agent.attackTimeout)
+        self.__actionOverride = Agent.ActionOverride(self.__attackMob, [mob, oldMobsKilled, deadline])
+        return ActionStatus.Pending
 
+    def __attackMob(self, mob, oldMobsKilled, deadline):
+        '''
+        Internal lockdown action for waiting on the result of an attack, until either the number of mobs killed by this
+        agent increases or the deadline passes.
+        '''
+        # Do not check for action override. Otherwise, we'd get stuck in an infinite loop!
+        newMobsKilled = self.__mobsKilled()
         if newMobsKilled > oldMobsKilled:
+            self.__actionOverride = None
             self.__attackCleanup(mob)
-        else:
-            self.__logReports.append(LogUtils.AttackReport(mob, False, [], []))
+            return ActionStatus.Succeeded
 
-        return True
+        if time.time() < deadline:
+            return ActionStatus.Pending
+
+        self.__actionOverride = None
+        self.__logReports.append(LogUtils.AttackReport(mob, False, [], []))
+        return ActionStatus.Failed
 
     def __attackCleanup(self, mob):
         '''
@@ -562,21 +796,18 @@ class Agent:
         self.__logReports.append(LogUtils.AttackReport(mob, True, itemsDropped, itemsPickedUp))
 
         # Trigger a log report for new closest mobs of this mob's type for all agents
+        variants = TypeTable.variantsOf(mob.type, Agent.MobVariants)
+        if len(variants) == 0:
+            return
         allAgents = list(Agent.allAgents.values())
         for agent in allAgents:
-            if Mobs.All.isMember(mob.type):
-                agent.closestMob()
-            if Mobs.Peaceful.isMember(mob.type):
-                agent.closestMob(Mobs.Peaceful)
-            if Mobs.Hostile.isMember(mob.type):
-                agent.closestMob(Mobs.Hostile)
-            if Mobs.Food.isMember(mob.type):
-                agent.closestMob(Mobs.Food)
-
-    def craft(self, itemType, recipe):
-        '''
-        Craft an item of the given enumerated type using a list of RecipeItems. Returns true if successful, and
-        false otherwise.
+            agent.closestByVariant(*variants)
+
+    def craft(self, itemType, recipe, timeout=None):
+        '''
+        Craft an item of the given enumerated type using a list of RecipeItems. Returns an ActionStatus, which remains
+        pending until the crafted item is observed in the agent's inventory. Fails if the item does not appear within the
+        given timeout (in seconds, defaulting to Agent.craftTimeout).
 
             Preconditions:
                 - The agent has enough of each recipe item
@@ -588,26 +819,42 @@ class Agent:
         # Preconditions
         hasAllItems = True
         for recipeItem in recipe:
-            if self.inventory.amountOfItem(recipeItem) < recipeItem.quantity:
+            if self.inventory.amountOfItem(recipeItem.type) < recipeItem.quantity:
                 hasAllItems = False
                 break
         if not self.__checkPreconditions(hasAllItems):
-            return False
+            return ActionStatus.Failed
+
+        # Action
+        oldAmount = self.inventory.observedAmountOfItem(itemType)
+        self.__commands.send("craft {}".format(itemType.value))
+        deadline = time.time() + (timeout if timeout != None else Agent.craftTimeout)
+        self.__actionOverride = Agent.ActionOverride(self.__craft, [itemType, recipe, oldAmount, deadline])
+        return ActionStatus.Pending
+
+    def __craft(self, itemType, recipe, oldAmount, deadline):
+        '''
+        Internal lockdown action for waiting on a crafted item to appear in this agent's inventory, until either the
+        observed amount of that item increases or the deadline passes.
+        '''
+        # Do not check for action override. Otherwise, we'd get stuck in an infinite loop!
+        if self.inventory.observedAmountOfItem(itemType) <= oldAmount:
+            if time.time() < deadline:
+                return ActionStatus.Pending
+            self.__actionOverride = None
+            return ActionStatus.Failed
+        self.__actionOverride = None
 
         # Remove each recipe item from the inventory
         consumedItems = []
         for recipeItem in recipe:
             for i in range(0, recipeItem.quantity):
                 consumedItems.append(self.inventory.removeItem(recipeItem.type))
-        
+
         # Add the crafted item to the inventory
         craftedItem = self.inventory.addItem(itemType)
-
-        # Action
-        self.__host.sendCommand("craft {}".format(itemType.value))
-        time.sleep(0.5)
-        self.__logReports.append(LogUtils.CraftReport(craftedItem, recipeItem))
-        return True
+        self.__logReports.append(LogUtils.CraftReport(craftedItem, consumedItems))
+        return ActionStatus.Succeeded
 
     def equip(self, itemType):
         '''
@@ -634,34 +881,36 @@ class Agent:
 
         # If item is already in the hotbar...
         if oldIndex < 9:
-            self.__host.sendCommand("hotbar.{} 1".format(oldIndex + 1))
-            self.__host.sendCommand("hotbar.{} 0".format(oldIndex + 1))
+            self.__commands.send("hotbar.{} 1".format(oldIndex + 1))
+            self.__commands.send("hotbar.{} 0".format(oldIndex + 1))
             self.__logReports.append(LogUtils.EquipReport(inventoryItem))
             return True
 
         # If there is an available hotbar slot...
         newIndex = self.inventory.nextUnusedHotbarIndex()
         if newIndex != None:
-            self.__host.sendCommand("swapInventoryItems {} {}".format(newIndex, oldIndex))
-            self.__host.sendCommand("hotbar.{} 1".format(newIndex + 1))
-            self.__host.sendCommand("hotbar.{} 0".format(newIndex + 1))
+            self.__commands.send("swapInventoryItems {} {}".format(newIndex, oldIndex))
+            self.__commands.send("hotbar.{} 1".format(newIndex + 1))
+            self.__commands.send("hotbar.{} 0".format(newIndex + 1))
             self.__logReports.append(LogUtils.EquipReport(inventoryItem))
             return True
 
         # Swap item in overflow w/ item in hotbar
         newIndex = self.inventory.equippedIndex()
         if newIndex != -1:
-            self.__host.sendCommand("swapInventoryItems {} {}".format(newIndex, oldIndex))
-            self.__host.sendCommand("hotbar.{} 1".format(newIndex + 1))
-            self.__host.sendCommand("hotbar.{} 0".format(newIndex + 1))
+            self.__commands.send("swapInventoryItems {} {}".format(newIndex, oldIndex))
+            self.__commands.send("hotbar.{} 1".format(newIndex + 1))
+            self.__commands.send("hotbar.{} 0".format(newIndex + 1))
             self.__logReports.append(LogUtils.EquipReport(inventoryItem))
             return True
         
         return False
 
-    def giveItem(self, itemType, agent):
+    def giveItem(self, itemType, agent, timeout=None):
         '''
-        Give an item of the given enumerated type to another agent. Returns true if successful, false otherwise.
+        Give an item of the given enumerated type to another agent. Returns an ActionStatus, which remains pending until
+        the item is observed in the other agent's inventory. Fails if the item does not appear within the given timeout
+        (in seconds, defaulting to Agent.giveItemTimeout), in which case the item is left on the ground.
 
             Preconditions:
                 - The agent has an item of the given type
@@ -684,14 +933,35 @@ class Agent:
             self.__isLookingAt(agent.__position()),
             self.__isAt(agent.__position(), 2, GIVING_DISTANCE)
         ):
-            return False
+            return ActionStatus.Failed
 
-        # Record the exchange in each agent's inventory
+        # The item leaves this agent's inventory as soon as it is thrown. Register it as a drop item so that its ID is
+        # preserved by whoever picks it up.
+        oldAmount = agent.inventory.observedAmountOfItem(itemType)
         toGive = self.inventory.removeItem(itemType)
-        agent.inventory.addItem(itemType, toGive.id)  # Preserve the ID
+        Inventory.registerDropItem(toGive)
 
         # Action
         self.__throwItem()
-        time.sleep(2.8)
+        deadline = time.time() + (timeout if timeout != None else Agent.giveItemTimeout)
+        self.__actionOverride = Agent.ActionOverride(self.__giveItem, [toGive, agent, oldAmount, deadline])
+        return ActionStatus.Pending
+
+    def __giveItem(self, toGive, agent, oldAmount, deadline):
+        '''
+        Internal lockdown action for waiting on a thrown item to appear in the receiving agent's inventory, until either
+        the observed amount of that item increases or the deadline passes.
+        '''
+        # Do not check for action override. Otherwise, we'd get stuck in an infinite loop!
+        if agent.inventory.observedAmountOfItem(toGive.type) <= oldAmount:
+            if time.time() < deadline:
+                return ActionStatus.Pending
+            self.__actionOverride = None
+            return ActionStatus.Failed
+        self.__actionOverride = None
+
+        # Record the exchange in the receiving agent's inventory, unless it already claimed the item when syncing
+        if Inventory.unregisterDropItem(toGive):
+            agent.inventory.addItem(toGive.type, toGive.id)  # Preserve the ID
         self.__logReports.append(LogUtils.GiveItemReport(toGive, agent))
-        return True
+        return ActionStatus.Succeeded
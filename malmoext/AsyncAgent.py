@@ -0,0 +1,150 @@
+# ==============================================================================================
+# This file contains an asyncio facade for the Agent class, allowing many agents to be driven
+# from a single thread as concurrent coroutines.
+# ==============================================================================================
+import asyncio
+import threading
+from malmoext.Utils import ActionStatus, Entity
+
+class AsyncAgent:
+    '''
+    Wrapper class for an Agent, exposing its high-level actions as coroutines. Each action is repeated once per new
+    observation until it completes, so an agent awaiting an action never holds up any other agent. Every call that may
+    block on the AgentHost (waiting for and fetching observations, sending commands, and each step of an action) is
+    run on an executor, so the event loop's thread never waits on Malmo. Each step acts on the latest observed copy of
+    any entity it was given, so that actions follow targets that move while they are awaited. Since actions may change the state of other
+    agents (such as when an attack or exchange completes), action steps of different agents never run at the same
+    time, while observations are fetched concurrently. Any attribute not defined here (such as closestMob or inventory)
+    is taken from the wrapped Agent, and is run on the calling thread.
+
+    Example usage, for each agent:
+
+        async def defend(defender, player):
+            while defender.isMissionActive():
+                zombie = player.closestMob(Mobs.Hostile)
+                if zombie != None and await defender.moveTo(zombie):
+                    await defender.attackMob(zombie)
+                await defender.nextObservation()
+    '''
+    pollInterval = 0.01     # Time (in seconds) to wait between checks for a new observation
+    __stepLock = threading.Lock()   # Held while running an action step, so that the steps of different agents never overlap
+
+    def __init__(self, agent, executor=None):
+        self.__executor = executor      # The executor that blocking AgentHost calls are run on. If None, the event loop's default executor is used
+        self.agent = agent              # The wrapped Agent
+
+    def __getattr__(self, name):
+        return getattr(self.agent, name)
+
+    async def __call(self, function, *args):
+        '''
+        Run a function that may block on the AgentHost on the executor, and return its result.
+        '''
+        return await asyncio.get_running_loop().run_in_executor(self.__executor, function, *args)
+
+    def __step(self, step, *args):
+        '''
+        Run a single action step, once no other agent is running one. Any entity among the arguments is replaced by its
+        latest copy in this agent's observation snapshot, if it can still be seen.
+        '''
+        with AsyncAgent.__stepLock:
+            return step(*[self.__track(arg) for arg in args])
+
+    def __track(self, arg):
+        '''
+        Returns the latest copy of the given argument if it is an entity that this agent can still see, or the argument
+        itself otherwise.
+        '''
+        if isinstance(arg, Entity):
+            entity = self.agent.trackEntity(arg)
+            if entity != None:
+                return entity
+        return arg
+
+    async def nextObservation(self):
+        '''
+        Send any buffered commands for this agent, then wait until a new observation has arrived and return it.
+        Returns None if the mission ends first.
+        '''
+        host = self.agent.getMalmoAgent()
+        await self.__call(self.agent.nextTick)
+        while True:
+            worldState = await self.__call(host.peekWorldState)
+            if worldState.number_of_observations_since_last_state > 0:
+                return await self.__call(self.agent.refresh)
+            if not worldState.is_mission_running:
+                return None
+            await asyncio.sleep(AsyncAgent.pollInterval)
+
+    async def __untilDone(self, step, *args):
+        '''
+        Repeat a step of an action once per new observation, until the step succeeds or fails. Steps may either return
+        a boolean (where false means that the action is still in progress) or an ActionStatus. Returns the last result
+        of the step.
+        '''
+        while True:
+            result = await self.__call(self.__step, step, *args)
+            if result or result == ActionStatus.Failed:
+                return result
+            if await self.nextObservation() == None:
+                return result
+
+    @staticmethod
+    def __unwrap(entity):
+        '''
+        Returns the wrapped Agent if given an AsyncAgent, or the given entity otherwise.
+        '''
+        return entity.agent if isinstance(entity, AsyncAgent) else entity
+
+    def __lookAndMoveTo(self, entity):
+        '''
+        A single step of both looking at and moving to an entity.
+        '''
+        return self.agent.lookAt(entity) and self.agent.moveTo(entity)
+
+    async def lookAt(self, entity):
+        '''
+        Turn the agent's POV to face the given entity, which may also be an Agent or an AsyncAgent. Returns true once
+        the agent is facing the entity, or false if the mission ends first.
+        '''
+        return await self.__untilDone(self.agent.lookAt, AsyncAgent.__unwrap(entity))
+
+    async def moveTo(self, entity):
+        '''
+        Turn to face and walk to the given entity, which may also be an Agent or an AsyncAgent. Returns true once the
+        agent is at the entity, or false if the mission ends first.
+        '''
+        return await self.__untilDone(self.__lookAndMoveTo, AsyncAgent.__unwrap(entity))
+
+    async def pickUpItem(self, item, timeout=None):
+        '''
+        Turn to face and walk to an item on the ground to pick it up. Returns the final ActionStatus of picking up the
+        item, which fails if the item can no longer be seen or is not picked up in time (see Agent.pickUpItem).
+        '''
+        return await self.__untilDone(self.agent.pickUpItem, item, timeout)
+
+    async def attackMob(self, mob, timeout=None):
+        '''
+        Attack a mob using the currently equipped item. Returns the final ActionStatus of the attack.
+        '''
+        return await self.__untilDone(self.agent.attackMob, mob, timeout)
+
+    async def craft(self, itemType, recipe, timeout=None):
+        '''
+        Craft an item of the given enumerated type using a list of RecipeItems. Returns the final ActionStatus of the craft.
+        '''
+        return await self.__untilDone(self.agent.craft, itemType, recipe, timeout)
+
+    async def equip(self, itemType):
+        '''
+        Equip an item of the given enumerated type from this agent's inventory. Returns true if the agent successfully
+        equips the item, false otherwise.
+        '''
+        return await self.__call(self.__step, self.agent.equip, itemType)
+
+    async def giveItem(self, itemType, agent, timeout=None):
+        '''
+        Give an item of the given enumerated type to another agent, which may either be an Agent or an AsyncAgent.
+        Returns the final ActionStatus of the exchange.
+        '''
+        return await self.__untilDone(self.agent.giveItem, itemType, AsyncAgent.__unwrap(agent), timeout)
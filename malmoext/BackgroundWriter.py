@@ -0,0 +1,164 @@
+# ==============================================================================================
+# This file contains a writer thread that takes the formatting and file I/O of mission output
+# (such as logs and statistics) off of the mission loop thread.
+# ==============================================================================================
+import time
+import threading
+from enum import Enum
+from collections import deque, namedtuple
+
+class BackgroundWriter:
+    '''
+    Runs output work on a dedicated thread. The mission loop submits records, each made up of a function and its
+    arguments, to a bounded queue, and returns immediately. The writer thread drains the queue in batches, calling
+    each function in the order it was submitted. Since only the writer thread runs the submitted functions, they need
+    no locking among themselves.
+
+    When the queue is full, the drop policy decides what happens to a new record: Block waits for the writer thread to
+    make room (applying backpressure to the mission loop), DropNewest discards the new record, and DropOldest discards
+    the oldest droppable record in the queue to make room for it. Only records submitted as droppable (such as rows of
+    statistics) are ever discarded, leaving gaps in the output. Any other records (such as lines of a log, or opening
+    and closing files) always wait for room instead.
+
+    Example usage:
+
+        writer = BackgroundWriter()
+        logger.setSink(ThreadedSink(FileSink(), writer))
+        stats.setWriter(writer)
+        ...
+        logger.export()
+        stats.export()
+        writer.close()
+    '''
+    Stats = namedtuple("WriterStats", "submitted written dropped queueDepth maxQueueDepth meanLag maxLag")   # Counters and queue metrics of a writer (lags in seconds)
+
+    class DropPolicy(Enum):
+        '''
+        What to do with a new record when the queue is full.
+        '''
+        Block = 0           # Wait until the writer thread makes room
+        DropNewest = 1      # Discard the new record
+        DropOldest = 2      # Discard the oldest queued record
+
+    def __init__(self, maxQueueSize=10000, batchSize=256, dropPolicy=DropPolicy.Block):
+        self.__maxQueueSize = maxQueueSize      # The maximum number of records held in the queue
+        self.__batchSize = batchSize            # The maximum number of records taken from the queue at once
+        self.__dropPolicy = dropPolicy          # What to do with a new record when the queue is full
+        self.__queue = deque()                  # Queued (function, args, submit time, is droppable) records, from oldest to newest
+        self.__condition = threading.Condition()    # Guards the queue and counters, and signals changes to either
+        self.__inFlight = 0                     # The number of records taken by the writer thread but not yet written
+        self.__isClosing = False                # Whether or not the writer thread should exit once the queue is empty
+        self.__error = None                     # The first exception raised by a submitted function, re-raised by flush()
+        self.__submitted = 0                    # The number of records submitted
+        self.__written = 0                      # The number of records written
+        self.__dropped = 0                      # The number of records dropped
+        self.__maxQueueDepth = 0                # The largest number of records ever held in the queue
+        self.__totalLag = 0.0                   # The total time between the submission and writing of each record
+        self.__maxLag = 0.0                     # The longest time between the submission and writing of a record
+        self.__thread = threading.Thread(target=self.__run, name="malmoext-writer", daemon=True)
+        self.__thread.start()
+
+    def submit(self, function, *args, isDroppable=False):
+        '''
+        Queue a call of the given function with the given arguments, to be run on the writer thread. Only records that
+        are droppable may be discarded by the drop policy when the queue is full. Returns false if the record was
+        dropped.
+        '''
+        with self.__condition:
+            if self.__isClosing:
+                raise Exception("Can not submit records to a closed writer")
+            self.__submitted += 1
+            if len(self.__queue) >= self.__maxQueueSize:
+                if isDroppable and self.__dropPolicy == BackgroundWriter.DropPolicy.DropNewest:
+                    self.__dropped += 1
+                    return False
+                hasRoom = isDroppable and self.__dropPolicy == BackgroundWriter.DropPolicy.DropOldest and self.__dropOldest()
+                if not hasRoom:
+                    while len(self.__queue) >= self.__maxQueueSize:
+                        self.__condition.wait()
+            self.__queue.append((function, args, time.perf_counter(), isDroppable))
+            self.__maxQueueDepth = max(self.__maxQueueDepth, len(self.__queue))
+            self.__condition.notify_all()
+            return True
+
+    def __dropOldest(self):
+        '''
+        Discard the oldest droppable record in the queue. Returns false if no queued record is droppable. Must be called
+        while holding the lock.
+        '''
+        for i, record in enumerate(self.__queue):
+            if record[3]:
+                del self.__queue[i]
+                self.__dropped += 1
+                return True
+        return False
+
+    def __run(self):
+        '''
+        Body of the writer thread. Drains the queue in batches until the writer is closed.
+        '''
+        while True:
+            with self.__condition:
+                while len(self.__queue) == 0 and not self.__isClosing:
+                    self.__condition.wait()
+                if len(self.__queue) == 0:
+                    return
+                batch = [self.__queue.popleft() for _ in range(0, min(self.__batchSize, len(self.__queue)))]
+                self.__inFlight = len(batch)
+                self.__condition.notify_all()
+
+            # Run the batch outside of the lock, so that the mission loop can keep submitting records
+            totalLag = 0.0
+            maxLag = 0.0
+            error = None
+            for function, args, submitTime, _ in batch:
+                try:
+                    function(*args)
+                except Exception as e:
+                    if error == None:
+                        error = e
+                lag = time.perf_counter() - submitTime
+                totalLag += lag
+                maxLag = max(maxLag, lag)
+
+            with self.__condition:
+                if self.__error == None:
+                    self.__error = error
+                self.__written += len(batch)
+                self.__totalLag += totalLag
+                self.__maxLag = max(self.__maxLag, maxLag)
+                self.__inFlight = 0
+                self.__condition.notify_all()
+
+    def flush(self):
+        '''
+        Wait until every record submitted so far has been written. Raises the first exception raised by any submitted
+        function, if there was one.
+        '''
+        with self.__condition:
+            while len(self.__queue) > 0 or self.__inFlight > 0:
+                self.__condition.wait()
+            error = self.__error
+            self.__error = None
+        if error != None:
+            raise error
+
+    def close(self):
+        '''
+        Write every queued record and stop the writer thread. No records may be submitted afterwards.
+        '''
+        with self.__condition:
+            self.__isClosing = True
+            self.__condition.notify_all()
+        self.__thread.join()
+        self.flush()
+
+    def stats(self):
+        '''
+        Returns a BackgroundWriter.Stats tuple containing the number of records submitted, written and dropped, the
+        current and largest queue depth, and the mean and maximum lag (in seconds) between submitting and writing a
+        record.
+        '''
+        with self.__condition:
+            return BackgroundWriter.Stats(self.__submitted, self.__written, self.__dropped, len(self.__queue),
+                self.__maxQueueDepth, self.__totalLag / max(self.__written, 1), self.__maxLag)
@@ -0,0 +1,262 @@
+# ==============================================================================================
+# This file contains a compact binary encoding of the mission log, along with functionality for
+# reading it back and converting it to the text format output by the Logger.
+# ==============================================================================================
+import os
+import time
+import zlib
+import string
+from malmoext.LogSinks import LogSink
+
+class BinaryLog:
+    '''
+    Reads logs written by a BinarySink. A binary log starts with the Magic bytes, followed by a series of blocks. Each
+    block is made up of the varint length of its payload, the payload itself, and the CRC32 checksum of the payload
+    (4 bytes, little-endian), so that corruption is detected block by block.
+
+    A payload is a series of entries, each starting with a varint tag:
+
+        DefineTemplate, length, UTF-8 bytes   - Adds a line template (such as 'at-{}-{}') to the template table
+        DefineString, length, UTF-8 bytes     - Adds an argument (such as an entity ID) to the string table
+        FirstRecord + code, index...          - A line, given by the code of its template in the template table and
+                                                the index of each of its arguments in the string table
+
+    Templates and strings are defined just before their first use, and are numbered in the order they were defined.
+    '''
+    Magic = b"MXLOG\x01"    # The bytes at the start of every binary log
+    Extension = ".mlog"     # The file extension of binary logs
+
+    # Entry tags
+    DefineTemplate = 0
+    DefineString = 1
+    FirstRecord = 2
+
+    @staticmethod
+    def writeVarint(buffer, value):
+        '''
+        Append an unsigned integer to a bytearray as a varint, 7 bits at a time starting with the lowest bits.
+        '''
+        while value >= 0x80:
+            buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+        buffer.append(value)
+
+    @staticmethod
+    def readVarint(data, offset):
+        '''
+        Returns the unsigned integer encoded as a varint at an offset of the given bytes, along with the offset just
+        past it.
+        '''
+        byte = data[offset]
+        if byte < 0x80:
+            return byte, offset + 1
+        value = 0
+        shift = 0
+        while byte >= 0x80:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            offset += 1
+            byte = data[offset]
+        return value | (byte << shift), offset + 1
+
+    @staticmethod
+    def fieldCount(template):
+        '''
+        Returns the number of replacement fields in a line template.
+        '''
+        return sum(1 for _, field, _, _ in string.Formatter().parse(template) if field != None)
+
+    @staticmethod
+    def blocks(filepath):
+        '''
+        Returns a generator over the payload of each block in a binary log, after checking its checksum. An incomplete
+        block at the end of the log (such as one left by a crash) is ignored.
+        '''
+        with open(filepath, "rb") as f:
+            data = f.read()
+        if data[:len(BinaryLog.Magic)] != BinaryLog.Magic:
+            raise Exception("Not a binary mission log: {}".format(filepath))
+
+        offset = len(BinaryLog.Magic)
+        while offset < len(data):
+            try:
+                length, start = BinaryLog.readVarint(data, offset)
+            except IndexError:
+                return
+            end = start + length
+            if end + 4 > len(data):
+                return
+            payload = data[start:end]
+            if zlib.crc32(payload) != int.from_bytes(data[end:end + 4], "little"):
+                raise Exception("Corrupt block at offset {} of {}".format(offset, filepath))
+            yield payload
+            offset = end + 4
+
+    @staticmethod
+    def records(filepath):
+        '''
+        Returns a generator over the lines of a binary log, as (template, args) tuples, without formatting them.
+        '''
+        readVarint = BinaryLog.readVarint
+        templates = []      # The template for each template code
+        fieldCounts = []    # The number of arguments taken by each template
+        strings = []        # The string for each string index
+        for payload in BinaryLog.blocks(filepath):
+            offset = 0
+            while offset < len(payload):
+                tag, offset = readVarint(payload, offset)
+                if tag >= BinaryLog.FirstRecord:
+                    code = tag - BinaryLog.FirstRecord
+                    args = []
+                    for _ in range(0, fieldCounts[code]):
+                        index, offset = readVarint(payload, offset)
+                        args.append(strings[index])
+                    yield templates[code], tuple(args)
+                else:
+                    length, offset = readVarint(payload, offset)
+                    text = payload[offset:offset + length].decode("utf-8")
+                    offset += length
+                    if tag == BinaryLog.DefineTemplate:
+                        templates.append(text)
+                        fieldCounts.append(BinaryLog.fieldCount(text))
+                    else:
+                        strings.append(text)
+
+    @staticmethod
+    def lines(filepath):
+        '''
+        Returns a generator over the lines of a binary log, formatted as in the text log.
+        '''
+        for template, args in BinaryLog.records(filepath):
+            yield template.format(*args)
+
+    @staticmethod
+    def toText(filepath, textFilepath=None):
+        '''
+        Convert a binary log to the text format output by the Logger, and return the path of the text log. By default,
+        the text log is written next to the binary log, with a '.log' extension.
+        '''
+        if textFilepath == None:
+            textFilepath = os.path.splitext(filepath)[0] + ".log"
+        with open(textFilepath, "w+") as f:
+            f.write("\n".join(BinaryLog.lines(filepath)))
+        return textFilepath
+
+class BinarySink(LogSink):
+    '''
+    Streams the log to a file in the binary format read by BinaryLog, holding at most one block of it in memory. The
+    current block is written out once it reaches the block size (in bytes), or once the flush interval (in seconds)
+    has passed since the last write, whichever comes first. BinaryLog.toText() converts the file back into the exact
+    text that exporting a MemorySink would have written.
+
+    Example usage:
+
+        logger = Logger()
+        logger.setSink(BinarySink())
+        ...
+        BinaryLog.toText(logger.export())
+    '''
+    def __init__(self, filepath=None, blockSize=1 << 16, flushInterval=5.0):
+        LogSink.__init__(self)
+        self.filepath = filepath if filepath != None else LogSink.defaultPath(extension=BinaryLog.Extension)   # The path of the file written to
+        self.__blockSize = blockSize            # The payload size (in bytes) at which the current block is written out
+        self.__flushInterval = flushInterval    # The maximum time (in seconds) between writes of a non-empty block
+        self.__templates = {}                   # A map of the templates defined so far to the code of each
+        self.__strings = {}                     # A map of the strings defined so far to the index of each
+        self.__block = bytearray()              # The payload of the current block
+        self.__lastFlushTime = time.time()      # Time at which a block was last written out
+        self.blocks = 0                         # The number of blocks written out
+
+        directory = os.path.dirname(self.filepath)
+        if directory != "" and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.__file = open(self.filepath, "wb+")
+        self.__file.write(BinaryLog.Magic)
+
+    def __define(self, tag, text):
+        '''
+        Add an entry defining a template or string to the current block.
+        '''
+        encoded = text.encode("utf-8")
+        BinaryLog.writeVarint(self.__block, tag)
+        BinaryLog.writeVarint(self.__block, len(encoded))
+        self.__block += encoded
+
+    def append(self, template, *args):
+        LogSink.append(self, template)
+        code = self.__templates.get(template)
+        if code == None:
+            code = len(self.__templates)
+            self.__templates[template] = code
+            self.__define(BinaryLog.DefineTemplate, template)
+
+        indices = []
+        for arg in args:
+            text = str(arg)
+            index = self.__strings.get(text)
+            if index == None:
+                index = len(self.__strings)
+                self.__strings[text] = index
+                self.__define(BinaryLog.DefineString, text)
+            indices.append(index)
+
+        block = self.__block
+        BinaryLog.writeVarint(block, code + BinaryLog.FirstRecord)
+        for index in indices:
+            BinaryLog.writeVarint(block, index)
+
+        if len(block) >= self.__blockSize:
+            self.flush()
+        else:
+            self.poll()
+
+    def poll(self):
+        '''
+        Write out the current block if the flush interval has passed since a block was last written.
+        '''
+        if len(self.__block) > 0 and time.time() - self.__lastFlushTime >= self.__flushInterval:
+            self.flush()
+
+    def flush(self):
+        '''
+        Immediately write out the current block, along with its length and checksum, and flush the file to disk.
+        '''
+        if self.__file.closed:
+            return
+        if len(self.__block) > 0:
+            header = bytearray()
+            BinaryLog.writeVarint(header, len(self.__block))
+            self.__file.write(header)
+            self.__file.write(self.__block)
+            self.__file.write(zlib.crc32(self.__block).to_bytes(4, "little"))
+            self.__block = bytearray()
+            self.blocks += 1
+        self.__file.flush()
+        self.__lastFlushTime = time.time()
+
+    def clear(self):
+        '''
+        Remove all lines from the log, truncating the file.
+        '''
+        LogSink.clear(self)
+        self.__templates = {}
+        self.__strings = {}
+        self.__block = bytearray()
+        self.__file.seek(0)
+        self.__file.truncate()
+        self.__file.write(BinaryLog.Magic)
+
+    def close(self):
+        '''
+        Write out the current block and close the file. No lines may be appended afterwards.
+        '''
+        if not self.__file.closed:
+            self.flush()
+            self.__file.close()
+
+    def export(self):
+        '''
+        Write out the current block and close the file, returning its path.
+        '''
+        self.close()
+        return self.filepath
@@ -0,0 +1,114 @@
+# ==============================================================================================
+# This file contains functionality for decoding the block grid observed by an agent into a NumPy
+# array of block IDs, and for answering navigation queries over it with vectorized operations.
+# ==============================================================================================
+import numpy
+from malmoext.Utils import Blocks, TypeTable, GRID_OBSERVATION_X_LEN, GRID_OBSERVATION_Y_LEN, GRID_OBSERVATION_Z_LEN
+
+class BlockGrid:
+    '''
+    Helpers for the block grid observed by an agent. A grid is a uint16 NumPy array of block IDs shaped (Y, Z, X), where
+    the agent's feet are at the center cell. Block IDs are the type IDs given by the TypeTable, so that air is always 0.
+    Block types not in the Blocks enumeration are given the Unknown ID, and are treated as solid.
+    '''
+    Shape = (GRID_OBSERVATION_Y_LEN, GRID_OBSERVATION_Z_LEN, GRID_OBSERVATION_X_LEN)    # The shape of an observed grid
+    Center = (GRID_OBSERVATION_Y_LEN // 2, GRID_OBSERVATION_Z_LEN // 2, GRID_OBSERVATION_X_LEN // 2)   # The (y,z,x) cell of the agent's feet
+
+    BlockIds = TypeTable.Ids                # A map of block names to the ID of each block
+    Unknown = TypeTable.Unknown             # The ID given to block types not in the Blocks enumeration
+
+    # Blocks that can be walked through, and liquids, which can neither be walked through nor stood on
+    PassableBlocks = [Blocks.Air, Blocks.Sapling, Blocks.Tallgrass, Blocks.Deadbush, Blocks.Yellow_flower, Blocks.Red_flower,
+        Blocks.Brown_mushroom, Blocks.Red_mushroom, Blocks.Torch, Blocks.Redstone_wire, Blocks.Wheat, Blocks.Standing_sign,
+        Blocks.Wall_sign, Blocks.Rail, Blocks.Golden_rail, Blocks.Detector_rail, Blocks.Activator_rail, Blocks.Lever,
+        Blocks.Stone_pressure_plate, Blocks.Wooden_pressure_plate, Blocks.Light_weighted_pressure_plate,
+        Blocks.Heavy_weighted_pressure_plate, Blocks.Unlit_redstone_torch, Blocks.Redstone_torch, Blocks.Stone_button,
+        Blocks.Wooden_button, Blocks.Snow_layer, Blocks.Reeds, Blocks.Vine, Blocks.Tripwire, Blocks.Tripwire_hook,
+        Blocks.Carrots, Blocks.Potatoes, Blocks.Beetroots, Blocks.Nether_wart, Blocks.Double_plant, Blocks.Standing_banner,
+        Blocks.Wall_banner, Blocks.Carpet, Blocks.Structure_void]
+    LiquidBlocks = [Blocks.Water, Blocks.Flowing_water, Blocks.Lava, Blocks.Flowing_lava]
+
+    # Blocks that are 1.5 blocks high, which can neither be walked through nor jumped onto
+    TallBlocks = [Blocks.Fence, Blocks.Spruce_fence, Blocks.Birch_fence, Blocks.Jungle_fence, Blocks.Dark_oak_fence,
+        Blocks.Acacia_fence, Blocks.Nether_brick_fence, Blocks.Fence_gate, Blocks.Spruce_fence_gate, Blocks.Birch_fence_gate,
+        Blocks.Jungle_fence_gate, Blocks.Dark_oak_fence_gate, Blocks.Acacia_fence_gate, Blocks.Cobblestone_wall]
+
+    # Lookup tables from block ID to whether each block is passable, solid, or can be stood on
+    IsPassable = numpy.zeros(Unknown + 1, dtype=bool)
+    IsSolid = numpy.ones(Unknown + 1, dtype=bool)
+    for block in PassableBlocks:
+        IsPassable[BlockIds[block.value]] = True
+        IsSolid[BlockIds[block.value]] = False
+    for block in LiquidBlocks:
+        IsSolid[BlockIds[block.value]] = False
+    IsStandable = IsSolid.copy()
+    for block in TallBlocks:
+        IsStandable[BlockIds[block.value]] = False
+    del block
+
+    @staticmethod
+    def decode(blockNames):
+        '''
+        Returns the grid of block IDs for a list of block names, in the order output by Malmo (x varies fastest, then
+        z, then y).
+        '''
+        return TypeTable.ids(blockNames).reshape(BlockGrid.Shape)
+
+    @staticmethod
+    def blockType(blockID):
+        '''
+        Returns the Blocks enumerated type for a block ID. Returns None for the Unknown ID, or the ID of any other type.
+        '''
+        return TypeTable.Entries[TypeTable.Types[blockID]].block if blockID < BlockGrid.Unknown else None
+
+    @staticmethod
+    def passable(grid):
+        '''
+        Returns a boolean array, shaped like the given grid, that is true for each cell that can be walked through.
+        '''
+        return BlockGrid.IsPassable[grid]
+
+    @staticmethod
+    def solidBelow(grid):
+        '''
+        Returns a boolean array, shaped like the given grid, that is true for each cell with a solid block directly
+        beneath it that can be stood on (i.e. not a fence or wall). Cells in the bottom layer are false, since the block
+        beneath them is not known.
+        '''
+        result = numpy.zeros(grid.shape, dtype=bool)
+        result[1:] = BlockGrid.IsStandable[grid[:-1]]
+        return result
+
+    @staticmethod
+    def walkable(grid):
+        '''
+        Returns a boolean array, shaped like the given grid, that is true for each cell an agent can stand in. The cell
+        and the cell above it must be passable, and the block beneath it must be solid and no taller than a full block.
+        Cells in the top layer are false, since the block above them is not known.
+        '''
+        passable = BlockGrid.IsPassable[grid]
+        result = BlockGrid.solidBelow(grid)
+        result[:-1] &= passable[:-1] & passable[1:]
+        result[-1] = False
+        return result
+
+    @staticmethod
+    def neighbours(walkable, cell):
+        '''
+        Returns a list of the (y,z,x) cells an agent standing in the given cell can step to, given the result of
+        walkable() for a grid. Agents may step to any of the four horizontally adjacent cells, including one block up
+        (by jumping) or down.
+        '''
+        y, z, x = cell
+        height, depth, width = walkable.shape
+        result = []
+        for dz, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            nz = z + dz
+            nx = x + dx
+            if nz < 0 or nz >= depth or nx < 0 or nx >= width:
+                continue
+            for ny in (y, y + 1, y - 1):
+                if 0 <= ny < height and walkable[ny, nz, nx]:
+                    result.append((ny, nz, nx))
+                    break
+        return result
@@ -0,0 +1,115 @@
+# ==============================================================================================
+# This file contains functionality for coalescing the commands sent to a Malmo AgentHost, so
+# that redundant commands are never sent over the wire.
+# ==============================================================================================
+import threading
+from collections import namedtuple
+
+class CommandBuffer:
+    '''
+    A per-agent buffer sitting in front of AgentHost.sendCommand, which drops redundant commands:
+
+        - Steering commands (move, strafe, pitch, turn) only take on their last value each tick, and are not sent
+          at all if that value matches the value last sent.
+        - Toggle commands (attack, use, jump, crouch) are sent in order, unless they would not change the value
+          last given for that command.
+        - All other commands (crafting, inventory, hotbar, etc.) are always sent in order.
+
+    By default, every command that is not dropped is sent immediately. Once buffering is turned on (which agents do
+    when they are first ticked by a mission loop), steering and toggle commands are held until the buffer is flushed
+    once per tick. Any other command flushes the buffer and is sent immediately, so that commands are always sent in
+    the order they were given.
+    '''
+    Stats = namedtuple("CommandStats", "sent suppressed")    # Counters for the number of commands sent and suppressed
+    SteeringCommands = set(["move", "strafe", "pitch", "turn"])
+    ToggleCommands = set(["attack", "use", "jump", "crouch"])
+
+    def __init__(self, host):
+        self.__host = host          # The AgentHost that commands are sent to
+        self.__pending = []         # Commands waiting to be sent, as [command name, value, text] lists
+        self.__lastSent = {}        # A map of steering and toggle command names to the last value sent for each
+        self.__sent = 0             # The number of commands sent
+        self.__suppressed = 0       # The number of commands dropped as redundant
+        self.__isBuffering = False  # Whether or not steering and toggle commands are held until the next flush
+        self.__lock = threading.RLock() # Guards the buffer and counters, since commands may be given from several threads
+
+    @staticmethod
+    def __parse(command):
+        '''
+        Split a command into its name and numeric value. Returns (command, None) for commands without a numeric value.
+        '''
+        parts = command.split(" ")
+        if len(parts) != 2:
+            return (command, None)
+        try:
+            return (parts[0], float(parts[1]))
+        except ValueError:
+            return (command, None)
+
+    def __lastValue(self, name):
+        '''
+        Returns the value that a steering or toggle command will have once pending commands are sent.
+        '''
+        for pending in reversed(self.__pending):
+            if pending[0] == name:
+                return pending[1]
+        return self.__lastSent.get(name)
+
+    def setBuffering(self, isBuffering):
+        '''
+        Set whether or not steering and toggle commands are held until the next flush. Turning buffering off flushes
+        any commands being held.
+        '''
+        with self.__lock:
+            self.__isBuffering = isBuffering
+            if not isBuffering:
+                self.flush()
+
+    def send(self, command):
+        '''
+        Send a command, dropping it if it is redundant. If buffering is on, steering and toggle commands are held until
+        the next flush.
+        '''
+        with self.__lock:
+            name, value = CommandBuffer.__parse(command)
+
+            if value != None and name in CommandBuffer.SteeringCommands:
+                for pending in self.__pending:
+                    if pending[0] == name:
+                        pending[1] = value
+                        pending[2] = command
+                        self.__suppressed += 1
+                        return
+            elif value != None and name in CommandBuffer.ToggleCommands:
+                if self.__lastValue(name) == value:
+                    self.__suppressed += 1
+                    return
+            else:
+                name = None
+
+            self.__pending.append([name, value, command])
+            if name == None or not self.__isBuffering:
+                self.flush()
+
+    def flush(self):
+        '''
+        Send all held commands to the AgentHost.
+        '''
+        with self.__lock:
+            pending = self.__pending
+            self.__pending = []
+            for name, value, command in pending:
+                if name != None:
+                    if name in CommandBuffer.SteeringCommands and self.__lastSent.get(name) == value:
+                        self.__suppressed += 1
+                        continue
+                    self.__lastSent[name] = value
+                self.__host.sendCommand(command)
+                self.__sent += 1
+
+    def stats(self):
+        '''
+        Returns a CommandBuffer.Stats tuple containing the number of commands sent and the number suppressed.
+        '''
+        with self.__lock:
+            return CommandBuffer.Stats(self.__sent, self.__suppressed)
@@ -0,0 +1,265 @@
+# ==============================================================================================
+# This file contains functionality for writing the mission log as independently compressed
+# frames, along with an index that allows reading from any action without decompressing the
+# whole log.
+# ==============================================================================================
+import os
+import time
+import gzip
+import lzma
+import bisect
+from collections import namedtuple
+from malmoext.LogSinks import LogSink
+
+class CompressedLog:
+    '''
+    Reads logs written by a CompressedSink. The log is a series of frames, each compressed independently with gzip (as
+    a gzip member) or xz (as an xz stream). Since standard tools decompress concatenated members and streams as a
+    whole, the log file also decompresses directly (e.g. with zcat) into the text format output by the Logger.
+
+    Frames are listed in an index file next to the log, named by adding the IndexExtension. Its first line holds the
+    IndexMagic and the compression used, and each following line describes one frame with four space-separated
+    numbers: the frame's byte offset and length within the log, and the number of lines and of actions (lines
+    starting with '!') that come before it.
+    '''
+    IndexMagic = "MXIDX1"       # The first word of every index file
+    IndexExtension = ".idx"     # The extension added to the path of a log to get the path of its index
+    Compressions = ["gzip", "xz"]   # Supported compression formats
+    Frame = namedtuple("Frame", "offset length firstLine firstAction")   # Location of a frame within the log, and the number of lines and actions before it
+
+    def __init__(self, filepath):
+        self.filepath = filepath    # The path of the log
+        self.frames = []            # The CompressedLog.Frame for each frame, in order
+
+        with open(filepath + CompressedLog.IndexExtension, "r") as f:
+            header = f.readline().split()
+            if len(header) != 2 or header[0] != CompressedLog.IndexMagic or header[1] not in CompressedLog.Compressions:
+                raise Exception("Not a compressed mission log index: {}".format(filepath + CompressedLog.IndexExtension))
+            self.compression = header[1]    # The compression format of each frame
+            for line in f:
+                fields = line.split()
+                if len(fields) == 4:    # Ignore a partially written last line
+                    self.frames.append(CompressedLog.Frame(*[int(field) for field in fields]))
+        self.__firstActions = [frame.firstAction for frame in self.frames]  # The number of actions before each frame, for searching
+
+    def __decompress(self, data):
+        '''
+        Returns the text of a single compressed frame.
+        '''
+        if self.compression == "gzip":
+            return gzip.decompress(data).decode("utf-8")
+        return lzma.decompress(data, format=lzma.FORMAT_XZ).decode("utf-8")
+
+    def frameLines(self, index):
+        '''
+        Returns a list of the lines in the frame at the given index, decompressing only that frame.
+        '''
+        frame = self.frames[index]
+        with open(self.filepath, "rb") as f:
+            f.seek(frame.offset)
+            text = self.__decompress(f.read(frame.length))
+        if index > 0:
+            text = text[1:]     # Frames after the first start with the newline separating them from the previous frame
+        return text.split("\n")
+
+    def lines(self, fromFrame=0):
+        '''
+        Returns a generator over the lines of the log, starting at the frame with the given index.
+        '''
+        for index in range(fromFrame, len(self.frames)):
+            for line in self.frameLines(index):
+                yield line
+
+    def __openBlock(self, index):
+        '''
+        Returns the lines that follow the last blank line in the frame at the given index, which begin a block
+        continued by the next frame. If the frame has no blank lines, the lines of earlier frames are included.
+        '''
+        result = []
+        while index >= 0:
+            lines = self.frameLines(index)
+            if "" in lines:
+                last = len(lines) - 1 - lines[::-1].index("")
+                return lines[last + 1:] + result
+            result = lines + result
+            index -= 1
+        return result
+
+    def linesFromAction(self, action):
+        '''
+        Returns a generator over the lines of the log, starting at the block of the action with the given (0-based)
+        number. The block is made up of the action's preconditions, the action, and its postconditions, and is
+        separated from other blocks by blank lines. Only the frames from the one containing that action onwards (and
+        the one before it, if the block started there) are decompressed. Yields nothing if the log has fewer actions.
+        '''
+        index = bisect.bisect_right(self.__firstActions, action) - 1
+        if index < 0:
+            return
+        lines = self.frameLines(index)
+        actionsSeen = self.frames[index].firstAction
+        blockStart = None       # The index of the first line of the current block, if it started in this frame
+        for i, line in enumerate(lines):
+            if line == "":
+                blockStart = i + 1
+            elif line.startswith("!"):
+                if actionsSeen == action:
+                    break
+                actionsSeen += 1
+        else:
+            return
+
+        if blockStart == None:
+            blockStart = 0
+            for line in self.__openBlock(index - 1):
+                yield line
+        for line in lines[blockStart:]:
+            yield line
+        for line in self.lines(index + 1):
+            yield line
+
+    def action(self, action):
+        '''
+        Returns a list of the lines in the block of the action with the given (0-based) number, from its preconditions
+        to its postconditions. Returns None if the log has fewer actions.
+        '''
+        block = []
+        for line in self.linesFromAction(action):
+            if line == "":
+                break
+            block.append(line)
+        return block if len(block) > 0 else None
+
+    def toText(self, textFilepath=None):
+        '''
+        Convert the log to the text format output by the Logger, and return the path of the text log. By default, the
+        text log is written next to the compressed log, without the compression extension.
+        '''
+        if textFilepath == None:
+            textFilepath = os.path.splitext(self.filepath)[0]
+        with open(textFilepath, "w+") as f:
+            f.write("\n".join(self.lines()))
+        return textFilepath
+
+class CompressedSink(LogSink):
+    '''
+    Streams the log to a file as a series of independently compressed frames, along with an index of where each frame
+    starts (see CompressedLog). A new frame is started at the blank line beginning the first action block after every
+    N actions, so that each block lies within a single frame. A frame is also written once it holds the maximum frame
+    size (in characters), or once the flush interval (in seconds) has passed since the last frame was written.
+    At most one frame is held in memory. Compressing frames takes time, so this sink is best run on a background
+    writer thread (see ThreadedSink).
+
+    Example usage:
+
+        logger = Logger()
+        logger.setSink(ThreadedSink(CompressedSink(compression="xz")))
+        ...
+        CompressedLog(logger.export()).action(100)
+    '''
+    def __init__(self, filepath=None, compression="gzip", actionsPerFrame=256, maxFrameSize=1 << 20, flushInterval=30.0):
+        LogSink.__init__(self)
+        if compression not in CompressedLog.Compressions:
+            raise Exception("Unsupported compression: {}".format(compression))
+        extension = ".log.gz" if compression == "gzip" else ".log.xz"
+        self.filepath = filepath if filepath != None else LogSink.defaultPath(extension=extension)   # The path of the file written to
+        self.__compression = compression            # The compression format of each frame
+        self.__actionsPerFrame = actionsPerFrame    # The number of actions after which a new frame is started at the next block
+        self.__maxFrameSize = maxFrameSize          # The number of characters after which a new frame is started
+        self.__flushInterval = flushInterval        # The maximum time (in seconds) between writes of a non-empty frame
+        self.__frame = []                           # Text of the current frame, including newline separators
+        self.__frameSize = 0                        # The number of characters in the current frame
+        self.__frameActions = 0                     # The number of actions in the current frame
+        self.__firstLine = 0                        # The number of lines before the current frame
+        self.__firstAction = 0                      # The number of actions before the current frame
+        self.__offset = 0                           # The number of bytes written to the log so far
+        self.__lastFlushTime = time.time()          # Time at which a frame was last written
+        self.frames = 0                             # The number of frames written
+
+        directory = os.path.dirname(self.filepath)
+        if directory != "" and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.__file = open(self.filepath, "wb+")
+        self.__index = open(self.filepath + CompressedLog.IndexExtension, "w+")
+        self.__index.write("{} {}\n".format(CompressedLog.IndexMagic, compression))
+
+    def append(self, template, *args):
+        line = template.format(*args)
+        isAction = line.startswith("!")
+        if line == "" and self.__frameActions >= self.__actionsPerFrame:
+            self.flush()
+
+        text = line if self.lineCount == 0 else "\n" + line
+        LogSink.append(self, template)
+        self.__frame.append(text)
+        self.__frameSize += len(text)
+        if isAction:
+            self.__frameActions += 1
+        if self.__frameSize >= self.__maxFrameSize:
+            self.flush()
+        else:
+            self.poll()
+
+    def poll(self):
+        '''
+        Write out the current frame if the flush interval has passed since a frame was last written.
+        '''
+        if self.__frameSize > 0 and time.time() - self.__lastFlushTime >= self.__flushInterval:
+            self.flush()
+
+    def flush(self):
+        '''
+        Immediately compress and write out the current frame, add it to the index, and flush both files to disk.
+        '''
+        if self.__file.closed:
+            return
+        if len(self.__frame) > 0:
+            data = "".join(self.__frame).encode("utf-8")
+            if self.__compression == "gzip":
+                data = gzip.compress(data, mtime=0)
+            else:
+                data = lzma.compress(data, format=lzma.FORMAT_XZ)
+            self.__file.write(data)
+            self.__index.write("{} {} {} {}\n".format(self.__offset, len(data), self.__firstLine, self.__firstAction))
+            self.__offset += len(data)
+            self.__firstLine = self.lineCount
+            self.__firstAction += self.__frameActions
+            self.__frame = []
+            self.__frameSize = 0
+            self.__frameActions = 0
+            self.frames += 1
+        self.__file.flush()
+        self.__index.flush()
+        self.__lastFlushTime = time.time()
+
+    def clear(self):
+        '''
+        Remove all lines from the log, truncating the log and its index.
+        '''
+        LogSink.clear(self)
+        self.__frame = []
+        self.__frameSize = 0
+        self.__frameActions = 0
+        self.__firstLine = 0
+        self.__firstAction = 0
+        self.__offset = 0
+        self.__file.seek(0)
+        self.__file.truncate()
+        self.__index.seek(0)
+        self.__index.truncate()
+        self.__index.write("{} {}\n".format(CompressedLog.IndexMagic, self.__compression))
+
+    def close(self):
+        '''
+        Write out the current frame and close the log and its index. No lines may be appended afterwards.
+        '''
+        if not self.__file.closed:
+            self.flush()
+            self.__file.close()
+            self.__index.close()
+
+    def export(self):
+        '''
+        Write out the current frame and close the log and its index, returning the path of the log.
+        '''
+        self.close()
+        return self.filepath
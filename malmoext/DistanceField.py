@@ -0,0 +1,103 @@
+# ==============================================================================================
+# This file contains functionality for computing the walking distance from every cell around a
+# target to that target, so that any number of agents can head towards it without searching.
+# ==============================================================================================
+import numpy
+
+class DistanceField:
+    '''
+    The number of steps needed to walk from each walkable cell of a region to a target cell, computed with a vectorized
+    breadth-first search. Steps are taken to any of the four horizontally adjacent cells, including one block up or
+    down. Once computed, the distance from any cell and the next step from any cell towards the target are read in
+    constant time.
+    '''
+    Unreachable = -1        # The distance of cells from which the target can not be reached
+
+    # The (dy, dz, dx) offset of each possible step
+    Steps = [(dy, dz, dx) for dz, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)) for dy in (0, 1, -1)]
+
+    def __init__(self, region, target, version):
+        self.region = region            # The PathPlanner.Region the field covers
+        self.target = target            # The (x,y,z) target cell
+        self.version = version          # The versions of the map chunks covering the region, as of when the field was last checked (see VoxelMap.chunkVersions)
+        self.distances = DistanceField.__search(region.walkable, region.toLocal(target))   # The distance of each cell to the target, shaped (Y, Z, X)
+
+    @staticmethod
+    def __shift(array, dy, dz, dx):
+        '''
+        Returns a copy of a boolean array moved by the given offset, filling uncovered cells with false.
+        '''
+        result = numpy.zeros_like(array)
+        height, depth, width = array.shape
+        result[max(dy, 0):height + min(dy, 0), max(dz, 0):depth + min(dz, 0), max(dx, 0):width + min(dx, 0)] = \
+            array[max(-dy, 0):height + min(-dy, 0), max(-dz, 0):depth + min(-dz, 0), max(-dx, 0):width + min(-dx, 0)]
+        return result
+
+    @staticmethod
+    def __search(walkable, target):
+        '''
+        Returns the number of steps from each cell to the target cell, or Unreachable. The search starts from the target
+        cell if it is walkable, or otherwise from any walkable cell within one block above or below it.
+        '''
+        distances = numpy.full(walkable.shape, DistanceField.Unreachable, dtype=numpy.int32)
+        if target == None:
+            return distances
+
+        frontier = numpy.zeros(walkable.shape, dtype=bool)
+        y, z, x = target
+        for ty in (y, y - 1, y + 1):
+            if 0 <= ty < walkable.shape[0] and walkable[ty, z, x]:
+                frontier[ty, z, x] = True
+                break
+        visited = frontier.copy()
+        distance = 0
+        while frontier.any():
+            distances[frontier] = distance
+            distance += 1
+            reached = numpy.zeros_like(frontier)
+            for dy, dz, dx in DistanceField.Steps:
+                reached |= DistanceField.__shift(frontier, dy, dz, dx)
+            frontier = reached & walkable & ~visited
+            visited |= frontier
+        return distances
+
+    def __index(self, cell):
+        '''
+        Returns the (y,z,x) index of the given (x,y,z) cell, or of the cell one block below or above it, from which the
+        target can be reached. Returns None if there is no such cell.
+        '''
+        x, y, z = cell
+        for cy in (y, y - 1, y + 1):
+            index = self.region.toLocal((x, cy, z))
+            if index != None and self.distances[index] != DistanceField.Unreachable:
+                return index
+        return None
+
+    def distance(self, cell):
+        '''
+        Returns the number of steps from the given (x,y,z) cell to the target, or None if the target can not be reached
+        from it. Cells one block above or below a reachable cell (such as those of a jumping agent) are treated as that
+        cell.
+        '''
+        index = self.__index(cell)
+        return int(self.distances[index]) if index != None else None
+
+    def nextStep(self, cell):
+        '''
+        Returns the (x,y,z) cell to step to from the given cell in order to get closer to the target, or None if the
+        given cell is the target or the target can not be reached from it.
+        '''
+        index = self.__index(cell)
+        if index == None:
+            return None
+        distance = self.distances[index]
+        if distance <= 0:
+            return None
+
+        height, depth, width = self.distances.shape
+        y, z, x = index
+        for dy, dz, dx in DistanceField.Steps:
+            ny, nz, nx = y + dy, z + dz, x + dx
+            if 0 <= ny < height and 0 <= nz < depth and 0 <= nx < width and self.distances[ny, nz, nx] == distance - 1:
+                return self.region.toWorld((ny, nz, nx))
+        return None
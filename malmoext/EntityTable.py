@@ -0,0 +1,204 @@
+# ==============================================================================================
+# This file contains functionality for querying the nearby entities observed by an agent using
+# vectorized NumPy operations.
+# ==============================================================================================
+import numpy
+from malmoext.Utils import Mobs, Items, Vector, Entity, EntityIds, TypeTable
+
+class EntityTable:
+    '''
+    A struct-of-arrays representation of the nearby entities observed by an agent on a single tick. The positions
+    of all entities are held in a single NumPy array, along with the type ID and category mask of each entity, so that
+    queries over all entities can be answered with vectorized operations. Entity tuples are only created for the
+    entities that are actually returned.
+    '''
+    # A map of the enumerated types that entities can be filtered by to the TypeTable category bit for each type
+    VariantCategories = {
+        Mobs.All: TypeTable.Mob,
+        Mobs.Peaceful: TypeTable.Peaceful,
+        Mobs.Hostile: TypeTable.Hostile,
+        Mobs.Food: TypeTable.FoodMob,
+        Items.All: TypeTable.Item,
+        Items.Food: TypeTable.FoodItem
+    }
+
+    MaxDistance = 1000000.0     # Entities at or beyond this distance are never considered to be closest
+
+    def __init__(self, entitiesJSON):
+        self.__json = entitiesJSON                  # The JSON representation of each entity, as output by Malmo
+        self.__entities = [None] * len(entitiesJSON) # Cache of the Entity tuple created for each entity
+        self.positions = numpy.array([(k["x"], k["y"], k["z"]) for k in entitiesJSON], dtype=numpy.float64).reshape(-1, 3)   # (x,y,z) position of each entity
+        self.types = TypeTable.ids([k["name"] for k in entitiesJSON])   # TypeTable ID of each entity
+        self.categories = TypeTable.Categories[self.types]              # TypeTable category mask of each entity
+        self.__spatialIndex = None                  # Spatial index over the entity positions, created once it is first needed
+
+    def __len__(self):
+        return len(self.__json)
+
+    def entity(self, index):
+        '''
+        Returns the Entity tuple for the entity at the given index of this table.
+        '''
+        entity = self.__entities[index]
+        if entity == None:
+            k = self.__json[index]
+            entity = Entity(EntityIds.intern(k["id"], k["name"]), k["name"], Vector(k["x"], k["y"], k["z"]), k.get("quantity"))
+            self.__entities[index] = entity
+        return entity
+
+    def entities(self):
+        '''
+        Returns a list of the Entity tuples for all entities in this table.
+        '''
+        return [self.entity(i) for i in range(0, len(self.__json))]
+
+    def mask(self, variant):
+        '''
+        Returns a boolean array that is true for each entity that is a member of the given enumerated type.
+        '''
+        if variant not in EntityTable.VariantCategories:
+            raise Exception("Entity variant must be an enumerated type")
+        return (self.categories & EntityTable.VariantCategories[variant]) != 0
+
+    def distances(self, position, indices=None, xzOnly=False):
+        '''
+        Returns an array containing the distance from the given (x,y,z) position to each entity, or to each entity at the
+        given indices. If xzOnly is set, only the x-axis and z-axis are taken into account.
+        '''
+        positions = self.positions if indices is None else self.positions[indices]
+        delta = positions - (position.x, position.y, position.z)
+        delta *= delta
+        if xzOnly:
+            return numpy.sqrt(delta[:, 0] + delta[:, 2])
+        return numpy.sqrt(delta[:, 0] + delta[:, 1] + delta[:, 2])
+
+    def spatialIndex(self):
+        '''
+        Returns the SpatialIndex over the positions of the entities in this table.
+        '''
+        if self.__spatialIndex == None:
+            self.__spatialIndex = SpatialIndex(self.positions)
+        return self.__spatialIndex
+
+    def __indicesWithin(self, position, radius, variant, xzOnly):
+        '''
+        Returns the indices of all entities within a distance of an (x,y,z) position, sorted by distance. Entities that
+        are equally distant are sorted in the order they were observed. Optionally filter by an enumerated type.
+        '''
+        indices = self.spatialIndex().candidates(position, radius)
+        if variant != None:
+            indices = indices[(self.categories[indices] & EntityTable.VariantCategories[variant]) != 0]
+        distances = self.distances(position, indices, xzOnly)
+        inRange = distances <= radius
+        indices = indices[inRange]
+        return indices[numpy.lexsort((indices, distances[inRange]))]
+
+    def within(self, position, radius, variant=None, xzOnly=False):
+        '''
+        Returns a list of all entities within a distance of an (x,y,z) position, sorted from closest to farthest.
+        Optionally filter by an enumerated type. If xzOnly is set, only the x-axis and z-axis are taken into account.
+        '''
+        if variant != None and variant not in EntityTable.VariantCategories:
+            raise Exception("Entity variant must be an enumerated type")
+        return [self.entity(int(i)) for i in self.__indicesWithin(position, radius, variant, xzOnly)]
+
+    def nearest(self, position, k, variant=None, xzOnly=False):
+        '''
+        Returns a list of the (up to) k closest entities to an (x,y,z) position, sorted from closest to farthest.
+        Optionally filter by an enumerated type. If xzOnly is set, only the x-axis and z-axis are taken into account.
+        '''
+        if variant != None and variant not in EntityTable.VariantCategories:
+            raise Exception("Entity variant must be an enumerated type")
+        if k <= 0 or len(self.__json) == 0:
+            return []
+
+        # Search within a growing radius until enough entities are found, or the radius covers all entities
+        index = self.spatialIndex()
+        radius = SpatialIndex.CellSize
+        maxRadius = index.maxDistance(position)
+        while True:
+            indices = self.__indicesWithin(position, radius, variant, xzOnly)
+            if len(indices) >= k or radius >= maxRadius:
+                return [self.entity(int(i)) for i in indices[:k]]
+            radius *= 2
+
+    def closest(self, position, variant):
+        '''
+        Returns the closest entity to an (x,y,z) position that is a member of the given enumerated type. If multiple
+        entities are equally close, the first one observed is returned. Returns None if there is no such entity.
+        '''
+        return self.closestByVariant(position, [variant])[variant]
+
+    def closestByVariant(self, position, variants):
+        '''
+        Returns a map of each of the given enumerated types to the closest entity to an (x,y,z) position that is a
+        member of that type (or None if there is no such entity). Distances are only computed once for all types.
+        '''
+        distances = self.distances(position)
+        inRange = distances < EntityTable.MaxDistance
+        result = {}
+        for variant in variants:
+            candidates = numpy.flatnonzero(self.mask(variant) & inRange)
+            if len(candidates) == 0:
+                result[variant] = None
+            else:
+                result[variant] = self.entity(int(candidates[numpy.argmin(distances[candidates])]))
+        return result
+
+class SpatialIndex:
+    '''
+    A uniform grid hash over the x-axis and z-axis of a set of (x,y,z) positions. Positions are bucketed into square
+    cells, so that only the cells overlapping a region need to be searched when looking for nearby positions.
+    '''
+    CellSize = 4.0      # The width of each grid cell, in blocks
+
+    def __init__(self, positions):
+        self.__positions = positions        # The (x,y,z) positions being indexed
+        self.__cells = {}                   # A map of (x,z) cell coordinates to the indices of all positions in each cell
+
+        if len(positions) == 0:
+            return
+        cellX = numpy.floor(positions[:, 0] / SpatialIndex.CellSize).astype(numpy.int64)
+        cellZ = numpy.floor(positions[:, 2] / SpatialIndex.CellSize).astype(numpy.int64)
+        order = numpy.lexsort((cellZ, cellX))
+        boundaries = numpy.flatnonzero((numpy.diff(cellX[order]) != 0) | (numpy.diff(cellZ[order]) != 0)) + 1
+        for indices in numpy.split(order, boundaries):
+            self.__cells[(int(cellX[indices[0]]), int(cellZ[indices[0]]))] = indices
+        self.__minimum = positions.min(axis=0)     # The smallest x, y and z values of any position
+        self.__maximum = positions.max(axis=0)     # The largest x, y and z values of any position
+
+    def candidates(self, position, radius):
+        '''
+        Returns an array containing the indices of all positions in the cells overlapping a square of the given radius
+        around an (x,y,z) position. This includes every position within that distance, along with some that are not.
+        '''
+        minX = int(numpy.floor((position.x - radius) / SpatialIndex.CellSize))
+        maxX = int(numpy.floor((position.x + radius) / SpatialIndex.CellSize))
+        minZ = int(numpy.floor((position.z - radius) / SpatialIndex.CellSize))
+        maxZ = int(numpy.floor((position.z + radius) / SpatialIndex.CellSize))
+
+        # For large regions, it is faster to go through the cells that exist than through every cell in the region
+        found = []
+        if (maxX - minX + 1) * (maxZ - minZ + 1) > len(self.__cells):
+            for (x, z), indices in self.__cells.items():
+                if minX <= x <= maxX and minZ <= z <= maxZ:
+                    found.append(indices)
+        else:
+            for x in range(minX, maxX + 1):
+                for z in range(minZ, maxZ + 1):
+                    indices = self.__cells.get((x, z))
+                    if indices is not None:
+                        found.append(indices)
+        if len(found) == 0:
+            return numpy.empty(0, dtype=numpy.int64)
+        return numpy.concatenate(found)
+
+    def maxDistance(self, position):
+        '''
+        Returns an upper bound on the distance from an (x,y,z) position to any indexed position.
+        '''
+        if len(self.__positions) == 0:
+            return 0.0
+        point = numpy.array([position.x, position.y, position.z])
+        farthest = numpy.maximum(numpy.abs(self.__minimum - point), numpy.abs(self.__maximum - point))
+        return float(numpy.sqrt(numpy.sum(farthest * farthest)))
@@ -0,0 +1,280 @@
+# ==============================================================================================
+# This file contains an in-process stand-in for the Malmo AgentHost, for exercising agents,
+# inventories, loggers and statistics without a running Minecraft client. Observations are
+# served in the same schema produced by the handlers requested in AgentBuilder.finish.
+# ==============================================================================================
+import json
+import math
+import random
+import uuid
+from malmoext.Utils import Vector, Mobs, Items, GRID_OBSERVATION_X_LEN, GRID_OBSERVATION_Y_LEN, GRID_OBSERVATION_Z_LEN, GRID_OBSERVATION_Y_HALF_LEN, NUMBER_OF_INVENTORY_SLOTS
+
+class FakeTimestampedString:
+    '''
+    Stand-in for a Malmo TimestampedString, holding the text of a single observation.
+    '''
+    def __init__(self, text, timestamp):
+        self.text = text                # The JSON text of the observation
+        self.timestamp = timestamp      # The tick at which the observation was produced
+
+class FakeWorldState:
+    '''
+    Stand-in for a Malmo WorldState, describing the observations received since the state was last obtained.
+    '''
+    def __init__(self, isMissionRunning, hasMissionBegun, observations):
+        self.is_mission_running = isMissionRunning
+        self.has_mission_begun = hasMissionBegun
+        self.observations = observations
+        self.number_of_observations_since_last_state = len(observations)
+        self.rewards = []
+        self.number_of_rewards_since_last_state = 0
+        self.video_frames = []
+        self.number_of_video_frames_since_last_state = 0
+        self.mission_control_messages = []
+        self.errors = []
+
+class FakeAgentHost:
+    '''
+    An in-process stand-in for a Malmo AgentHost. Observations are taken from a source, which may either be an
+    iterable of observations or a function accepting this host and returning the next observation. Each observation
+    may be given as a dictionary or as JSON text. The mission ends once the source runs out of observations (or the
+    function returns None). All commands received are recorded in order.
+
+    As in Malmo, getWorldState() returns and clears all observations received since it was last called, while
+    peekWorldState() leaves them in place. If autoTick is set, a new observation is received each time
+    getWorldState() is called. Otherwise, observations are only received when tick() is called.
+    '''
+    ContinuousCommands = set(["move", "strafe", "pitch", "turn", "jump", "crouch", "attack", "use"])    # Commands whose value persists until changed
+
+    def __init__(self, source, autoTick=True):
+        self.__source = source if callable(source) else iter(source)    # Where observations are obtained from
+        self.__autoTick = autoTick                                       # Whether or not to receive an observation per getWorldState() call
+        self.__observations = []                                         # Observations received since the world state was last obtained
+        self.__isMissionRunning = True                                   # Whether or not the mission is still running
+        self.__hasMissionBegun = True                                    # Whether or not the mission has begun
+        self.__continuousValues = {}                                     # A map of continuous commands to the last value received for each
+        self.__arguments = {}                                            # A map of command line argument names to their values
+        self.tickCount = 0                                               # The number of observations received so far
+        self.commands = []                                               # All commands received, in order
+
+    def tick(self, count=1):
+        '''
+        Receive the next observation(s) from the source. Has no effect once the mission has ended.
+        '''
+        for i in range(0, count):
+            if not self.__isMissionRunning:
+                return
+            if callable(self.__source):
+                observation = self.__source(self)
+            else:
+                observation = next(self.__source, None)
+            if observation == None:
+                self.__isMissionRunning = False
+                return
+            if not isinstance(observation, str):
+                observation = json.dumps(observation)
+            self.tickCount += 1
+            self.__observations.append(FakeTimestampedString(observation, self.tickCount))
+
+    def endMission(self):
+        '''
+        End the mission. No further observations will be received.
+        '''
+        self.__isMissionRunning = False
+
+    def getWorldState(self):
+        '''
+        Returns the world state, clearing any observations received since it was last obtained.
+        '''
+        if self.__autoTick:
+            self.tick()
+        worldState = FakeWorldState(self.__isMissionRunning, self.__hasMissionBegun, self.__observations)
+        self.__observations = []
+        return worldState
+
+    def peekWorldState(self):
+        '''
+        Returns the world state without clearing any observations received since it was last obtained.
+        '''
+        return FakeWorldState(self.__isMissionRunning, self.__hasMissionBegun, list(self.__observations))
+
+    def sendCommand(self, command, key=None):
+        '''
+        Record a command sent to the agent.
+        '''
+        self.commands.append(command)
+        parts = command.split(" ")
+        if len(parts) == 2 and parts[0] in FakeAgentHost.ContinuousCommands:
+            self.__continuousValues[parts[0]] = float(parts[1])
+
+    def continuousValue(self, command):
+        '''
+        Returns the last value received for a continuous command, such as 'move' or 'turn'. Returns 0 if the
+        command was never received.
+        '''
+        return self.__continuousValues.get(command, 0.0)
+
+    def startMission(self, *args):
+        '''
+        Start the mission. Missions served by this host are running from the moment it is created.
+        '''
+        self.__hasMissionBegun = True
+
+    def addOptionalStringArgument(self, name, description, default):
+        '''
+        Declare an optional command line argument, taking on its default value.
+        '''
+        self.__arguments[name.split(",")[0]] = default
+
+    def addOptionalFlag(self, name, description):
+        '''
+        Declare an optional command line flag, which is not set.
+        '''
+        self.__arguments[name.split(",")[0]] = False
+
+    def parse(self, argv):
+        '''
+        Parse the command line. Command line arguments are ignored by this host.
+        '''
+        pass
+
+    def receivedArgument(self, name):
+        '''
+        Returns true if the given command line argument or flag was set.
+        '''
+        return bool(self.__arguments.get(name))
+
+    def getStringArgument(self, name):
+        '''
+        Returns the value of a command line argument.
+        '''
+        return self.__arguments.get(name, "")
+
+    def getUsage(self):
+        '''
+        Returns the command line usage string.
+        '''
+        return ""
+
+class ObservationGenerator:
+    '''
+    Generates synthetic observations for a single agent standing on a flat world, in the schema produced by the
+    handlers requested in AgentBuilder.finish. The generator can be used as the source of a FakeAgentHost, in which
+    case the agent turns and walks according to the continuous commands received by the host.
+
+    Nearby entities are drawn at random (using the given seed) from the given entity types, which default to all
+    mobs and items. The inventory is filled with the given number of slots, drawn from the given item types.
+    '''
+    TickLength = 0.05           # Simulated length of a single tick, in seconds
+    TurnSpeed = 180.0           # Degrees turned per second at a turn or pitch rate of 1
+    WalkSpeed = 4.317           # Blocks walked per second at a move rate of 1
+    EntityRange = 25            # The maximum x and z distance of a nearby entity from the agent
+    GroundLevel = 4             # The height of the first air block above the ground
+
+    def __init__(self, name="Agent", position=Vector(0.5, 4, 0.5), numberOfEntities=0, numberOfInventorySlots=0, entityTypes=None, itemTypes=None, seed=0):
+        rng = random.Random(seed)
+        entityTypes = entityTypes if entityTypes != None else [x.value for x in Mobs.All] + [x.value for x in Items.All]
+        itemTypes = itemTypes if itemTypes != None else [x.value for x in Items.All]
+        self.name = name                                    # The name of the agent
+        self.position = position                            # The (x,y,z) position of the agent
+        self.pitch = 0.0                                    # The pitch of the agent, in degrees
+        self.yaw = 0.0                                      # The yaw of the agent, in degrees
+        self.mobsKilled = 0                                 # The number of mobs killed by the agent
+        self.ticks = 0                                      # The number of observations generated
+        self.entities = []                                  # The nearby entities, as JSON dictionaries
+        self.inventory = []                                 # The inventory slots in use, as JSON dictionaries
+        self.blockGrid = self.__flatGrid()                  # The block grid surrounding the agent
+
+        for i in range(0, numberOfEntities):
+            entityType = entityTypes[rng.randrange(len(entityTypes))]
+            entity = {
+                "yaw": 0.0,
+                "x": position.x + rng.uniform(-ObservationGenerator.EntityRange, ObservationGenerator.EntityRange),
+                "y": float(ObservationGenerator.GroundLevel),
+                "z": position.z + rng.uniform(-ObservationGenerator.EntityRange, ObservationGenerator.EntityRange),
+                "pitch": 0.0,
+                "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "motionX": 0.0,
+                "motionY": 0.0,
+                "motionZ": 0.0,
+                "name": entityType
+            }
+            if Items.All.isMember(entityType):
+                entity["quantity"] = rng.randint(1, 3)
+            else:
+                entity["life"] = 10.0
+            self.entities.append(entity)
+
+        for i in range(0, min(numberOfInventorySlots, NUMBER_OF_INVENTORY_SLOTS)):
+            self.inventory.append({"type": itemTypes[rng.randrange(len(itemTypes))], "index": i, "quantity": rng.randint(1, 64), "inventory": "inventory"})
+
+    @staticmethod
+    def __flatGrid():
+        '''
+        Returns the block grid observed by an agent standing on the ground of the default flat world.
+        '''
+        layer = GRID_OBSERVATION_X_LEN * GRID_OBSERVATION_Z_LEN
+        grid = []
+        for i in range(0, GRID_OBSERVATION_Y_LEN):
+            if i < GRID_OBSERVATION_Y_HALF_LEN - 1:
+                grid += ["dirt"] * layer
+            elif i < GRID_OBSERVATION_Y_HALF_LEN:
+                grid += ["grass"] * layer
+            else:
+                grid += ["air"] * layer
+        return grid
+
+    def __move(self, host):
+        '''
+        Advance the agent's orientation and position according to the continuous commands received by a host.
+        '''
+        turnAmount = ObservationGenerator.TurnSpeed * ObservationGenerator.TickLength
+        self.yaw = (self.yaw + host.continuousValue("turn") * turnAmount) % 360.0
+        self.pitch = max(-90.0, min(90.0, self.pitch + host.continuousValue("pitch") * turnAmount))
+        distance = host.continuousValue("move") * ObservationGenerator.WalkSpeed * ObservationGenerator.TickLength
+        yaw = math.radians(self.yaw)
+        self.position = Vector(self.position.x - math.sin(yaw) * distance, self.position.y, self.position.z + math.cos(yaw) * distance)
+
+    def observation(self):
+        '''
+        Returns the current observation as a dictionary.
+        '''
+        yaw = self.yaw if self.yaw <= 180.0 else self.yaw - 360.0
+        agentEntity = {"yaw": yaw, "x": self.position.x, "y": self.position.y, "z": self.position.z, "pitch": self.pitch,
+            "id": str(uuid.UUID(int=0)), "motionX": 0.0, "motionY": 0.0, "motionZ": 0.0, "life": 20.0, "name": self.name}
+        return {
+            "DistanceTravelled": 0,
+            "TimeAlive": self.ticks,
+            "MobsKilled": self.mobsKilled,
+            "PlayersKilled": 0,
+            "DamageTaken": 0,
+            "DamageDealt": 0,
+            "Life": 20.0,
+            "Score": 0,
+            "Food": 20,
+            "XP": 0,
+            "IsAlive": True,
+            "Air": 300,
+            "Name": self.name,
+            "XPos": self.position.x,
+            "YPos": self.position.y,
+            "ZPos": self.position.z,
+            "Pitch": self.pitch,
+            "Yaw": yaw,
+            "WorldTime": 6000 + self.ticks,
+            "TotalTime": self.ticks,
+            "inventoriesAvailable": [{"name": "inventory", "size": NUMBER_OF_INVENTORY_SLOTS + 1}],
+            "currentItemIndex": 0,
+            "inventory": self.inventory,
+            "blockgrid": self.blockGrid,
+            "nearby_entities": [agentEntity] + self.entities
+        }
+
+    def __call__(self, host):
+        '''
+        Returns the next observation as JSON text, after applying the commands received by the given host.
+        '''
+        if self.ticks > 0:
+            self.__move(host)
+        self.ticks += 1
+        return json.dumps(self.observation())
@@ -1,32 +1,46 @@
 import copy
+import threading
 from enum import Enum
-from malmoext.Utils import Item
+from malmoext.Utils import Item, EntityIds
 
 class Inventory:
     '''
     A representation of an agent's inventory.
     '''
-    __nextID = 1               # Global counter for uniquely identifying new items
     __dropItemRegistry = {}    # Map of item types to a list of known drop item IDs (used to preserve IDs between drop time & pickup time)
+    __registryLock = threading.Lock()   # Guards the drop item registry when agents are stepped concurrently
 
     @staticmethod
-    def __getNextID():
+    def registerDropItem(item):
         '''
-        Get the next ID to be used for defining an item, and increment the counter.
+        THIS METHOD SHOULD ONLY BE USED INTERNALLY BY THE AGENT. Register a drop item so that its ID will be preserved once an agent goes
+        to pick it up.
         '''
-        result = Inventory.__nextID
-        Inventory.__nextID += 1
-        return result
+        with Inventory.__registryLock:
+            if item.type not in Inventory.__dropItemRegistry:
+                Inventory.__dropItemRegistry[item.type] = []
+            Inventory.__dropItemRegistry[item.type].append(item)
 
     @staticmethod
-    def registerDropItem(item):
+    def unregisterDropItem(item):
         '''
-        THIS METHOD SHOULD ONLY BE USED INTERNALLY BY THE AGENT. Register a drop item so that its ID will be preserved once an agent goes
-        to pick it up.
+        THIS METHOD SHOULD ONLY BE USED INTERNALLY BY THE AGENT. Remove a drop item from the registry, once it is known
+        who picked it up. Returns true if the item was still registered, false otherwise.
+        '''
+        with Inventory.__registryLock:
+            if item.type not in Inventory.__dropItemRegistry or item not in Inventory.__dropItemRegistry[item.type]:
+                return False
+            Inventory.__dropItemRegistry[item.type].remove(item)
+            return True
+
+    @staticmethod
+    def clearDropItems():
+        '''
+        Remove every drop item from the registry. Called at the start of each mission, along with EntityIds.reset(),
+        since the IDs of items dropped in an earlier mission may be handed out again.
         '''
-        if item.type not in Inventory.__dropItemRegistry:
-            Inventory.__dropItemRegistry[item.type] = []
-        Inventory.__dropItemRegistry[item.type].append(item)
+        with Inventory.__registryLock:
+            Inventory.__dropItemRegistry = {}
 
     def __init__(self, agent):
         self.__agent = agent        # A reference to the agent whos inventory this represents
@@ -109,10 +123,12 @@ class Inventory:
 
         # If ID was not given, search for a known one in the registry, or generate one from scratch
         if itemID == None:
-            if itemType in Inventory.__dropItemRegistry and len(Inventory.__dropItemRegistry[itemType]) != 0:
-                itemID = Inventory.__dropItemRegistry[itemType].pop(0).id
-            else:    
-                itemID = "{}{}".format(itemType, Inventory.__getNextID())
+            with Inventory.__registryLock:
+                if itemType in Inventory.__dropItemRegistry and len(Inventory.__dropItemRegistry[itemType]) != 0:
+                    itemID = Inventory.__dropItemRegistry[itemType].pop(0).id
+            if itemID == None:
+                # Items share a counter with observed entities so that their IDs never collide
+                _, itemID = EntityIds.nextAlias(itemType)
 
         newItem = Item(itemID, itemType)
         if itemType in self.__map:
@@ -181,6 +197,22 @@ class Inventory:
         else:
             return len(self.__map[itemType])
 
+    def observedAmountOfItem(self, itemType):
+        '''
+        Returns the amount of items for the given type in the agent's inventory as last observed by Malmo, which
+        may differ from this inventory until it is synchronized.
+        '''
+        # If type was given as an Enum, convert it to string
+        if isinstance(itemType, Enum):
+            itemType = itemType.value
+
+        json = self.__agent.toJSON()["inventory"]
+        amount = 0
+        for item in json:
+            if item["type"] == itemType:
+                amount += item["quantity"]
+        return amount
+
     def nextUnusedHotbarIndex(self):
         '''
         Returns the inventory slot index of the first hotbar slot found to not be containing
@@ -0,0 +1,259 @@
+# ==============================================================================================
+# This file contains a reader for the text logs output by the Logger, which memory-maps a log and
+# indexes its lines so that analysis queries do not need to scan the whole file.
+# ==============================================================================================
+import os
+import mmap
+import numpy
+from collections import namedtuple
+
+class LogReader:
+    '''
+    Reads a text log output by the Logger. The log is memory-mapped, and the byte offset of each line is indexed by its
+    predicate (the part before the first '-', such as 'at' or '!ATTACK'), by each entity ID among its arguments, and,
+    for actions (lines starting with '!'), by the order in which the actions occurred. Queries then read only the
+    lines they return.
+
+    Arguments are separated by '-', but may also contain it (as agent IDs may). Lines with more fields than their
+    predicate takes arguments are split using the IDs defined earlier in the log, and any fields that still can not
+    be told apart are left to the last argument.
+
+    Building the index takes one pass over the log. The index is saved next to the log, named by adding the
+    IndexExtension, and is reused by later readers for as long as the log is unchanged.
+
+    Example usage:
+
+        reader = LogReader("logs/mission.log")
+        attacks = reader.query("!ATTACK", "Alpha", argument=0)         # All attacks by agent Alpha
+        mentions = reader.query(entity="beef12", isAction=False)       # Every state line mentioning item beef12
+    '''
+    IndexExtension = ".lidx"    # The extension added to the path of a log to get the path of its index
+    IndexVersion = 2            # Increases whenever the format of saved indexes changes
+    Record = namedtuple("LogRecord", "offset predicate args")    # A line of the log, split into its predicate and a list of its arguments
+
+    # The number of arguments of each predicate written by the Logger
+    Arities = {"none": 2, "agents": 2, "mobs": 2, "items": 2, "status": 2, "at": 2, "looking_at": 2, "equipped_item": 2,
+        "closest_mob": 2, "closest_peaceful_mob": 2, "closest_hostile_mob": 2, "closest_food_mob": 2, "closest_item": 2,
+        "closest_food_item": 2, "!LOOKAT": 3, "!MOVETO": 3, "!PICKUPITEM": 2, "!ATTACK": 2, "!CRAFT": 2, "!EQUIP": 2,
+        "!GIVEITEM": 3, "START": 0, "END": 0}
+    ByteArities = {key.encode("utf-8"): value for key, value in Arities.items()}
+
+    def __init__(self, filepath, saveIndex=True):
+        self.filepath = filepath        # The path of the log
+        self.__file = open(filepath, "rb")
+        size = os.fstat(self.__file.fileno()).st_size
+        self.__data = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ) if size > 0 else b""   # The memory-mapped contents of the log
+        self.__predicates = {}          # A map of predicates to a sorted array of the offsets of the lines with each predicate
+        self.__entities = {}            # A map of entity IDs to a sorted array of the offsets of the lines mentioning each entity
+        self.__actions = None           # A sorted array of the offsets of all action lines
+        self.__hyphenatedIds = set()    # The IDs defined in the log that contain a '-'
+
+        if not self.__loadIndex():
+            self.__buildIndex()
+            if saveIndex:
+                self.__saveIndex()
+
+    def close(self):
+        '''
+        Unmap and close the log. No queries may be made afterwards.
+        '''
+        if isinstance(self.__data, mmap.mmap):
+            self.__data.close()
+        self.__file.close()
+
+    def __logVersion(self):
+        '''
+        Returns an array identifying the current contents of the log, stored with its index to detect when the index
+        has become stale.
+        '''
+        stat = os.stat(self.filepath)
+        return numpy.array([LogReader.IndexVersion, stat.st_size, stat.st_mtime_ns], dtype=numpy.int64)
+
+    def __buildIndex(self):
+        '''
+        Index the byte offset of every line of the log, in a single pass.
+        '''
+        data = self.__data
+        predicates = {}
+        entities = {}
+        actions = []
+        offset = 0
+        while offset < len(data):
+            end = data.find(b"\n", offset)
+            if end == -1:
+                end = len(data)
+            line = data[offset:end].rstrip(b"\r")
+            if len(line) > 0:
+                fields = line.split(b"-")
+                if len(fields) - 1 > LogReader.ByteArities.get(fields[0], len(fields)):
+                    predicate, args = self.__split(line.decode("utf-8"))
+                    fields = [field.encode("utf-8") for field in [predicate] + args]
+                predicates.setdefault(fields[0], []).append(offset)
+                if line[0] == 0x21:     # '!'
+                    actions.append(offset)
+                for entity in set(fields[1:]):
+                    if entity != b"None":
+                        entities.setdefault(entity, []).append(offset)
+            offset = end + 1
+
+        # Offsets into logs under 4 GiB fit in 32 bits, halving the size of the index
+        dtype = numpy.uint32 if len(data) < (1 << 32) else numpy.int64
+        self.__predicates = {key.decode("utf-8"): numpy.array(value, dtype=dtype) for key, value in predicates.items()}
+        self.__entities = {key.decode("utf-8"): numpy.array(value, dtype=dtype) for key, value in entities.items()}
+        self.__actions = numpy.array(actions, dtype=dtype)
+
+    def __split(self, line):
+        '''
+        Returns the predicate of a line and a list of its arguments, which may themselves contain a '-'. IDs defined
+        by the line are remembered, so that lines using them later on can be split.
+        '''
+        fields = line.split("-")
+        predicate = fields[0]
+        args = fields[1:]
+        arity = LogReader.Arities.get(predicate)
+        if arity == None or arity == 0 or len(args) <= arity:
+            return predicate, args
+
+        if predicate == "agents":
+            args = ["-".join(args[:-1]), args[-1]]
+        elif (predicate == "mobs" or predicate == "items") and len(args) % 2 == 0:
+            # Mob and item IDs are their type followed by a number, so hold as many '-' as their type does
+            half = len(args) // 2
+            args = ["-".join(args[:half]), "-".join(args[half:])]
+        else:
+            # Join the longest runs of fields that make up a known ID
+            joined = []
+            i = 0
+            while i < len(args):
+                end = i + 1
+                for j in range(len(args), i + 1, -1):
+                    if "-".join(args[i:j]) in self.__hyphenatedIds:
+                        end = j
+                        break
+                joined.append("-".join(args[i:end]))
+                i = end
+            args = joined[:arity - 1] + ["-".join(joined[arity - 1:])]
+
+        if predicate in ("agents", "mobs", "items"):
+            self.__hyphenatedIds.add(args[0])
+        return predicate, args
+
+    @staticmethod
+    def __pack(table):
+        '''
+        Returns the keys of a map of names to offset arrays, the number of offsets for each key, and all offsets joined
+        into a single array.
+        '''
+        keys = list(table.keys())
+        counts = numpy.array([len(table[key]) for key in keys], dtype=numpy.int64)
+        offsets = numpy.concatenate([table[key] for key in keys]) if len(keys) > 0 else numpy.zeros(0, dtype=numpy.uint32)
+        return numpy.array(keys, dtype=str), counts, offsets
+
+    @staticmethod
+    def __unpack(keys, counts, offsets):
+        '''
+        Returns the map of names to offset arrays packed by __pack().
+        '''
+        return dict(zip(keys.tolist(), numpy.split(offsets, numpy.cumsum(counts)[:-1]) if len(keys) > 0 else []))
+
+    def __saveIndex(self):
+        '''
+        Save the index next to the log. Failing to save the index (e.g. due to a read-only directory) is not an error.
+        '''
+        predicateKeys, predicateCounts, predicateOffsets = LogReader.__pack(self.__predicates)
+        entityKeys, entityCounts, entityOffsets = LogReader.__pack(self.__entities)
+        try:
+            with open(self.filepath + LogReader.IndexExtension, "wb") as f:
+                numpy.savez(f, version=self.__logVersion(), actions=self.__actions,
+                    predicateKeys=predicateKeys, predicateCounts=predicateCounts, predicateOffsets=predicateOffsets,
+                    entityKeys=entityKeys, entityCounts=entityCounts, entityOffsets=entityOffsets,
+                    hyphenatedIds=numpy.array(sorted(self.__hyphenatedIds), dtype=str))
+        except OSError:
+            pass
+
+    def __loadIndex(self):
+        '''
+        Load the index saved next to the log. Returns false if there is no index, or if it is out of date.
+        '''
+        try:
+            with numpy.load(self.filepath + LogReader.IndexExtension, allow_pickle=False) as index:
+                if not numpy.array_equal(index["version"], self.__logVersion()):
+                    return False
+                self.__actions = index["actions"]
+                self.__predicates = LogReader.__unpack(index["predicateKeys"], index["predicateCounts"], index["predicateOffsets"])
+                self.__entities = LogReader.__unpack(index["entityKeys"], index["entityCounts"], index["entityOffsets"])
+                self.__hyphenatedIds = set(index["hyphenatedIds"].tolist())
+                return True
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def predicates(self):
+        '''
+        Returns a map of every predicate in the log to the number of lines with that predicate.
+        '''
+        return {predicate: len(offsets) for predicate, offsets in self.__predicates.items()}
+
+    def entities(self):
+        '''
+        Returns a map of every entity ID in the log to the number of lines mentioning that entity.
+        '''
+        return {entity: len(offsets) for entity, offsets in self.__entities.items()}
+
+    def actionCount(self):
+        '''
+        Returns the number of actions in the log.
+        '''
+        return len(self.__actions)
+
+    def line(self, offset):
+        '''
+        Returns the text of the line starting at the given byte offset.
+        '''
+        end = self.__data.find(b"\n", offset)
+        return self.__data[offset:end if end != -1 else len(self.__data)].rstrip(b"\r").decode("utf-8")
+
+    def record(self, offset):
+        '''
+        Returns the LogReader.Record for the line starting at the given byte offset.
+        '''
+        predicate, args = self.__split(self.line(offset))
+        return LogReader.Record(offset, predicate, args)
+
+    def action(self, index):
+        '''
+        Returns the LogReader.Record for the action with the given (0-based) number.
+        '''
+        return self.record(int(self.__actions[index]))
+
+    def offsets(self, predicate=None, entity=None, isAction=None):
+        '''
+        Returns a sorted array of the offsets of the lines with the given predicate, mentioning the given entity ID, and
+        being an action or not, as given. At least one of the predicate or entity must be given.
+        '''
+        empty = numpy.zeros(0, dtype=self.__actions.dtype)
+        if predicate == None and entity == None:
+            raise Exception("A predicate or entity must be given to query the log")
+        if predicate != None:
+            result = self.__predicates.get(predicate, empty)
+            if entity != None:
+                result = numpy.intersect1d(result, self.__entities.get(entity, empty), assume_unique=True)
+        else:
+            result = self.__entities.get(entity, empty)
+
+        if isAction == True:
+            result = numpy.intersect1d(result, self.__actions, assume_unique=True)
+        elif isAction == False:
+            result = numpy.setdiff1d(result, self.__actions, assume_unique=True)
+        return result
+
+    def query(self, predicate=None, entity=None, argument=None, isAction=None):
+        '''
+        Returns a list of LogReader.Records for the lines with the given predicate (e.g. '!ATTACK' or 'at'), mentioning
+        the given entity ID, and being an action or not, as given, in the order they appear in the log. If an argument
+        index is given, the entity must be that argument of the line (e.g. 0 for the agent performing an action). At
+        least one of the predicate or entity must be given.
+        '''
+        records = [self.record(int(offset)) for offset in self.offsets(predicate, entity, isAction)]
+        if argument != None and entity != None:
+            records = [record for record in records if len(record.args) > argument and record.args[argument] == entity]
+        return records
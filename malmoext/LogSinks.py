@@ -0,0 +1,212 @@
+# ==============================================================================================
+# This file contains the destinations that a Logger writes its lines to, either holding the whole
+# log in memory until it is exported, or streaming it to disk as the mission runs.
+# ==============================================================================================
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from malmoext.BackgroundWriter import BackgroundWriter
+
+class LogSink(ABC):
+    '''
+    A destination for the lines of a log. Each line is given as a template and the arguments to format it with, so
+    that formatting can be left to the sink. Lines are separated by newlines, with no newline after the last line.
+    Subclasses must implement export(), and extend append() and clear() to hold or write the lines themselves.
+    '''
+    def __init__(self):
+        self.lineCount = 0          # The number of lines appended since the sink was created or cleared
+        self.lastTemplate = None    # The template of the last line appended, or None if there is none
+
+    @staticmethod
+    def defaultPath(directory="logs", extension=".log"):
+        '''
+        Returns the path of a file in the given directory, named with the current timestamp.
+        '''
+        filename = datetime.fromtimestamp(time.time()).strftime("%m_%d_%Y_%H_%M_%S") + extension
+        return os.path.join(directory, filename)
+
+    def append(self, template, *args):
+        '''
+        Add a line onto the end of the log, formatted from a template and its arguments.
+        '''
+        self.lineCount += 1
+        self.lastTemplate = template
+
+    def clear(self):
+        '''
+        Remove all lines from the log.
+        '''
+        self.lineCount = 0
+        self.lastTemplate = None
+
+    def poll(self):
+        '''
+        Called once per mission loop iteration, so that sinks can do any periodic work. Does nothing by default.
+        '''
+        pass
+
+    @abstractmethod
+    def export(self):
+        '''
+        Make sure the full log is on disk, and return the path of the file it was written to.
+        '''
+        pass
+
+class MemorySink(LogSink):
+    '''
+    Holds every line of the log in memory, writing them all to a timestamped file when exported. This is the default
+    sink of a Logger.
+    '''
+    def __init__(self):
+        LogSink.__init__(self)
+        self.__lines = []       # The log contents, split by line
+
+    def append(self, template, *args):
+        LogSink.append(self, template)
+        self.__lines.append(template.format(*args))
+
+    def clear(self):
+        LogSink.clear(self)
+        self.__lines = []
+
+    def lines(self):
+        '''
+        Returns a list of all lines in the log.
+        '''
+        return list(self.__lines)
+
+    def export(self):
+        '''
+        Write the log to a new file in a 'logs' directory, named with the current timestamp, and return its path.
+        '''
+        filepath = LogSink.defaultPath()
+        directory = os.path.dirname(filepath)
+        if not os.path.isdir(directory):
+            os.mkdir(directory)
+        with open(filepath, "w+") as f:
+            f.write("\n".join(self.__lines))
+        return filepath
+
+class FileSink(LogSink):
+    '''
+    Streams the log to a file as it is produced, holding at most a bounded amount of it in memory. Buffered lines are
+    written out once they exceed the maximum buffer size (in characters), or once the flush interval (in seconds) has
+    passed since the last write, whichever comes first. Only the lines still in the buffer can be lost if the mission
+    crashes. The finished file is identical to the one written by exporting a MemorySink.
+
+    Example usage:
+
+        logger = Logger()
+        logger.setSink(FileSink())
+    '''
+    def __init__(self, filepath=None, maxBufferSize=1 << 20, flushInterval=5.0):
+        LogSink.__init__(self)
+        self.filepath = filepath if filepath != None else LogSink.defaultPath()    # The path of the file written to
+        self.__maxBufferSize = maxBufferSize    # The maximum number of characters held in the buffer before it is written out
+        self.__flushInterval = flushInterval    # The maximum time (in seconds) between writes of a non-empty buffer
+        self.__buffer = []                      # Text appended since the last write, including newline separators
+        self.__bufferSize = 0                   # The number of characters in the buffer
+        self.__lastFlushTime = time.time()      # Time at which the buffer was last written out
+        self.flushes = 0                        # The number of times the buffer was written out
+
+        directory = os.path.dirname(self.filepath)
+        if directory != "" and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.__file = open(self.filepath, "w+")
+
+    def append(self, template, *args):
+        line = template.format(*args)
+        text = line if self.lineCount == 0 else "\n" + line
+        LogSink.append(self, template)
+        self.__buffer.append(text)
+        self.__bufferSize += len(text)
+        if self.__bufferSize >= self.__maxBufferSize:
+            self.flush()
+        else:
+            self.poll()
+
+    def poll(self):
+        '''
+        Write out the buffer if the flush interval has passed since it was last written.
+        '''
+        if self.__bufferSize > 0 and time.time() - self.__lastFlushTime >= self.__flushInterval:
+            self.flush()
+
+    def flush(self):
+        '''
+        Immediately write out the buffer and flush the file to disk.
+        '''
+        if self.__file.closed:
+            return
+        if self.__bufferSize > 0:
+            self.__file.write("".join(self.__buffer))
+            self.__buffer = []
+            self.__bufferSize = 0
+            self.flushes += 1
+        self.__file.flush()
+        self.__lastFlushTime = time.time()
+
+    def clear(self):
+        '''
+        Remove all lines from the log, truncating the file.
+        '''
+        LogSink.clear(self)
+        self.__buffer = []
+        self.__bufferSize = 0
+        self.__file.seek(0)
+        self.__file.truncate()
+
+    def close(self):
+        '''
+        Write out the buffer and close the file. No lines may be appended afterwards.
+        '''
+        if not self.__file.closed:
+            self.flush()
+            self.__file.close()
+
+    def export(self):
+        '''
+        Write out the buffer and close the file, returning its path.
+        '''
+        self.close()
+        return self.filepath
+
+class ThreadedSink(LogSink):
+    '''
+    Hands the lines of a log to a BackgroundWriter, so that another sink formats and writes them on the writer thread
+    rather than on the mission loop thread. If no writer is given, one is created for this sink alone and closed once
+    the log is exported. Lines are never dropped, whatever the writer's drop policy, since a gap would corrupt the
+    sequence of actions and states in the log. A full queue therefore holds up the mission loop until there is room.
+
+    Example usage:
+
+        logger = Logger()
+        logger.setSink(ThreadedSink(FileSink()))
+    '''
+    def __init__(self, sink, writer=None):
+        LogSink.__init__(self)
+        self.__sink = sink                                              # The sink that lines are written to on the writer thread
+        self.__ownsWriter = writer == None                              # Whether or not the writer was created by this sink
+        self.__writer = writer if writer != None else BackgroundWriter()    # The writer that lines are handed to
+
+    def append(self, template, *args):
+        LogSink.append(self, template)
+        self.__writer.submit(self.__sink.append, template, *args)
+
+    def clear(self):
+        LogSink.clear(self)
+        self.__writer.submit(self.__sink.clear)
+
+    def poll(self):
+        self.__writer.submit(self.__sink.poll)
+
+    def export(self):
+        '''
+        Wait for every line to be written, then export the wrapped sink and return its path.
+        '''
+        self.__writer.flush()
+        filepath = self.__sink.export()
+        if self.__ownsWriter:
+            self.__writer.close()
+        return filepath
@@ -1,19 +1,19 @@
-import os
-import time
 from enum import Enum
-from datetime import datetime
-from malmoext.Utils import Mobs, Items, LogUtils
+from malmoext.LogSinks import MemorySink
+from malmoext.Utils import Mobs, Items, TypeTable, LogUtils
 from malmoext.Agent import Agent
 
 class Logger:
     '''
     Produces state and action information for agents operating in a mission.
-    The results can be output to a file at the end of the mission.
+    The results can be output to a file at the end of the mission, or streamed to a file as the
+    mission runs by setting a FileSink.
     '''
     def __init__(self):
-        self.__log = []                         # The log contents, split by line
+        self.__sink = MemorySink()              # The sink that log lines are written to
         self.__currentState = Logger.State()    # Representation of the current state
         self.__logFlags = {}                    # A map of agent IDs to the logging flags for each agent
+        self.__executor = None                  # Optional TickExecutor used to fetch observations for all agents concurrently
 
     def setLoggingLevel(self, agent, *flags):
         '''
@@ -24,6 +24,21 @@ class Logger:
         for flag in flags:
             self.__logFlags[agent.id] |= flag.value
 
+    def setExecutor(self, executor):
+        '''
+        Set a TickExecutor used to fetch the observations and log reports of all agents concurrently on each update.
+        Log reports are still handled in agent order, so the log is identical to that of a serial update. Passing None
+        restores serial updates.
+        '''
+        self.__executor = executor
+
+    def setSink(self, sink):
+        '''
+        Set the LogSink that log lines are written to, such as a FileSink that streams the log to disk with bounded
+        memory. Should be called before the logger is started. By default, the log is held in memory until exported.
+        '''
+        self.__sink = sink
+
     def __hasLoggingLevel(self, agent, flag):
         '''
         Returns true if the given bitmask was set as the logging level for a particular agent.
@@ -34,24 +49,23 @@ class Logger:
         '''
         Clear the log of all its contents.
         '''
-        self.__log = []
+        self.__sink.clear()
 
-    def __appendLine(self, line):
+    def __appendLine(self, template, *args):
         '''
-        Add a new statement onto the log.
+        Add a new statement onto the log, formatted from a template and its arguments. Formatting is left to the sink.
         '''
-        self.__log.append(line)
+        self.__sink.append(template, *args)
 
     def __appendNewline(self):
         '''
         Add a blank line onto the log. If the previous line was already a blank line, this method
         has no effect.
         '''
-        length = len(self.__log)
-        if length == 0:
+        if self.__sink.lineCount == 0:
             return
-        if self.__log[length - 1] != "":
-            self.__log.append("")
+        if self.__sink.lastTemplate != "":
+            self.__sink.append("")
 
     def start(self):
         '''
@@ -72,10 +86,10 @@ class Logger:
             agentMetadata = self.__currentState.agents[agent.id]
 
             # Log where agent is looking (initially None)
-            self.__appendLine("looking_at-{}-None".format(agent.id))
+            self.__appendLine("looking_at-{}-None", agent.id)
 
             # Log where agent is at (initially None)
-            self.__appendLine("at-{}-None".format(agent.id))
+            self.__appendLine("at-{}-None", agent.id)
             
             # Agent inventory
             agent.inventory.sync()
@@ -83,30 +97,23 @@ class Logger:
             inventoryItems = agent.inventory.asList()
             for item in inventoryItems:
                 self.__logItem(item)
-                self.__appendLine("at-{}-{}".format(item.id, agent.id))
+                self.__appendLine("at-{}-{}", item.id, agent.id)
             equippedItem = agent.inventory.equippedItem()
             equippedID = equippedItem.id if equippedItem != None else "None"
-            self.__appendLine("equipped_item-{}-{}".format(agent.id, equippedID))
+            self.__appendLine("equipped_item-{}-{}", agent.id, equippedID)
             agentMetadata.equippedItem = equippedItem
 
             # Nearby entities to this agent
             self.__logEntities(agent.nearbyEntities())
 
-            # Log closest mobs
-            agentMetadata.closestMob[Mobs.All] = agent.closestMob()
-            self.__logClosestMob(agent, agentMetadata.closestMob[Mobs.All])
-            agentMetadata.closestMob[Mobs.Peaceful] = agent.closestMob(Mobs.Peaceful)
-            self.__logClosestMob(agent, agentMetadata.closestMob[Mobs.Peaceful], Mobs.Peaceful)
-            agentMetadata.closestMob[Mobs.Hostile] = agent.closestMob(Mobs.Hostile)
-            self.__logClosestMob(agent, agentMetadata.closestMob[Mobs.Hostile], Mobs.Hostile)
-            agentMetadata.closestMob[Mobs.Food] = agent.closestMob(Mobs.Food)
-            self.__logClosestMob(agent, agentMetadata.closestMob[Mobs.Food], Mobs.Food)
-
-            # Log closest items
-            agentMetadata.closestItem[Items.All] = agent.closestItem()
-            self.__logClosestItem(agent, agentMetadata.closestItem[Items.All])
-            agentMetadata.closestItem[Items.Food] = agent.closestItem(Items.Food)
-            self.__logClosestItem(agent, agentMetadata.closestItem[Items.Food], Items.Food)
+            # Log closest mobs and items
+            closest = agent.closestByVariant()
+            for variant in Agent.MobVariants:
+                agentMetadata.closestMob[variant] = closest[variant]
+                self.__logClosestMob(agent, closest[variant], variant)
+            for variant in Agent.ItemVariants:
+                agentMetadata.closestItem[variant] = closest[variant]
+                self.__logClosestItem(agent, closest[variant], variant)
 
             # Add agent metadata to the current state
             self.__currentState.agents[agent.id] = agentMetadata
@@ -144,18 +151,18 @@ class Logger:
             self.__logAgent(agent, True)
 
             # Log where agent is looking (from metadata)
-            self.__appendLine("looking_at-{}-{}".format(agent.id, agentMetadata.lookingAt.id if agentMetadata.lookingAt != None else "None"))
+            self.__appendLine("looking_at-{}-{}", agent.id, agentMetadata.lookingAt.id if agentMetadata.lookingAt != None else "None")
 
             # Log where the agent is at (from metadata)
-            self.__appendLine("at-{}-{}".format(agent.id, agentMetadata.at.id if agentMetadata.at != None else "None"))
+            self.__appendLine("at-{}-{}", agent.id, agentMetadata.at.id if agentMetadata.at != None else "None")
 
             # Log agent inventory (from metadata)
             for item in list(agentMetadata.inventory.values()):
                 allItemsInInventory[item.id] = item
-                self.__appendLine("at-{}-{}".format(item.id, agent.id))
+                self.__appendLine("at-{}-{}", item.id, agent.id)
             equippedItem = agentMetadata.equippedItem
             equippedId = equippedItem.id if equippedItem != None else "None"
-            self.__appendLine("equipped_item-{}-{}".format(agent.id, equippedId))
+            self.__appendLine("equipped_item-{}-{}", agent.id, equippedId)
 
             # Log closest mobs (from metadata)
             self.__logClosestMob(agent, agentMetadata.closestMob[Mobs.All])
@@ -170,7 +177,7 @@ class Logger:
         # For any items that were not a part of an agent's inventory, log their location as 'None'
         for item in allItems:
             if item.id not in allItemsInInventory:
-                self.__appendLine("at-{}-None".format(item.id))
+                self.__appendLine("at-{}-None", item.id)
 
     def __logIsAlive(self, entity, isAlive, force=False):
         '''
@@ -180,12 +187,12 @@ class Logger:
         entityId = entity.id
         if isAlive:
             if force or entityId not in self.__currentState.alive:
-                self.__appendLine("status-{}-alive".format(entityId))
+                self.__appendLine("status-{}-alive", entityId)
                 self.__currentState.alive.add(entityId)
                 self.__currentState.dead.discard(entityId)
         else:
             if force or entityId not in self.__currentState.dead:
-                self.__appendLine("status-{}-dead".format(entityId))
+                self.__appendLine("status-{}-dead", entityId)
                 self.__currentState.dead.add(entityId)
                 self.__currentState.alive.discard(entityId)
 
@@ -198,7 +205,7 @@ class Logger:
             return
 
         # Add to log
-        self.__appendLine("agents-{}-Agent".format(agent.id))
+        self.__appendLine("agents-{}-Agent", agent.id)
         isAlive = agent.isAlive()
         self.__logIsAlive(agent, isAlive, force)
         
@@ -218,7 +225,7 @@ class Logger:
             return
 
         # Add to log
-        self.__appendLine("mobs-{}-{}".format(mob.id, mob.type))
+        self.__appendLine("mobs-{}-{}", mob.id, mob.type)
         isAlive = True if mob.id not in self.__currentState.dead else False
         self.__logIsAlive(mob, isAlive, force)
 
@@ -238,7 +245,7 @@ class Logger:
             return
         
         # Add to log
-        self.__appendLine("items-{}-{}".format(item.id, item.type))
+        self.__appendLine("items-{}-{}", item.id, item.type)
         
         # Update current state
         self.__currentState.items[item.id] = item
@@ -250,9 +257,11 @@ class Logger:
         '''
         if isinstance(entity, Agent):
             self.__logAgent(entity, force)
-        elif Mobs.All.isMember(entity.type):
+            return
+        categories = TypeTable.categoriesOf(entity.type)
+        if categories & TypeTable.Mob:
             self.__logMob(entity, force)
-        elif Items.All.isMember(entity.type):
+        elif categories & TypeTable.Item:
             self.__logItem(entity, force)
 
     def __logEntities(self, entities, force=False):
@@ -288,7 +297,7 @@ class Logger:
             raise Exception("Closest mob variant must be an enumerated type")
 
         mobID = mob.id if mob != None else "None"
-        self.__appendLine("{}{}-{}".format(prefix, agent.id, mobID))
+        self.__appendLine("{}{}-{}", prefix, agent.id, mobID)
 
     def __logClosestItem(self, agent, item, variant=Items.All):
         '''
@@ -307,7 +316,7 @@ class Logger:
             raise Exception("Closest item variant must be an enumerated type")
 
         itemID = item.id if item != None else "None"
-        self.__appendLine("{}{}-{}".format(prefix, agent.id, itemID))
+        self.__appendLine("{}{}-{}", prefix, agent.id, itemID)
 
     def __logLookAt(self, agent, fromEntity, toEntity):
         '''
@@ -321,10 +330,10 @@ class Logger:
         # Preconditions - None
 
         # Action
-        self.__appendLine("!LOOKAT-{}-{}-{}".format(agent.id, fromID, toID))
+        self.__appendLine("!LOOKAT-{}-{}-{}", agent.id, fromID, toID)
 
         # Postconditions
-        self.__appendLine("looking_at-{}-{}".format(agent.id, toID))
+        self.__appendLine("looking_at-{}-{}", agent.id, toID)
 
     def __logMoveTo(self, agent, fromEntity, toEntity):
         '''
@@ -336,13 +345,13 @@ class Logger:
         toID = toEntity.id if toEntity != None else "None"
 
         # Preconditions
-        self.__appendLine("looking_at-{}-{}".format(agent.id, toID))
+        self.__appendLine("looking_at-{}-{}", agent.id, toID)
 
         # Action
-        self.__appendLine("!MOVETO-{}-{}-{}".format(agent.id, fromID, toID))
+        self.__appendLine("!MOVETO-{}-{}-{}", agent.id, fromID, toID)
 
         # Postconditions
-        self.__appendLine("at-{}-{}".format(agent.id, toID))
+        self.__appendLine("at-{}-{}", agent.id, toID)
 
     def __logPickUpItem(self, agent, item):
         '''
@@ -351,13 +360,13 @@ class Logger:
         self.__appendNewline()
 
         # Preconditions
-        self.__appendLine("at-{}-None".format(item.id))
+        self.__appendLine("at-{}-None", item.id)
 
         # Action
-        self.__appendLine("!PICKUPITEM-{}-{}".format(agent.id, item.id))
+        self.__appendLine("!PICKUPITEM-{}-{}", agent.id, item.id)
 
         # Postconditions
-        self.__appendLine("at-{}-{}".format(item.id, agent.id))
+        self.__appendLine("at-{}-{}", item.id, agent.id)
 
     def __logAttack(self, agent, mob, wasKilled, itemsDropped, itemsPickedUp):
         '''
@@ -367,21 +376,21 @@ class Logger:
         self.__appendNewline()
 
         # Preconditions
-        self.__appendLine("looking_at-{}-{}".format(agent.id, mob.id))
-        self.__appendLine("at-{}-{}".format(agent.id, mob.id))
+        self.__appendLine("looking_at-{}-{}", agent.id, mob.id)
+        self.__appendLine("at-{}-{}", agent.id, mob.id)
 
         # Action
-        self.__appendLine("!ATTACK-{}-{}".format(agent.id, mob.id))
+        self.__appendLine("!ATTACK-{}-{}", agent.id, mob.id)
 
         # Postconditions
         if wasKilled:
             self.__logIsAlive(mob, False)
             for item in itemsDropped:
                 self.__logItem(item)
-                self.__appendLine("at-{}-None".format(item.id))
+                self.__appendLine("at-{}-None", item.id)
             for item in itemsPickedUp:
                 self.__logItem(item)
-                self.__appendLine("at-{}-{}".format(item.id, agent.id))
+                self.__appendLine("at-{}-{}", item.id, agent.id)
 
     def __logCraft(self, agent, itemCrafted, itemsUsed):
         '''
@@ -391,16 +400,16 @@ class Logger:
 
         # Preconditions
         for item in itemsUsed:
-            self.__appendLine("at-{}-{}".format(item.id, agent.id))
+            self.__appendLine("at-{}-{}", item.id, agent.id)
 
         # Action
-        self.__appendLine("!CRAFT-{}-{}".format(agent.id, itemCrafted.id))
+        self.__appendLine("!CRAFT-{}-{}", agent.id, itemCrafted.id)
 
         # Postconditions
         self.__logItem(itemCrafted)
-        self.__appendLine("at-{}-{}".format(itemCrafted.id, agent.id))
+        self.__appendLine("at-{}-{}", itemCrafted.id, agent.id)
         for item in itemsUsed:
-            self.__appendLine("at-{}-None".format(item.id))
+            self.__appendLine("at-{}-None", item.id)
 
     def __logEquipItem(self, agent, item):
         '''
@@ -409,13 +418,13 @@ class Logger:
         self.__appendNewline()
 
         # Preconditions
-        self.__appendLine("at-{}-{}".format(item.id, agent.id))
+        self.__appendLine("at-{}-{}", item.id, agent.id)
 
         # Action
-        self.__appendLine("!EQUIP-{}-{}".format(agent.id, item.id))
+        self.__appendLine("!EQUIP-{}-{}", agent.id, item.id)
 
         # Postconditions
-        self.__appendLine("equipped_item-{}-{}".format(agent.id, item.id))
+        self.__appendLine("equipped_item-{}-{}", agent.id, item.id)
 
     def __logGiveItem(self, fromAgent, item, toAgent):
         '''
@@ -424,17 +433,17 @@ class Logger:
         self.__appendNewline()
 
         # Preconditions
-        self.__appendLine("looking_at-{}-{}".format(fromAgent.id, toAgent.id))
-        self.__appendLine("at-{}-{}".format(fromAgent.id, toAgent.id))
-        self.__appendLine("at-{}-{}".format(item.id, fromAgent.id))
-        self.__appendLine("equipped_item-{}-{}".format(fromAgent.id, item.id))
+        self.__appendLine("looking_at-{}-{}", fromAgent.id, toAgent.id)
+        self.__appendLine("at-{}-{}", fromAgent.id, toAgent.id)
+        self.__appendLine("at-{}-{}", item.id, fromAgent.id)
+        self.__appendLine("equipped_item-{}-{}", fromAgent.id, item.id)
 
         # Action
-        self.__appendLine("!GIVEITEM-{}-{}-{}".format(fromAgent.id, item.id, toAgent.id))
+        self.__appendLine("!GIVEITEM-{}-{}-{}", fromAgent.id, item.id, toAgent.id)
 
         # Postconditions
-        self.__appendLine("equipped_item-{}-None".format(fromAgent.id))
-        self.__appendLine("at-{}-{}".format(item.id, toAgent.id))
+        self.__appendLine("equipped_item-{}-None", fromAgent.id)
+        self.__appendLine("at-{}-{}", item.id, toAgent.id)
 
     def __handleClosestMobReport(self, agent, logReport):
         '''
@@ -495,7 +504,7 @@ class Logger:
         self.__logCraft(agent, logReport.itemCrafted, logReport.itemsUsed)
         self.__currentState.agents[agent.id].inventory[logReport.itemCrafted.id] = logReport.itemCrafted
         for itemUsed in logReport.itemsUsed:
-            self.__currentState.agents[agent.id].inventory.pop(logReport.itemUsed.id, None)
+            self.__currentState.agents[agent.id].inventory.pop(itemUsed.id, None)
 
     def __handleAttackReport(self, agent, logReport):
         '''
@@ -528,11 +537,10 @@ class Logger:
         self.__currentState.agents[agent.id].inventory.pop(logReport.item.id, None)
         self.__currentState.agents[logReport.agent.id].inventory[logReport.item.id] = logReport.item
 
-    def __handleAgentLogReports(self, agent):
+    def __handleAgentLogReports(self, agent, logReports):
         '''
         Produce a log for any agent log reports that are not repeats from the last iteration.
         '''
-        logReports = agent.getAndClearLogReports()
         for logReport in logReports:
             logReportType = type(logReport).__name__
             if logReportType == "ClosestMobReport":
@@ -561,22 +569,33 @@ class Logger:
         Produce logs for all agents where changes/actions have occurred. This function should be called at the
         beginning of each mission loop iteration.
         '''
-        for agent in list(Agent.allAgents.values()):
-            self.__handleAgentLogReports(agent)
+        allAgents = list(Agent.allAgents.values())
+        if self.__executor != None:
+            allLogReports = self.__executor.map(Logger.__fetchLogReports, allAgents)
+        else:
+            allLogReports = [agent.getAndClearLogReports() for agent in allAgents]
+
+        # Merge in agent order
+        for agent, logReports in zip(allAgents, allLogReports):
+            self.__handleAgentLogReports(agent, logReports)
+        self.__sink.poll()
+
+    @staticmethod
+    def __fetchLogReports(agent):
+        '''
+        Fetch the observation snapshot of an agent, so that it is available to the rest of the mission loop iteration,
+        and return its log reports.
+        '''
+        agent.toJSON()
+        return agent.getAndClearLogReports()
 
     def export(self):
         '''
         Output the log contents to a file in a 'logs' directory. The file is named with the
-        current timestamp.
+        current timestamp. If the log is being streamed to a file, the rest of it is written out
+        and that file is closed instead.
         '''
-        directory = "logs"
-        if not os.path.isdir(directory):
-            os.mkdir(directory)
-
-        filename = datetime.fromtimestamp(time.time()).strftime("%m_%d_%Y_%H_%M_%S") + ".log"
-        filepath = os.path.join(directory, filename)
-        with open(filepath, "w+") as f:
-            f.write("\n".join(self.__log))
+        filepath = self.__sink.export()
         print("Mission log output has been saved to: " + filepath)
 
     class State:
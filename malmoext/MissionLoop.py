@@ -0,0 +1,135 @@
+# ==============================================================================================
+# This file contains a driver for the mission loop, ticking at a fixed rate and running a list of
+# plugins (such as loggers, statistics generators and agent behaviors) on every tick.
+# ==============================================================================================
+import time
+from collections import namedtuple
+import malmoext.malmoutils as malmoutils
+from malmoext.Agent import Agent
+
+class MissionLoop:
+    '''
+    Runs the mission loop at a fixed rate until the mission ends. On each tick, a single observation snapshot is taken
+    for every agent, after which each registered plugin is run in the order it was added. A plugin may either be an
+    object with start(), update() and stop() methods (such as a Logger or Statistics), or a function taking no
+    arguments that is called once per tick (such as an agent behavior).
+
+    Ticks that take longer than the tick period are counted as overruns. Rather than running several ticks back to
+    back to catch up, the schedule then restarts from the end of the overrun.
+
+    Example usage:
+
+        loop = MissionLoop(20)
+        loop.addPlugin(logger)
+        loop.addPlugin(stats)
+        loop.addPlugin(defend)
+        loop.run()
+    '''
+    Stats = namedtuple("MissionLoopStats", "ticks overruns meanTickTime maxTickTime meanJitter maxJitter")   # Timing metrics for the ticks run so far (in seconds)
+
+    def __init__(self, hz=20, executor=None):
+        self.__period = 1.0 / hz        # Time (in seconds) between the start of each tick
+        self.__executor = executor      # Optional TickExecutor used to take the observation snapshots of all agents concurrently
+        self.__plugins = []             # The plugins run on each tick, in order
+        self.__isStopping = False       # Whether or not the loop should stop before the next tick
+        self.__ticks = 0                # The number of ticks run
+        self.__overruns = 0             # The number of ticks that took longer than the tick period
+        self.__totalTickTime = 0.0      # The total time spent running ticks
+        self.__maxTickTime = 0.0        # The longest time spent running a single tick
+        self.__totalJitter = 0.0        # The total delay between when each tick was scheduled and when it started
+        self.__maxJitter = 0.0          # The longest delay between when a tick was scheduled and when it started
+
+    def addPlugin(self, plugin):
+        '''
+        Add a plugin to be run on each tick, after all plugins added before it.
+        '''
+        self.__plugins.append(plugin)
+
+    def stop(self):
+        '''
+        Stop the loop once the current tick has finished. May be called from within a plugin.
+        '''
+        self.__isStopping = True
+
+    def __snapshot(self):
+        '''
+        Take an observation snapshot for every agent.
+        '''
+        if self.__executor != None:
+            self.__executor.prefetch()
+        else:
+            for agent in list(Agent.allAgents.values()):
+                agent.toJSON()
+
+    def __tick(self):
+        '''
+        Run a single tick, consisting of an observation snapshot for each agent followed by each plugin.
+        '''
+        self.__snapshot()
+        for plugin in self.__plugins:
+            if hasattr(plugin, "update"):
+                plugin.update()
+            else:
+                plugin()
+
+    def __flushCommands(self):
+        '''
+        Send the commands buffered by every agent during the tick.
+        '''
+        for agent in list(Agent.allAgents.values()):
+            agent.flushCommands()
+
+    def run(self, maxTicks=None):
+        '''
+        Start all plugins, run ticks until either the mission ends, the loop is stopped or the given maximum number of
+        ticks is reached, and then stop all plugins. While running, agents refresh their observation snapshots once per
+        tick only, and the commands given to agents during a tick are sent as soon as the tick ends.
+        '''
+        for plugin in self.__plugins:
+            if hasattr(plugin, "start"):
+                plugin.start()
+
+        # Plugins are stopped even if the mission crashes, so that logs and statistics gathered so far are kept
+        snapshotMaxAge = Agent.snapshotMaxAge
+        Agent.snapshotMaxAge = None
+        try:
+            self.__isStopping = False
+            scheduled = time.perf_counter()
+            while not self.__isStopping and (maxTicks == None or self.__ticks < maxTicks) and malmoutils.isMissionActive():
+                start = time.perf_counter()
+                jitter = max(0.0, start - scheduled)
+                self.__tick()
+                self.__flushCommands()
+                end = time.perf_counter()
+
+                # Record metrics
+                self.__ticks += 1
+                self.__totalTickTime += end - start
+                self.__maxTickTime = max(self.__maxTickTime, end - start)
+                self.__totalJitter += jitter
+                self.__maxJitter = max(self.__maxJitter, jitter)
+
+                # Wait for the next tick
+                scheduled += self.__period
+                if end > scheduled:
+                    self.__overruns += 1
+                    scheduled = end
+                else:
+                    time.sleep(scheduled - end)
+        finally:
+            Agent.snapshotMaxAge = snapshotMaxAge
+            try:
+                self.__flushCommands()
+            finally:
+                for plugin in self.__plugins:
+                    if hasattr(plugin, "stop"):
+                        plugin.stop()
+
+    def stats(self):
+        '''
+        Returns a MissionLoop.Stats tuple containing the number of ticks run, the number of overruns, and the mean and
+        maximum tick time and jitter (in seconds).
+        '''
+        ticks = max(self.__ticks, 1)
+        return MissionLoop.Stats(self.__ticks, self.__overruns, self.__totalTickTime / ticks, self.__maxTickTime,
+            self.__totalJitter / ticks, self.__maxJitter)
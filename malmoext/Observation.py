@@ -0,0 +1,167 @@
+# ==============================================================================================
+# This file contains functionality for lazily decoding the JSON observations output by Malmo for
+# each agent.
+# ==============================================================================================
+import re
+import json
+from collections.abc import Mapping
+
+try:
+    import orjson as jsonBackend    # Faster JSON backend, used for decoding large sections when it is installed
+except ImportError:
+    jsonBackend = json
+
+class Observation(Mapping):
+    '''
+    A read-only, dictionary-like view of a single JSON observation output by Malmo. The payload is tokenized
+    once when the observation is created, but only its scalar fields are decoded up front. Larger sections
+    such as the block grid, the inventory and the nearby entities are decoded the first time they are accessed.
+    '''
+    __decoder = json.JSONDecoder()                                   # Decoder used for values that can not be skipped over
+    __keyPattern = re.compile(r'\s*("(?:[^"\\]|\\.)*")\s*:\s*')      # Matches a field name and its trailing colon
+    __separatorPattern = re.compile(r'\s*([,}])')                    # Matches the separator following a field value
+    __whitespacePattern = re.compile(r'\s*')
+    __bracketPattern = re.compile(r'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*([\[\]{}])')   # Matches up to the next bracket outside of any string
+    __maxSkipAttempts = 16                                           # Maximum number of closing brackets to try when skipping a container
+    __structureTable = {c: None for c in range(0, 128) if chr(c) not in '"[]{},:'}  # Removes all ASCII characters but quotes, brackets and separators
+
+    def __init__(self, text):
+        self.__text = text              # The raw JSON text of the observation
+        self.__keys = []                # The names of all fields in the observation, in order of appearance
+        self.__values = {}              # A map of field names to values that have already been decoded
+        self.__spans = {}               # A map of field names to the (start, end) text span of values not yet decoded
+        self.bytesDecoded = 0           # The number of bytes of the payload that have been decoded so far
+        self.__tokenize()
+
+    def __tokenize(self):
+        '''
+        Find the name and text span of each top-level field in the observation, decoding scalar values.
+        '''
+        text = self.__text
+        index = Observation.__whitespacePattern.match(text, 0).end()
+        if not text.startswith("{", index):
+            raise ValueError("Malmo observation must be a JSON object")
+        index = Observation.__whitespacePattern.match(text, index + 1).end()
+        if text.startswith("}", index):
+            return
+
+        while True:
+            keyMatch = Observation.__keyPattern.match(text, index)
+            if keyMatch == None:
+                raise ValueError("Malformed Malmo observation at position {}".format(index))
+            key = keyMatch.group(1)
+            key = key[1:-1] if "\\" not in key else json.loads(key)
+            index = keyMatch.end()
+            self.__keys.append(key)
+
+            # Containers are skipped over if possible. Anything else is decoded immediately.
+            end = Observation.__skipContainer(text, index)
+            if end != None:
+                self.__spans[key] = (index, end)
+            else:
+                self.__values[key], end = Observation.__decoder.raw_decode(text, index)
+                self.bytesDecoded += end - index
+
+            separatorMatch = Observation.__separatorPattern.match(text, end)
+            if separatorMatch == None:
+                raise ValueError("Malformed Malmo observation at position {}".format(end))
+            if separatorMatch.group(1) == "}":
+                break
+            index = separatorMatch.end()
+
+    @staticmethod
+    def __skipContainer(text, index):
+        '''
+        Returns the index just past the JSON array or object starting at the given index, without decoding it.
+        Returns None if the value at that index is not a container, or if its end can not be found, in which case the
+        value should be decoded instead.
+        '''
+        opening = text[index]
+        if opening == "[":
+            closing = "]"
+        elif opening == "{":
+            closing = "}"
+        else:
+            return None
+
+        # Try successive closing brackets until the brackets are balanced and the closing bracket does not lie within
+        # a string. This is only valid if no string within the container holds a bracket or an escaped character, so
+        # the strings are checked once a candidate is found. Otherwise, the container is scanned character by character.
+        end = index + 1
+        for i in range(0, Observation.__maxSkipAttempts):
+            end = text.find(closing, end)
+            if end == -1:
+                break
+            end += 1
+            if text.count("[", index, end) != text.count("]", index, end):
+                continue
+            if text.count("{", index, end) != text.count("}", index, end):
+                continue
+            if text.count('"', index, end) % 2 != 0:
+                continue
+            if text.find("\\", index, end) != -1:
+                break
+            # Once all but quotes, brackets and separators are removed, strings without brackets become empty pairs
+            # of quotes. Any quotes left over belong to strings holding brackets (or non-ASCII characters).
+            if '"' in text[index:end].translate(Observation.__structureTable).replace('""', ''):
+                break
+            return end
+        return Observation.__scanContainer(text, index)
+
+    @staticmethod
+    def __scanContainer(text, index):
+        '''
+        Returns the index just past the JSON array or object starting at the given index, skipping over any strings
+        within it (including those with brackets or escaped quotes). Returns None if its end can not be found.
+        '''
+        depth = 0
+        end = index
+        while True:
+            match = Observation.__bracketPattern.match(text, end)
+            if match == None:
+                return None
+            end = match.end()
+            if match.group(1) == "[" or match.group(1) == "{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return end
+
+    @property
+    def bytesSkipped(self):
+        '''
+        The number of bytes of the payload that have not been decoded so far.
+        '''
+        return len(self.__text) - self.bytesDecoded
+
+    def text(self):
+        '''
+        Returns the raw JSON text of this observation.
+        '''
+        return self.__text
+
+    def __getitem__(self, key):
+        if key in self.__values:
+            return self.__values[key]
+        span = self.__spans.get(key)
+        if span == None:
+            if key in self.__values:    # Decoded by another thread in the meantime
+                return self.__values[key]
+            raise KeyError(key)
+
+        # The span is only removed once the value is stored, so that concurrent readers always find one of the two
+        start, end = span
+        value = self.__values.setdefault(key, jsonBackend.loads(self.__text[start:end]))
+        if self.__spans.pop(key, None) != None:
+            self.bytesDecoded += end - start
+        return value
+
+    def __contains__(self, key):
+        return key in self.__values or key in self.__spans
+
+    def __iter__(self):
+        return iter(self.__keys)
+
+    def __len__(self):
+        return len(self.__keys)
@@ -0,0 +1,327 @@
+# ==============================================================================================
+# This file contains functionality for planning walkable paths between cells of the world, using
+# the blocks accumulated in a VoxelMap.
+# ==============================================================================================
+import heapq
+import math
+import numpy
+from collections import OrderedDict
+from malmoext.Utils import Vector
+from malmoext.BlockGrid import BlockGrid
+from malmoext.VoxelMap import VoxelMap
+from malmoext.DistanceField import DistanceField
+
+class PathPlanner:
+    '''
+    Plans paths over the walkable cells of a VoxelMap using A*. Paths are lists of (x,y,z) world cells an agent can walk
+    through, one step at a time, from a start cell to a goal cell. Cells that have not been observed are optimistically
+    assumed to be walkable at the same height, so paths lead into unexplored terrain and are repaired once it is seen.
+
+    Paths are cached per (start cell, goal cell). A path planned earlier for the same goal is also reused from any cell
+    along it, so an agent following a path does not trigger a new search on every step. When the map changes, cached
+    paths are checked before being reused. A path that is now blocked keeps its cells up to the one before its first
+    blocked cell, and the rest of it is replaced by a new A* search from there.
+
+    Waypoints towards a goal are read from a DistanceField computed around that goal, which is shared by every agent
+    heading for the same goal cell. Fields are cached per goal cell. A field is only checked against the map once one
+    of the chunks it covers changes, and is only recomputed if the walkable cells it covers changed. Agents outside of
+    a goal's field fall back to A*.
+    '''
+    Margin = 8                  # Number of blocks around the start and goal cells (in x and z) that a search may cover
+    VerticalMargin = 3          # Number of blocks above and below the start and goal cells that a search may cover
+    MaxExpansions = 20000       # Maximum number of cells expanded by a single search
+    MaxCachedPaths = 256        # Maximum number of paths held in the cache
+    Lookahead = 8               # Maximum number of cells along a path that a waypoint may skip ahead
+    AgentRadius = 0.3           # Half of the width of an agent, in blocks
+    FieldMargin = 16            # Number of blocks around a goal cell (in x and z) that its distance field covers
+    MaxCachedFields = 32        # Maximum number of distance fields held in the cache
+
+    def __init__(self, voxelMap):
+        self.__map = voxelMap               # The map that paths are planned over
+        self.__paths = OrderedDict()        # A map of (start, goal) cells to [path, map version], from least to most recently used
+        self.__lastPathToGoal = {}          # A map of goal cells to the key of the path most recently planned to each goal
+        self.searches = 0                   # The number of full searches run
+        self.repairs = 0                    # The number of cached paths repaired after the map changed
+        self.cacheHits = 0                  # The number of paths served from the cache
+        self.__fields = OrderedDict()       # A map of goal cells to distance fields, from least to most recently used
+        self.fieldsComputed = 0             # The number of distance fields computed
+        self.fieldHits = 0                  # The number of distance fields served from the cache
+
+    @staticmethod
+    def cellOf(position):
+        '''
+        Returns the (x,y,z) cell containing the given (x,y,z) position.
+        '''
+        return (math.floor(position[0]), math.floor(position[1]), math.floor(position[2]))
+
+    def __region(self, cells, margin=0, verticalMargin=0):
+        '''
+        Returns a PathPlanner.Region covering the bounding box of the given cells, extended by the given margins.
+        '''
+        xs = [cell[0] for cell in cells]
+        ys = [cell[1] for cell in cells]
+        zs = [cell[2] for cell in cells]
+        origin = (min(xs) - margin, min(ys) - verticalMargin - 1, min(zs) - margin)
+        shape = (max(ys) - min(ys) + 2 * verticalMargin + 3, max(zs) - min(zs) + 2 * margin + 1, max(xs) - min(xs) + 2 * margin + 1)
+        return PathPlanner.Region(origin, self.__map.region(origin, shape))
+
+    def __search(self, start, goal):
+        '''
+        Returns the shortest path from the start cell to the goal cell using A*, or None if there is none within the
+        searched region. The path ends at the first cell reached that is within one block of the goal's height.
+        '''
+        self.searches += 1
+        region = self.__region([start, goal], PathPlanner.Margin, PathPlanner.VerticalMargin)
+        startLocal = region.toLocal(start)
+        if startLocal == None:
+            return None
+        gx, gy, gz = goal
+
+        openSet = [(0, 0, startLocal)]
+        cameFrom = {startLocal: None}
+        costs = {startLocal: 0}
+        expansions = 0
+        while len(openSet) > 0 and expansions < PathPlanner.MaxExpansions:
+            _, cost, current = heapq.heappop(openSet)
+            if cost > costs[current]:
+                continue
+            expansions += 1
+
+            x, y, z = region.toWorld(current)
+            if x == gx and z == gz and abs(y - gy) <= 1:
+                path = []
+                while current != None:
+                    path.append(region.toWorld(current))
+                    current = cameFrom[current]
+                path.reverse()
+                return path
+
+            for neighbour in BlockGrid.neighbours(region.walkable, current):
+                newCost = cost + 1 + (neighbour[0] != current[0])     # Steps up or down cost slightly more
+                if newCost < costs.get(neighbour, newCost + 1):
+                    costs[neighbour] = newCost
+                    cameFrom[neighbour] = current
+                    nx, ny, nz = region.toWorld(neighbour)
+                    heapq.heappush(openSet, (newCost + abs(nx - gx) + abs(nz - gz), newCost, neighbour))
+        return None
+
+    def __firstBlockedIndex(self, path):
+        '''
+        Returns the index of the first cell along a path (after the start cell) that is no longer walkable, or None if
+        the whole path is still walkable.
+        '''
+        region = self.__region(path)
+        for i in range(1, len(path) - 1):
+            if not region.isWalkable(path[i]):
+                return i
+        return None
+
+    def __cachedPath(self, start, goal):
+        '''
+        Returns the cached [path, map version] entry for the given start and goal cells, or for the remainder of the
+        last path planned to the goal if it passes through the start cell. Returns None if there is no such path.
+        '''
+        key = (start, goal)
+        entry = self.__paths.get(key)
+        if entry != None:
+            self.__paths.move_to_end(key)
+            return entry
+
+        lastKey = self.__lastPathToGoal.get(goal)
+        lastEntry = self.__paths.get(lastKey) if lastKey != None else None
+        if lastEntry != None and start in lastEntry[0]:
+            path = lastEntry[0]
+            return [path[path.index(start):], lastEntry[1]]
+        return None
+
+    def __store(self, start, goal, path):
+        '''
+        Add a path to the cache, evicting the least recently used paths if the cache is full.
+        '''
+        key = (start, goal)
+        self.__paths[key] = [path, self.__map.version]
+        self.__paths.move_to_end(key)
+        self.__lastPathToGoal[goal] = key
+        while len(self.__paths) > PathPlanner.MaxCachedPaths:
+            oldKey, _ = self.__paths.popitem(last=False)
+            if self.__lastPathToGoal.get(oldKey[1]) == oldKey:
+                del self.__lastPathToGoal[oldKey[1]]
+
+    def plan(self, start, goal):
+        '''
+        Returns a path from the start cell to the goal cell, as a list of (x,y,z) cells beginning with the start cell.
+        Returns None if no path could be found.
+        '''
+        entry = self.__cachedPath(start, goal)
+        if entry != None:
+            path, version = entry
+            if version == self.__map.version:
+                self.cacheHits += 1
+                self.__store(start, goal, path)
+                return path
+
+            # The map has changed since the path was planned. Replan from just before its first blocked cell, if any.
+            blockedIndex = self.__firstBlockedIndex(path)
+            if blockedIndex == None:
+                self.cacheHits += 1
+                self.__store(start, goal, path)
+                return path
+            self.repairs += 1
+            remainder = self.__search(path[blockedIndex - 1], goal)
+            path = path[:blockedIndex - 1] + remainder if remainder != None else None
+        else:
+            path = self.__search(start, goal)
+
+        if path != None:
+            self.__store(start, goal, path)
+        return path
+
+    def distanceField(self, goal):
+        '''
+        Returns the DistanceField to the given goal cell. The field is reused until a chunk it covers changes, and then
+        for as long as the walkable cells it covers stay the same.
+        '''
+        field = self.__fields.get(goal)
+        if field != None:
+            self.__fields.move_to_end(goal)
+            versions = self.__map.chunkVersions(field.region.origin, field.region.walkable.shape)
+            if field.version == versions:
+                self.fieldHits += 1
+                return field
+
+        region = self.__region([goal], PathPlanner.FieldMargin, PathPlanner.VerticalMargin)
+        versions = self.__map.chunkVersions(region.origin, region.walkable.shape)
+        if field != None and numpy.array_equal(region.walkable, field.region.walkable):
+            self.fieldHits += 1
+            field.version = versions
+            return field
+
+        self.fieldsComputed += 1
+        field = DistanceField(region, goal, versions)
+        self.__fields[goal] = field
+        while len(self.__fields) > PathPlanner.MaxCachedFields:
+            self.__fields.popitem(last=False)
+        return field
+
+    def pathDistance(self, start, goal):
+        '''
+        Returns the number of steps needed to walk from the start cell to the goal cell, or None if the goal can not be
+        reached within its distance field.
+        '''
+        return self.distanceField(goal).distance(start)
+
+    def rankByPathDistance(self, start, goals):
+        '''
+        Returns a list of (index, distance) pairs for each of the given goal cells that can be reached from the start
+        cell, sorted from the fewest to the most steps needed to walk there. A single distance field is computed around
+        the start cell, so goals beyond its reach are left out.
+        '''
+        field = self.distanceField(start)
+        result = []
+        for i, goal in enumerate(goals):
+            distance = field.distance(goal)
+            if distance != None:
+                result.append((i, distance))
+        result.sort(key=lambda pair: pair[1])
+        return result
+
+    def isDirect(self, start, goal):
+        '''
+        Returns true if an agent can walk in a straight line from the center of the start cell to the center of the goal
+        cell, stepping down at most one block at a time. Lines that need a step up are not direct, so that the step is
+        taken as part of a path (where the agent jumps). The agent's width is taken into account, so that it does not clip
+        the corners of any obstacles along the way.
+        '''
+        region = self.__region([start, goal], 0, 1)
+        x0, y0, z0 = start
+        x1, _, z1 = goal
+        length = math.hypot(x1 - x0, z1 - z0)
+        if length == 0:
+            return True
+        steps = int(max(abs(x1 - x0), abs(z1 - z0)) * 4)
+        offsetX = (z0 - z1) / length * PathPlanner.AgentRadius
+        offsetZ = (x1 - x0) / length * PathPlanner.AgentRadius
+        for side in (0, 1, -1):
+            y = y0
+            for i in range(1, steps + 1):
+                x = math.floor(x0 + 0.5 + side * offsetX + (x1 - x0) * i / steps)
+                z = math.floor(z0 + 0.5 + side * offsetZ + (z1 - z0) * i / steps)
+                for ny in (y, y - 1):
+                    if region.isWalkable((x, ny, z)):
+                        y = ny
+                        break
+                else:
+                    return False
+        return True
+
+    def nextWaypoint(self, start, goal):
+        '''
+        Returns the (x,y,z) position that an agent in the start cell should head towards in order to reach the goal cell,
+        skipping ahead along the path as far as it can walk in a straight line. The path is read from the goal's distance
+        field, or planned with A* if the start cell lies outside of it. Returns None if no path could be found.
+        '''
+        path = self.__fieldPath(start, goal)
+        if path == None:
+            path = self.plan(start, goal)
+        if path == None:
+            return None
+        waypoint = path[-1] if len(path) == 1 else path[1]
+        for i in range(min(len(path) - 1, PathPlanner.Lookahead), 1, -1):
+            if self.isDirect(start, path[i]):
+                waypoint = path[i]
+                break
+        return Vector(waypoint[0] + 0.5, waypoint[1], waypoint[2] + 0.5)
+
+    def __fieldPath(self, start, goal):
+        '''
+        Returns the first cells of the path from the start cell to the goal cell, following the steps of the goal's
+        distance field. Returns None if the goal can not be reached within the field.
+        '''
+        field = self.distanceField(goal)
+        if field.distance(start) == None:
+            return None
+        path = [start]
+        while len(path) <= PathPlanner.Lookahead:
+            step = field.nextStep(path[-1])
+            if step == None:
+                break
+            path.append(step)
+        return path
+
+    class Region:
+        '''
+        The walkable cells within a box of a VoxelMap. Unobserved cells are assumed to be passable and, when beneath
+        another cell, solid. Cells above fences and walls can not be stood in.
+        '''
+        def __init__(self, origin, blocks):
+            unobserved = blocks == VoxelMap.Unobserved
+            known = numpy.minimum(blocks, BlockGrid.Unknown)
+            passable = BlockGrid.IsPassable[known] | unobserved
+            solid = BlockGrid.IsStandable[known] | unobserved
+            walkable = numpy.zeros(blocks.shape, dtype=bool)
+            walkable[1:-1] = solid[:-2] & passable[1:-1] & passable[2:]
+            self.origin = origin        # The (x,y,z) world position of the first cell
+            self.walkable = walkable    # Whether or not each cell can be stood in, shaped (Y, Z, X)
+
+        def toLocal(self, cell):
+            '''
+            Returns the (y,z,x) index of a world cell within this region, or None if it lies outside.
+            '''
+            index = (cell[1] - self.origin[1], cell[2] - self.origin[2], cell[0] - self.origin[0])
+            for i in range(0, 3):
+                if index[i] < 0 or index[i] >= self.walkable.shape[i]:
+                    return None
+            return index
+
+        def toWorld(self, index):
+            '''
+            Returns the (x,y,z) world cell for a (y,z,x) index within this region.
+            '''
+            return (index[2] + self.origin[0], index[0] + self.origin[1], index[1] + self.origin[2])
+
+        def isWalkable(self, cell):
+            '''
+            Returns true if the given world cell lies within this region and can be stood in.
+            '''
+            index = self.toLocal(cell)
+            return index != None and bool(self.walkable[index])
@@ -3,6 +3,7 @@ from datetime import datetime
 import pandas
 import sys
 import os
+import csv
 import random
 from malmoext.Agent import Agent
 from malmoext.Utils import AgentType
@@ -10,9 +11,9 @@ from malmoext.Utils import AgentType
 class Statistics:
     """
     Produces statistical information for each agent over the course of a mission. Results can be output to a file at the
-    end of the mission.
+    end of the mission, or streamed to a file as the mission runs by setting a BackgroundWriter.
     """
-    __updateInterval = 100            # How often agent statistics should be updated (in mission loop iterations)
+    __defaultUpdateInterval = 100     # How often agent statistics should be updated by default (in mission loop iterations)
 
     # Lists of statistic attributes to keep track of for each agent
     __defaultAttributes = ["SysTime", "DamageDealt", "MobsKilled",      # List of statistical attributes to track for each agent
@@ -23,10 +24,16 @@ class Statistics:
 
     def __init__(self):
         self.__startTime = time.time()    # The mission start time
+        self.__updateInterval = Statistics.__defaultUpdateInterval    # How often agent statistics should be updated (in mission loop iterations)
         self.__updateCounter = 0          # Counter for determining when an update is required
         self.__updateIndex = 0            # The next row index to fill with data for all agent dataframes
         self.__stats = {}                 # A map of agent IDs to the Pandas dataframe containing each agent's data over time
         self.__metadata = {}              # A map of agent IDs to metadata for each agent used for future calculations
+        self.__executor = None            # Optional TickExecutor used to build the rows for all agents concurrently
+        self.__writer = None              # Optional BackgroundWriter that rows are streamed to, instead of being held in memory
+        self.__files = {}                 # A map of agent IDs to the path of the file each agent's rows are streamed to
+        self.__openFiles = {}             # A map of agent IDs to the open file and CSV writer for each agent (used by the writer thread only)
+        self.__initialTimes = {}          # A map of agent IDs to the time of the first row streamed for each agent (used by the writer thread only)
 
     def setItemTracking(self, *itemTypes):
         '''
@@ -35,6 +42,29 @@ class Statistics:
         for itemType in itemTypes:
             self.__trackedItems.append(itemType.value)
 
+    def setUpdateInterval(self, interval):
+        '''
+        Set how often agent statistics should be updated, as a number of mission loop iterations between each update
+        (e.g. 1 updates on every iteration). When run by a MissionLoop ticking at a fixed rate, this corresponds to a
+        fixed sampling period.
+        '''
+        self.__updateInterval = interval
+
+    def setExecutor(self, executor):
+        '''
+        Set a TickExecutor used to build the rows of statistical data for all agents concurrently on each update. Rows
+        are still inserted in agent order. Passing None restores serial updates.
+        '''
+        self.__executor = executor
+
+    def setWriter(self, writer):
+        '''
+        Stream the rows of statistical data for each agent to a CSV file in a 'stats' directory as the mission runs,
+        using the given BackgroundWriter to format and write them off of the mission loop thread. Rows are then no
+        longer held in memory. Should be called before the statistics generator is started.
+        '''
+        self.__writer = writer
+
     def start(self):
         '''
         Starts up the statistics generator by creating the matrix for each agent. This method should only be called once, after
@@ -45,14 +75,22 @@ class Statistics:
             # Create a metadata object for the agent
             self.__metadata[agent.id] = Statistics.AgentMetadata()
 
-            # Create the pandas dataframe
-            self.__stats[agent.id] = pandas.DataFrame(columns= (Statistics.__defaultAttributes + Statistics.__trackedItems))
+            # Create the pandas dataframe, or the file that rows are streamed to
+            columns = Statistics.__defaultAttributes + Statistics.__trackedItems
+            if self.__writer != None:
+                self.__files[agent.id] = Statistics.__filepath(agent)
+                self.__writer.submit(self.__openFile, agent.id, columns)
+            else:
+                self.__stats[agent.id] = pandas.DataFrame(columns=columns)
 
     def stop(self):
         '''
         Shuts down the statistics generator by doing post-mission cleanup on each matrix. This method should only be called once,
         after the mission has ended.
         '''
+        if self.__writer != None:
+            return
+
         allAgents = list(Agent.allAgents.values())
         for agent in allAgents:
             # Adjust times to start at 0
@@ -76,58 +114,116 @@ class Statistics:
         '''
         Update the statistical data for all agents.
         '''
-        # Check whether it is time for an update
-        if self.__updateCounter == Statistics.__updateInterval:
+        # Check whether it is time for an update. Updates happen on every interval-th call, so that an interval of 20
+        # at 20 ticks per second samples exactly once per second.
+        if self.__updateCounter + 1 >= self.__updateInterval:
             self.__updateCounter = 0
         else:
             self.__updateCounter += 1
             return
 
         allAgents = list(Agent.allAgents.values())
-        for agent in allAgents:
-            # For human agents, some things are not updated automatically. Manually trigger these updates here
-            if agent.type == AgentType.Human:
-                agent.inventory.sync()
-            
-            # Update any metadata stored in this object
-            self.__updateHealth(agent)
-
-            # Create the new row in the dataframe
-            json = agent.toJSON()
-            metadata = self.__metadata[agent.id]
-            defaultData = [
-                time.time() - self.__startTime,         # Time passed since start of the mission
-                json["DamageDealt"],                    # Amount of damage dealt
-                json["MobsKilled"],                     # Number of mobs killed
-                json["PlayersKilled"],                  # Number of players killed
-                metadata.health,                        # Current health
-                metadata.healthLost,                    # Total health lost over time
-                metadata.healthGained,                  # Total health gained over time
-                json["IsAlive"],                        # Whether or not the agent is alive
-                json["TimeAlive"],                      # Total time the agent has spent alive
-                json["Food"],                           # Hunger level
-                json["Score"],                          # Score
-                json["XP"],                             # Experience points
-                json["DistanceTravelled"]               # Total distance traveled over time
-            ]
-            itemData = [agent.inventory.amountOfItem(item) for item in self.__trackedItems]
-
-            # Insert the data
-            self.__stats[agent.id].loc[self.__updateIndex] = defaultData + itemData
+        if self.__executor != None:
+            rows = self.__executor.map(self.__buildRow, allAgents)
+        else:
+            rows = [self.__buildRow(agent) for agent in allAgents]
+
+        # Insert the data in agent order
+        for agent, row in zip(allAgents, rows):
+            if self.__writer != None:
+                self.__writer.submit(self.__writeRow, agent.id, row, isDroppable=True)
+            else:
+                self.__stats[agent.id].loc[self.__updateIndex] = row
             self.__updateIndex += 1
 
+    def __buildRow(self, agent):
+        '''
+        Returns the new row of statistical data for an agent, updating its metadata.
+        '''
+        # For human agents, some things are not updated automatically. Manually trigger these updates here
+        if agent.type == AgentType.Human:
+            agent.inventory.sync()
+
+        # Update any metadata stored in this object
+        self.__updateHealth(agent)
+
+        # Create the new row in the dataframe
+        json = agent.toJSON()
+        metadata = self.__metadata[agent.id]
+        defaultData = [
+            time.time() - self.__startTime,         # Time passed since start of the mission
+            json["DamageDealt"],                    # Amount of damage dealt
+            json["MobsKilled"],                     # Number of mobs killed
+            json["PlayersKilled"],                  # Number of players killed
+            metadata.health,                        # Current health
+            metadata.healthLost,                    # Total health lost over time
+            metadata.healthGained,                  # Total health gained over time
+            json["IsAlive"],                        # Whether or not the agent is alive
+            json["TimeAlive"],                      # Total time the agent has spent alive
+            json["Food"],                           # Hunger level
+            json["Score"],                          # Score
+            json["XP"],                             # Experience points
+            json["DistanceTravelled"]               # Total distance traveled over time
+        ]
+        itemData = [agent.inventory.amountOfItem(item) for item in self.__trackedItems]
+        return defaultData + itemData
+
+    @staticmethod
+    def __filepath(agent):
+        '''
+        Returns the path of the file in the 'stats' directory that an agent's statistics are output to, named with the
+        current timestamp.
+        '''
+        filename = agent.id + "_" + datetime.fromtimestamp(time.time()).strftime('%m_%d_%Y_%H_%M_%S') + ".csv"
+        return os.path.join("stats", filename)
+
+    def __openFile(self, agentID, columns):
+        '''
+        Open the file that an agent's rows are streamed to, and write the header row. Runs on the writer thread.
+        '''
+        directory = os.path.dirname(self.__files[agentID])
+        if not os.path.isdir(directory):
+            os.mkdir(directory)
+        f = open(self.__files[agentID], "w", newline="")
+        writer = csv.writer(f, lineterminator=os.linesep)
+        writer.writerow(columns)
+        self.__openFiles[agentID] = (f, writer)
+
+    def __writeRow(self, agentID, row):
+        '''
+        Write a row of an agent's statistical data to its file, adjusting its time so that the first row is at 0. Runs
+        on the writer thread.
+        '''
+        timeOffset = self.__initialTimes.setdefault(agentID, row[0])
+        self.__openFiles[agentID][1].writerow([row[0] - timeOffset] + row[1:])
+
+    def __closeFiles(self):
+        '''
+        Close the files that rows are streamed to. Runs on the writer thread.
+        '''
+        for f, _ in self.__openFiles.values():
+            f.close()
+        self.__openFiles = {}
+
     def export(self):
         '''
         Output the statistic contents to a file in a 'stats' directory. The file is named with the
-        current timestamp.
+        current timestamp. If statistics are being streamed, waits for every row to be written and
+        closes the files instead.
         '''
         allAgents = list(Agent.allAgents.values())
+        if self.__writer != None:
+            self.__writer.submit(self.__closeFiles)
+            self.__writer.flush()
+            for agent in allAgents:
+                print("{} statistics have been saved to: {}".format(agent.id, self.__files[agent.id]))
+            return
+
         for agent in allAgents:
-            filename = agent.id + "_" + datetime.fromtimestamp(time.time()).strftime('%m_%d_%Y_%H_%M_%S') + ".csv"
-            directory = "stats"
+            filepath = Statistics.__filepath(agent)
+            directory = os.path.dirname(filepath)
             if not os.path.isdir(directory):
                 os.mkdir(directory)
-            filepath = os.path.join(directory, filename)
             self.__stats[agent.id].to_csv(filepath, index=False)
             print("{} statistics have been saved to: {}".format(agent.id, filepath))
 
@@ -0,0 +1,66 @@
+# ==============================================================================================
+# This file contains functionality for fetching the observations of all agents concurrently
+# within a single mission loop iteration, while their actions are still run one agent at a time.
+# ==============================================================================================
+from concurrent.futures import ThreadPoolExecutor
+from malmoext.Agent import Agent
+
+class TickExecutor:
+    '''
+    A thread pool for running per-agent work concurrently within a single mission loop iteration. Threads are used
+    since the MalmoPython calls that fetch observations release the GIL, so the time spent waiting on Malmo overlaps
+    across agents. Results are always returned in agent order, so that callers can merge them deterministically.
+
+    Only work that reads or changes the state of a single agent may be run concurrently with map(), such as fetching
+    its observation or building its row of statistics. Agent actions must run serially, since completing an action
+    may change the state of other agents (e.g. the closest entities reported by every agent once a mob is killed, or
+    the inventory of the agent receiving an item). step() runs actions serially, once every agent's observation has
+    been fetched concurrently.
+
+    Example usage:
+
+        executor = TickExecutor()
+        logger.setExecutor(executor)
+        stats.setExecutor(executor)
+        while malmoutils.isMissionActive():
+            logger.update()             # fetches observations for all agents concurrently
+            stats.update()
+            executor.step(stepAgent)    # evaluates stepAgent(agent) for each agent in turn
+        executor.shutdown()
+    '''
+    def __init__(self, maxWorkers=None):
+        self.__pool = ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix="malmoext-tick")   # The underlying thread pool
+
+    def map(self, function, agents=None):
+        '''
+        Call a function for each of the given agents concurrently, defaulting to all agents. Returns a list of the
+        results in the same order as the agents. If any call raises an exception, it is re-raised here. The function
+        must only use the agent it is given, and must not perform any of its actions.
+        '''
+        agents = agents if agents != None else list(Agent.allAgents.values())
+        if len(agents) <= 1:
+            return [function(agent) for agent in agents]
+        return list(self.__pool.map(function, agents))
+
+    def prefetch(self, agents=None):
+        '''
+        Fetch the observation snapshot for each of the given agents concurrently, defaulting to all agents. Returns a
+        list of the snapshots in the same order as the agents.
+        '''
+        return self.map(lambda agent: agent.toJSON(), agents)
+
+    def step(self, function, agents=None):
+        '''
+        Call a function that performs actions for each of the given agents, defaulting to all agents. The observation
+        snapshot of every agent is fetched concurrently first, after which the function is called for each agent in
+        turn. Returns a list of the results in the same order as the agents.
+        '''
+        agents = agents if agents != None else list(Agent.allAgents.values())
+        self.prefetch(agents)
+        return [function(agent) for agent in agents]
+
+    def shutdown(self):
+        '''
+        Shut down the thread pool, once all pending work has completed.
+        '''
+        self.__pool.shutdown(wait=True)
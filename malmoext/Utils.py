@@ -3,6 +3,8 @@
 # supporting companion agent actions.
 # ==============================================================================================
 import math
+import threading
+import numpy
 from collections import namedtuple
 from enum import Enum
 
@@ -52,28 +54,15 @@ def stringToBlockEnum(string):
     """
     Converts a plain string to an enum object from BlockType. If it does not exist, returns None.
     """
-    for block in Blocks:
-        if block.value == string:
-            return block
-    return None
+    entry = TypeTable.Entries.get(string)
+    return entry.block if entry != None else None
 
 def stringToItemEnum(string):
     """
     Converts a plain string to an enum object from ItemType. If it does not exist, returns None.
     """
-    for item in Items.All:
-        if item.value == string:
-            return item
-    return None
-
-def numerifyId(string):
-    """
-    Given a string containing hexadecimal values that make up an id, return a new id that contains all digits and no letters.
-    """
-    for i in range(0, len(string)):
-        if string[i] < "0" or string[i] > "9":
-            string = string[:i] + "{}".format(ord(string[i]) % 10) + string[i + 1:]
-    return string
+    entry = TypeTable.Entries.get(string)
+    return entry.item if entry != None else None
 
 # ==============================================================================================
 # Classes
@@ -171,6 +160,141 @@ class MathUtils:
         """
         return Vector(vectorA.x - vectorB.x, vectorA.y - vectorB.y, vectorA.z - vectorB.z)
 
+    @staticmethod
+    def headingError(position, yaw, pitch, target):
+        """
+        Returns the yaw and pitch errors (in degrees) between the direction faced from a position with the given yaw and
+        pitch, and the direction from that position to an (x,y,z) target. See headingErrors() for computing the errors
+        for many targets at once.
+        """
+        dx = target[0] - position.x
+        dy = target[1] - position.y
+        dz = target[2] - position.z
+        horizontal = math.hypot(dx, dz)
+        targetYaw = math.degrees(math.atan2(-dx, dz)) % 360.0
+        yawError = 180.0 - (180.0 - (targetYaw - yaw % 360.0)) % 360.0
+        pitchError = 0.0 if horizontal == 0 else -math.degrees(math.atan2(dy, horizontal)) - pitch
+        return yawError, pitchError
+
+    @staticmethod
+    def turnRate(error):
+        """
+        Returns the rate (from -1 to 1) at which to turn in order to correct a heading error (in degrees). Turning slows
+        down as the error shrinks.
+        """
+        return min(max(error / 180.0 * 4, -1.0), 1.0)
+
+    @staticmethod
+    def headingErrors(position, yaw, pitch, targets):
+        """
+        Returns the yaw and pitch errors (in degrees) between the direction faced from a position with the given yaw and
+        pitch, and the direction from that position to each of the given (x,y,z) targets, as a pair of NumPy arrays.
+        Positive errors mean turning right or down. Yaw errors lie within (-180, 180]. Targets directly above or below
+        the position have a pitch error of 0.
+        """
+        targets = numpy.asarray(targets, dtype=float).reshape(-1, 3)
+        dx = targets[:, 0] - position.x
+        dy = targets[:, 1] - position.y
+        dz = targets[:, 2] - position.z
+        horizontal = numpy.hypot(dx, dz)
+
+        # Minecraft yaw is 0 when facing the positive z-axis, and increases when turning right
+        targetYaw = numpy.degrees(numpy.arctan2(-dx, dz)) % 360.0
+        yawErrors = 180.0 - (180.0 - (targetYaw - yaw % 360.0)) % 360.0
+
+        # Minecraft pitch is 0 when facing the horizon, and increases when looking down
+        targetPitch = -numpy.degrees(numpy.arctan2(dy, horizontal))
+        pitchErrors = numpy.where(horizontal == 0, 0.0, targetPitch - pitch)
+        return yawErrors, pitchErrors
+
+    @staticmethod
+    def turnRates(errors):
+        """
+        Returns the rates (from -1 to 1) at which to turn in order to correct the given heading errors (in degrees), as
+        a NumPy array.
+        """
+        return numpy.clip(numpy.asarray(errors, dtype=float) / 180.0 * 4, -1.0, 1.0)
+
+class EntityIds:
+    '''
+    Mission-wide intern table mapping the UUIDs of entities observed in Malmo to stable, dense integer IDs. Each entity
+    is also given a readable alias made up of its type and integer ID (e.g. 'Zombie17') that identifies it in logs.
+    Inventory items are numbered from the same counter, so aliases never collide with item IDs. IDs whose alias is
+    reserved (such as the ID of an agent named 'Cow1') are skipped.
+    '''
+    __nextID = 1         # The next integer ID to be handed out
+    __ids = {}           # A map of UUIDs to the integer ID of each entity
+    __aliases = {}       # A map of UUIDs to the alias of each entity
+    __reserved = set()   # Names that are never handed out as aliases, kept across missions
+    __lock = threading.RLock()  # Guards the table when agents are stepped concurrently
+
+    @staticmethod
+    def nextID():
+        '''
+        Returns a new integer ID, and increments the counter.
+        '''
+        with EntityIds.__lock:
+            result = EntityIds.__nextID
+            EntityIds.__nextID += 1
+            return result
+
+    @staticmethod
+    def reserve(name):
+        '''
+        Reserve a name, such as the ID of an agent, so that it is never handed out as the alias of an entity or item.
+        '''
+        with EntityIds.__lock:
+            EntityIds.__reserved.add(name)
+
+    @staticmethod
+    def nextAlias(entityType):
+        '''
+        Returns a new integer ID along with the alias made up of the given type and that ID, skipping any IDs whose
+        alias is reserved.
+        '''
+        with EntityIds.__lock:
+            while True:
+                entityID = EntityIds.nextID()
+                alias = "{}{}".format(entityType, entityID)
+                if alias not in EntityIds.__reserved:
+                    return entityID, alias
+
+    @staticmethod
+    def intern(uuid, entityType):
+        '''
+        Returns the alias of the entity with the given UUID and type, assigning it a new integer ID if it has not
+        been seen before.
+        '''
+        alias = EntityIds.__aliases.get(uuid)
+        if alias != None:
+            return alias
+        with EntityIds.__lock:
+            alias = EntityIds.__aliases.get(uuid)
+            if alias == None:
+                entityID, alias = EntityIds.nextAlias(entityType)
+                EntityIds.__ids[uuid] = entityID
+                EntityIds.__aliases[uuid] = alias
+            return alias
+
+    @staticmethod
+    def idOf(uuid):
+        '''
+        Returns the integer ID of the entity with the given UUID. Returns None if the entity has not been seen before.
+        '''
+        return EntityIds.__ids.get(uuid)
+
+    @staticmethod
+    def reset():
+        '''
+        Forget every entity seen so far, and start handing out IDs from 1 again, while keeping any reserved names. Called
+        at the start of each mission (see malmoutils.startMission), so that IDs are dense within a mission and the table
+        does not grow across missions.
+        '''
+        with EntityIds.__lock:
+            EntityIds.__nextID = 1
+            EntityIds.__ids = {}
+            EntityIds.__aliases = {}
+
 class LogUtils:
     '''
     A collection of named tuples to make conveying information from the Agent class to the Logger easier.
@@ -197,6 +321,18 @@ class AgentType(Enum):
     Trained = "trained"
     Human = "human"
 
+class ActionStatus(Enum):
+    '''
+    The status of an action that completes over multiple mission loop iterations. Only a succeeded action is truthy,
+    so that statuses can be checked in the same way as the boolean results of other actions.
+    '''
+    Pending = "pending"
+    Succeeded = "succeeded"
+    Failed = "failed"
+
+    def __bool__(self):
+        return self == ActionStatus.Succeeded
+
 class Blocks(Enum):
     '''
     A type of Minecraft block.
@@ -933,4 +1069,110 @@ class TimeOfDay(Enum):
     Dawn = 0
     Noon = 6000
     Sunset = 12000
-    Midnight = 18000
\ No newline at end of file
+    Midnight = 18000
+
+class TypeTable:
+    '''
+    Mission-wide table of every block, item and mob type, giving each type string a dense integer ID and a category
+    bitmask so that any classification question about a type is answered with a single lookup. Block types come
+    first, in the order of the Blocks enumeration, so that air is always 0. A string naming both a block and an item
+    (e.g. 'stone') has a single ID with both categories set. Strings not in any enumeration are given the Unknown ID
+    and no categories.
+
+    IDs fit in a uint16, so they can be held in NumPy arrays (such as block grids and entity tables) and used to index
+    lookup arrays such as Categories.
+    '''
+    # Category bits making up the category mask of each type
+    Mob = 0x1
+    Peaceful = 0x2
+    Hostile = 0x4
+    FoodMob = 0x8
+    Item = 0x10
+    FoodItem = 0x20
+    Block = 0x40
+
+    # A map of enumerated types to the category bit for each type
+    VariantCategories = {
+        Mobs.All: Mob,
+        Mobs.Peaceful: Peaceful,
+        Mobs.Hostile: Hostile,
+        Mobs.Food: FoodMob,
+        Items.All: Item,
+        Items.Food: FoodItem,
+        Blocks: Block
+    }
+
+    TypeEntry = namedtuple("TypeEntry", "id categories block item mob")  # A type's ID, category mask, and its Blocks, Items.All and Mobs.All members (or None)
+
+    # Build the table, starting with blocks so that block IDs match their order in the Blocks enumeration
+    Entries = {}    # A map of type strings to the TypeEntry for each type
+    Types = []      # The type string for each ID
+    for variant in [Blocks, Items.All, Mobs.All, Items.Food, Mobs.Peaceful, Mobs.Hostile, Mobs.Food]:
+        for member in variant:
+            entry = Entries.get(member.value)
+            if entry == None:
+                entry = TypeEntry(len(Types), 0, None, None, None)
+                Types.append(member.value)
+            entry = entry._replace(categories=entry.categories | VariantCategories[variant])
+            if variant == Blocks:
+                entry = entry._replace(block=member)
+            elif variant == Items.All:
+                entry = entry._replace(item=member)
+            elif variant == Mobs.All:
+                entry = entry._replace(mob=member)
+            Entries[member.value] = entry
+    del variant, member, entry
+
+    Unknown = len(Types)                                        # The ID given to strings not in any enumeration
+    Ids = {string: entry.id for string, entry in Entries.items()}   # A map of type strings to the ID of each type
+
+    # The category mask for each ID, including the Unknown ID
+    Categories = numpy.zeros(Unknown + 1, dtype=numpy.uint8)
+    for entry in Entries.values():
+        Categories[entry.id] = entry.categories
+    del entry
+
+    @staticmethod
+    def entry(string):
+        '''
+        Returns the TypeEntry for a type string, or None if it is not a member of any enumeration.
+        '''
+        return TypeTable.Entries.get(string)
+
+    @staticmethod
+    def idOf(string):
+        '''
+        Returns the ID of a type string, or Unknown if it is not a member of any enumeration.
+        '''
+        return TypeTable.Ids.get(string, TypeTable.Unknown)
+
+    @staticmethod
+    def ids(strings):
+        '''
+        Returns a uint16 NumPy array containing the ID of each of the given type strings.
+        '''
+        ids = map(TypeTable.Ids.get, strings, [TypeTable.Unknown] * len(strings))
+        return numpy.fromiter(ids, dtype=numpy.uint16, count=len(strings))
+
+    @staticmethod
+    def categoriesOf(string):
+        '''
+        Returns the category mask of a type string, or 0 if it is not a member of any enumeration.
+        '''
+        entry = TypeTable.Entries.get(string)
+        return entry.categories if entry != None else 0
+
+    @staticmethod
+    def isA(string, variant):
+        '''
+        Returns true if a type string is a member of the given enumerated type (e.g. Mobs.Hostile or Items.Food).
+        '''
+        return (TypeTable.categoriesOf(string) & TypeTable.VariantCategories[variant]) != 0
+
+    @staticmethod
+    def variantsOf(string, variants):
+        '''
+        Returns a list of the given enumerated types that a type string is a member of.
+        '''
+        categories = TypeTable.categoriesOf(string)
+        return [variant for variant in variants if categories & TypeTable.VariantCategories[variant]]
@@ -0,0 +1,190 @@
+# ==============================================================================================
+# This file contains a persistent model of the world, accumulated from the block grids observed
+# by every agent over the course of a mission.
+# ==============================================================================================
+import math
+import numpy
+from collections import OrderedDict
+from malmoext.Agent import Agent
+from malmoext.BlockGrid import BlockGrid
+
+class VoxelMap:
+    '''
+    A sparse map of block IDs (see BlockGrid) covering every part of the world observed by any agent. The map is made
+    up of fixed-size cubic chunks, each holding a NumPy array of block IDs shaped (Y, Z, X) and keyed by its (x,y,z)
+    chunk coordinate. Cells that have never been observed hold the Unobserved ID.
+
+    Merging an observation only writes the cells that changed. Each chunk records whether it changed since its dirty
+    flag was last cleared, along with the version of the map at which it last changed. Once the map holds more than
+    the maximum number of chunks, the least recently observed chunks (those furthest from any agent) are evicted.
+
+    The map can be added to a MissionLoop as a plugin, in which case it merges the observations of all agents on
+    every tick.
+    '''
+    ChunkSize = 16          # Length of each side of a chunk, in blocks
+    Unobserved = 0xFFFF     # The ID of cells that have never been observed
+
+    def __init__(self, maxChunks=1024):
+        self.__chunks = OrderedDict()   # A map of chunk coordinates to chunks, from least to most recently observed
+        self.__maxChunks = maxChunks    # The maximum number of chunks held before the least recently observed are evicted
+        self.version = 0                # Increases whenever any cell in the map changes
+        self.evictions = 0              # The number of chunks evicted so far
+
+    def __len__(self):
+        return len(self.__chunks)
+
+    def chunk(self, chunkCoordinate):
+        '''
+        Returns the chunk at the given (x,y,z) chunk coordinate, or None if no part of it has been observed.
+        '''
+        return self.__chunks.get(chunkCoordinate)
+
+    def chunks(self):
+        '''
+        Returns a list of the (x,y,z) chunk coordinates of all chunks, from least to most recently observed.
+        '''
+        return list(self.__chunks.keys())
+
+    def dirtyChunks(self, clear=True):
+        '''
+        Returns a list of the (x,y,z) chunk coordinates of all chunks that changed since their dirty flag was last
+        cleared. By default, the dirty flags of those chunks are then cleared.
+        '''
+        result = [coordinate for coordinate, chunk in self.__chunks.items() if chunk.dirty]
+        if clear:
+            for coordinate in result:
+                self.__chunks[coordinate].dirty = False
+        return result
+
+    def merge(self, grid, origin):
+        '''
+        Merge a block grid shaped (Y, Z, X) into the map, where the given (x,y,z) origin is the world position of its
+        first cell. Returns the number of cells that changed.
+        '''
+        size = VoxelMap.ChunkSize
+        ox, oy, oz = origin
+        height, depth, width = grid.shape
+        changedCells = 0
+        newVersion = self.version + 1
+
+        for cy in range(oy // size, (oy + height - 1) // size + 1):
+            for cz in range(oz // size, (oz + depth - 1) // size + 1):
+                for cx in range(ox // size, (ox + width - 1) // size + 1):
+                    # The overlap between the grid and this chunk, in world coordinates
+                    y0, y1 = max(oy, cy * size), min(oy + height, (cy + 1) * size)
+                    z0, z1 = max(oz, cz * size), min(oz + depth, (cz + 1) * size)
+                    x0, x1 = max(ox, cx * size), min(ox + width, (cx + 1) * size)
+
+                    chunk = self.__touch((cx, cy, cz))
+                    cells = chunk.blocks[y0 - cy * size:y1 - cy * size, z0 - cz * size:z1 - cz * size, x0 - cx * size:x1 - cx * size]
+                    observed = grid[y0 - oy:y1 - oy, z0 - oz:z1 - oz, x0 - ox:x1 - ox]
+                    changed = cells != observed
+                    count = int(numpy.count_nonzero(changed))
+                    if count > 0:
+                        cells[changed] = observed[changed]
+                        chunk.dirty = True
+                        chunk.version = newVersion
+                        changedCells += count
+
+        if changedCells > 0:
+            self.version = newVersion
+        self.__evict()
+        return changedCells
+
+    def mergeAgent(self, agent):
+        '''
+        Merge the block grid currently observed by an agent into the map. Returns the number of cells that changed.
+        '''
+        agentJSON = agent.toJSON()
+        cy, cz, cx = BlockGrid.Center
+        origin = (math.floor(agentJSON["XPos"]) - cx, math.floor(agentJSON["YPos"]) - cy, math.floor(agentJSON["ZPos"]) - cz)
+        return self.merge(agent.blockGrid(), origin)
+
+    def update(self):
+        '''
+        Merge the block grids currently observed by all agents into the map.
+        '''
+        for agent in list(Agent.allAgents.values()):
+            self.mergeAgent(agent)
+
+    def block(self, position):
+        '''
+        Returns the ID of the block at the given (x,y,z) world position, or Unobserved if it has not been observed.
+        '''
+        size = VoxelMap.ChunkSize
+        x, y, z = (math.floor(position[0]), math.floor(position[1]), math.floor(position[2]))
+        chunk = self.__chunks.get((x // size, y // size, z // size))
+        if chunk == None:
+            return VoxelMap.Unobserved
+        return int(chunk.blocks[y % size, z % size, x % size])
+
+    def region(self, origin, shape):
+        '''
+        Returns a copy of the block IDs in the box with the given (x,y,z) origin and (Y, Z, X) shape, as a NumPy array
+        shaped (Y, Z, X). Cells that have not been observed hold the Unobserved ID.
+        '''
+        size = VoxelMap.ChunkSize
+        ox, oy, oz = origin
+        height, depth, width = shape
+        result = numpy.full(shape, VoxelMap.Unobserved, dtype=numpy.uint16)
+
+        for cy in range(oy // size, (oy + height - 1) // size + 1):
+            for cz in range(oz // size, (oz + depth - 1) // size + 1):
+                for cx in range(ox // size, (ox + width - 1) // size + 1):
+                    chunk = self.__chunks.get((cx, cy, cz))
+                    if chunk == None:
+                        continue
+                    y0, y1 = max(oy, cy * size), min(oy + height, (cy + 1) * size)
+                    z0, z1 = max(oz, cz * size), min(oz + depth, (cz + 1) * size)
+                    x0, x1 = max(ox, cx * size), min(ox + width, (cx + 1) * size)
+                    result[y0 - oy:y1 - oy, z0 - oz:z1 - oz, x0 - ox:x1 - ox] = \
+                        chunk.blocks[y0 - cy * size:y1 - cy * size, z0 - cz * size:z1 - cz * size, x0 - cx * size:x1 - cx * size]
+        return result
+
+    def chunkVersions(self, origin, shape):
+        '''
+        Returns a tuple of the versions of the chunks overlapping the box with the given (x,y,z) origin and (Y, Z, X)
+        shape, holding None for any chunk not in the map. The tuple only changes once a cell within one of those chunks
+        changes, or one of them is added or evicted.
+        '''
+        size = VoxelMap.ChunkSize
+        ox, oy, oz = origin
+        height, depth, width = shape
+        result = []
+        for cy in range(oy // size, (oy + height - 1) // size + 1):
+            for cz in range(oz // size, (oz + depth - 1) // size + 1):
+                for cx in range(ox // size, (ox + width - 1) // size + 1):
+                    chunk = self.__chunks.get((cx, cy, cz))
+                    result.append(chunk.version if chunk != None else None)
+        return tuple(result)
+
+    def __touch(self, chunkCoordinate):
+        '''
+        Returns the chunk at the given chunk coordinate, creating it if necessary, and marks it as most recently observed.
+        '''
+        chunk = self.__chunks.get(chunkCoordinate)
+        if chunk == None:
+            chunk = VoxelMap.Chunk()
+            self.__chunks[chunkCoordinate] = chunk
+        else:
+            self.__chunks.move_to_end(chunkCoordinate)
+        return chunk
+
+    def __evict(self):
+        '''
+        Evict the least recently observed chunks until the map holds no more than the maximum number of chunks.
+        '''
+        while len(self.__chunks) > self.__maxChunks:
+            self.__chunks.popitem(last=False)
+            self.evictions += 1
+            self.version += 1
+
+    class Chunk:
+        '''
+        A fixed-size cube of block IDs within a VoxelMap.
+        '''
+        def __init__(self):
+            size = VoxelMap.ChunkSize
+            self.blocks = numpy.full((size, size, size), VoxelMap.Unobserved, dtype=numpy.uint16)   # The block IDs in this chunk, shaped (Y, Z, X)
+            self.dirty = False          # Whether or not this chunk changed since the flag was last cleared
+            self.version = 0            # The version of the map at which any cell in this chunk last changed
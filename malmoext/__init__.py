@@ -1,8 +1,22 @@
 import malmoext.MalmoPython as MalmoPython
 import malmoext.malmoutils as malmoutils
 from malmoext.Agent import *
+from malmoext.AsyncAgent import *
 from malmoext.Inventory import *
+from malmoext.Observation import *
+from malmoext.BlockGrid import *
+from malmoext.VoxelMap import *
+from malmoext.DistanceField import *
+from malmoext.PathPlanner import *
+from malmoext.BackgroundWriter import *
+from malmoext.LogSinks import *
+from malmoext.BinaryLog import *
+from malmoext.CompressedLog import *
+from malmoext.LogReader import *
 from malmoext.Logger import *
 from malmoext.Statistics import *
+from malmoext.TickExecutor import *
 from malmoext.MissionBuilder import *
-from malmoext.Utils import *
\ No newline at end of file
+from malmoext.MissionLoop import *
+from malmoext.Utils import *
+from malmoext.FakeHost import *
\ No newline at end of file
@@ -22,6 +22,8 @@ from __future__ import print_function
 import malmoext.MalmoPython as MalmoPython
 from malmoext.Agent import *
 from malmoext.MissionBuilder import *
+from malmoext.Inventory import Inventory
+from malmoext.Utils import EntityIds
 import os
 import sys
 import errno
@@ -32,6 +34,17 @@ CLIENT_POOL = None
 MISSION = None
 AGENTS = []
 
+# Delays (in seconds) between checks while waiting for a mission to start. The delay doubles after each check, up to the maximum.
+START_POLL_MIN_DELAY = 0.01
+START_POLL_MAX_DELAY = 0.25
+
+
+class MissionStartError(Exception):
+    '''
+    Raised when a mission could not be started, or when its agents did not become ready in time.
+    '''
+    pass
+
 
 # ORIGINAL MALMO FUNCTIONS ======================================================================================
 
@@ -132,35 +145,26 @@ def __safeMissionStart__(agent_host, mission, client_pool, recording, role, expe
                     print("Will wait and retry.", max_attempts - used_attempts, "attempts left.")
                     time.sleep(2)
             else:
-                print("Other error:", e.message)
-                print("Waiting will not help here - bailing immediately.")
-                exit(1)
+                raise MissionStartError("Could not start mission for role {}: {}".format(role, e.message))
         if used_attempts == max_attempts:
-            print("All chances used up - bailing now.")
-            exit(1)
+            raise MissionStartError("Could not start mission for role {} after {} attempts".format(role, max_attempts))
     print("startMission called okay.")
 
-def __safeWaitForStart__(agent_hosts):
-    print("Waiting for the mission to start", end=' ')
-    start_flags = [False for a in agent_hosts]
+def __safeWaitForStart__(agent_hosts, time_out=120):
+    print("Waiting for the mission to start")
     start_time = time.time()
-    time_out = 120  # Allow two minutes for mission to start.
-    while not all(start_flags) and time.time() - start_time < time_out:
+    delay = START_POLL_MIN_DELAY
+    while True:
         states = [a.peekWorldState() for a in agent_hosts]
-        start_flags = [w.has_mission_begun for w in states]
-        errors = [e for w in states for e in w.errors]
+        errors = [e.text for w in states for e in w.errors]
         if len(errors) > 0:
-            print("Errors waiting for mission start:")
-            for e in errors:
-                print(e.text)
-            print("Bailing now.")
-            exit(1)
-        time.sleep(0.1)
-        print(".", end=' ')
-    print()
-    if time.time() - start_time >= time_out:
-        print("Timed out waiting for mission to begin. Bailing.")
-        exit(1)
+            raise MissionStartError("Errors waiting for mission start: " + "; ".join(errors))
+        if all(w.has_mission_begun for w in states):
+            break
+        if time.time() - start_time >= time_out:
+            raise MissionStartError("Timed out waiting for mission to begin")
+        time.sleep(delay)
+        delay = min(delay * 2, START_POLL_MAX_DELAY)
     print("Mission has started.")
 
 
@@ -194,26 +198,67 @@ def loadMission(builder):
     __parse_command_line__(allAgents[0].getMalmoAgent())
     AGENTS = allAgents
 
-def startMission():
+def startMission(timeout=120):
     '''
-    Start the mission previously loaded.
+    Start the mission previously loaded, and wait until every agent has received its first observation. Returns a map
+    of agent IDs to the time (in seconds) each agent took to receive its first observation, measured from when the
+    mission was started. Raises a MissionStartError if the mission could not be started within the given timeout
+    (in seconds).
     '''
+    # Entity and item IDs are numbered per mission
+    EntityIds.reset()
+    Inventory.clearDropItems()
+
+    startTime = time.time()
     i = 0
     agent_hosts = list(map(lambda x: x.getMalmoAgent(), AGENTS))
     for host in agent_hosts:
         __safeMissionStart__(host, MISSION, CLIENT_POOL, __get_default_recording_object__(agent_hosts[0], "agent_{}_viewpoint_continuous".format(i + 1)), i, '')
         i += 1
-    __safeWaitForStart__(agent_hosts)
+    __safeWaitForStart__(agent_hosts, timeout)
 
-    # Make sure that atleast one observation has come through before releasing control
-    while AGENTS[0].toJSON() == None:
-        continue
+    # Make sure that an observation has come through for every agent before releasing control
+    return waitForObservations(AGENTS, timeout - (time.time() - startTime), startTime)
+
+def waitForObservations(agents=None, timeout=120, startTime=None):
+    '''
+    Wait until each of the given agents (defaulting to all agents) has received at least one observation, checking
+    less often the longer the wait goes on. Returns a map of agent IDs to the time (in seconds) each agent took to
+    receive its first observation, measured from the given start time (defaulting to now). Raises a MissionStartError
+    if any agent is still waiting once the timeout (in seconds) has passed, or if the mission ends first.
+    '''
+    agents = agents if agents != None else list(Agent.allAgents.values())
+    startTime = startTime if startTime != None else time.time()
+    deadline = time.time() + timeout
+    readyTimes = {}
+    delay = START_POLL_MIN_DELAY
+    while True:
+        for agent in agents:
+            if agent.id in readyTimes:
+                continue
+            worldState = agent.getMalmoAgent().peekWorldState()
+            if worldState.number_of_observations_since_last_state > 0:
+                agent.refresh()
+                readyTimes[agent.id] = time.time() - startTime
+            elif not worldState.is_mission_running:
+                raise MissionStartError("Mission ended before agent {} received an observation".format(agent.id))
+        if len(readyTimes) == len(agents):
+            return readyTimes
+        if time.time() >= deadline:
+            waiting = [agent.id for agent in agents if agent.id not in readyTimes]
+            raise MissionStartError("Timed out waiting for observations from agents: {}".format(", ".join(waiting)))
+        time.sleep(delay)
+        delay = min(delay * 2, START_POLL_MAX_DELAY)
 
 def isMissionActive():
     '''
-    Returns true if the mission is still active/running, false otherwise.
+    Returns true if the mission is still active/running, false otherwise. Since this function is checked once
+    per mission loop iteration, it also marks the start of a new tick for each agent.
     '''
-    for agent in list(Agent.allAgents.values()):
+    allAgents = list(Agent.allAgents.values())
+    for agent in allAgents:
+        agent.nextTick()
+    for agent in allAgents:
         if agent.isMissionActive():
             return True
     return False
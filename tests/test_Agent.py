@@ -0,0 +1,248 @@
+# ==============================================================================================
+# Tests for the actions of agents that complete over several mission loop iterations, run against
+# a FakeAgentHost serving synthetic observations.
+# ==============================================================================================
+import json
+import math
+import unittest
+from malmoext import *
+
+class WalledGenerator(ObservationGenerator):
+    '''
+    An ObservationGenerator for a flat world holding the given blocks, which the agent can not walk into.
+    '''
+    def __init__(self, blocks, **kwargs):
+        ObservationGenerator.__init__(self, **kwargs)
+        self.blocks = blocks                # A map of (x,y,z) cells to block names, above the ground
+        self.blockGrid = self.grid()
+
+    def blockAt(self, x, y, z):
+        '''
+        Returns the name of the block in the given cell.
+        '''
+        if y < ObservationGenerator.GroundLevel - 1:
+            return "dirt"
+        if y == ObservationGenerator.GroundLevel - 1:
+            return "grass"
+        return self.blocks.get((x, y, z), "air")
+
+    def grid(self):
+        '''
+        Returns the block grid observed by the agent at its current position.
+        '''
+        cy, cz, cx = BlockGrid.Center
+        ox, oy, oz = math.floor(self.position.x) - cx, math.floor(self.position.y) - cy, math.floor(self.position.z) - cz
+        return [self.blockAt(ox + x, oy + y, oz + z) for y in range(0, GRID_OBSERVATION_Y_LEN)
+            for z in range(0, GRID_OBSERVATION_Z_LEN) for x in range(0, GRID_OBSERVATION_X_LEN)]
+
+    def __call__(self, host):
+        previous = self.position
+        ObservationGenerator.__call__(self, host)
+        x, y, z = math.floor(self.position.x), math.floor(self.position.y), math.floor(self.position.z)
+        if self.blockAt(x, y, z) != "air":
+            # Step up onto blocks one block high while jumping, and bump into anything else
+            if host.continuousValue("jump") == 1 and self.blockAt(x, y + 1, z) == "air" and self.blockAt(x, y, z) == "stone":
+                self.position = Vector(self.position.x, self.position.y + 1, self.position.z)
+            else:
+                self.position = previous
+        self.blockGrid = self.grid()
+        return json.dumps(self.observation())
+
+class TestAgent(unittest.TestCase):
+
+    def setUp(self):
+        self.generators = {}
+        Agent.setHostFactory(self.createHost)
+
+    def tearDown(self):
+        Agent.setHostFactory(None)
+        Agent.allAgents.clear()
+
+    def createHost(self, agentID):
+        '''
+        Returns a FakeAgentHost serving the observations of the generator for an agent.
+        '''
+        return FakeAgentHost(self.generators[agentID])
+
+    def createAgent(self, agentID, generator=None):
+        '''
+        Create an agent whose observations are served by the given generator.
+        '''
+        self.generators[agentID] = generator if generator != None else ObservationGenerator(agentID)
+        agent = Agent(agentID, AgentType.Hardcoded)
+        agent.nextTick()
+        return agent
+
+    def reports(self, agent, reportType):
+        '''
+        Returns the log reports of the given type made by an agent since they were last cleared.
+        '''
+        return [report for report in agent.getAndClearLogReports() if type(report).__name__ == reportType]
+
+    def testAttackSucceedsOnKill(self):
+        '''
+        An attack stays pending until the mob is killed, and then succeeds.
+        '''
+        agent = self.createAgent("Alpha")
+        mob = Entity("zombie", "Zombie", Vector(0.5, 5, 2.0), 0)
+        self.assertEqual(agent.attackMob(mob), ActionStatus.Pending)
+        for i in range(0, 3):
+            agent.nextTick()
+            self.assertEqual(agent.attackMob(mob), ActionStatus.Pending)
+            self.assertEqual(agent.lookAt(mob), ActionStatus.Pending)
+
+        self.generators["Alpha"].mobsKilled += 1
+        agent.nextTick()
+        self.assertEqual(agent.attackMob(mob), ActionStatus.Succeeded)
+        report = self.reports(agent, "AttackReport")[0]
+        self.assertEqual(report.mob, mob)
+        self.assertTrue(report.didKill)
+
+        agent.nextTick()
+        host = agent.getMalmoAgent()
+        self.assertEqual([command for command in host.commands if command.startswith("attack")], ["attack 1", "attack 0"])
+
+    def testAttackTimesOut(self):
+        '''
+        An attack that does not kill its target fails once its timeout passes, and is still logged as a swing.
+        '''
+        agent = self.createAgent("Alpha")
+        mob = Entity("zombie", "Zombie", Vector(0.5, 5, 2.0), 0)
+        self.assertEqual(agent.attackMob(mob, timeout=0), ActionStatus.Pending)
+        agent.nextTick()
+        self.assertEqual(agent.attackMob(mob), ActionStatus.Failed)
+        self.assertFalse(self.reports(agent, "AttackReport")[0].didKill)
+
+    def testAttackPreconditions(self):
+        '''
+        Attacking fails if the target is not a mob, or is out of reach.
+        '''
+        agent = self.createAgent("Alpha")
+        self.assertEqual(agent.attackMob(Entity("far", "Zombie", Vector(0.5, 5, 20.0), 0)), ActionStatus.Failed)
+        self.assertEqual(agent.attackMob(Entity("item", "beef", Vector(0.5, 5, 2.0), 1)), ActionStatus.Failed)
+        self.assertFalse(agent.attackMob(Entity("far", "Zombie", Vector(0.5, 5, 20.0), 0)))
+
+    def testCraft(self):
+        '''
+        Crafting stays pending until the crafted item shows up in the inventory, and then consumes the recipe items.
+        '''
+        generator = ObservationGenerator("Alpha")
+        generator.inventory = [{"type": "wheat", "index": 0, "quantity": 3, "inventory": "inventory"}]
+        agent = self.createAgent("Alpha", generator)
+        agent.inventory.sync()
+        recipe = [RecipeItem(Items.All.wheat, 3)]
+
+        self.assertEqual(agent.craft(Items.All.bread, recipe), ActionStatus.Pending)
+        self.assertEqual(agent.getMalmoAgent().commands[-1], "craft bread")
+        agent.nextTick()
+        self.assertEqual(agent.craft(Items.All.bread, recipe), ActionStatus.Pending)
+
+        generator.inventory = [{"type": "bread", "index": 0, "quantity": 1, "inventory": "inventory"}]
+        agent.nextTick()
+        self.assertEqual(agent.craft(Items.All.bread, recipe), ActionStatus.Succeeded)
+        report = self.reports(agent, "CraftReport")[0]
+        self.assertEqual(report.itemCrafted.type, "bread")
+        self.assertEqual([item.type for item in report.itemsUsed], ["wheat"] * 3)
+        self.assertEqual(agent.inventory.amountOfItem(Items.All.wheat), 0)
+        self.assertEqual(agent.inventory.amountOfItem(Items.All.bread), 1)
+
+    def testCraftFails(self):
+        '''
+        Crafting fails without the recipe items, or if the crafted item does not show up before the timeout.
+        '''
+        agent = self.createAgent("Alpha")
+        self.assertEqual(agent.craft(Items.All.bread, [RecipeItem(Items.All.wheat, 3)]), ActionStatus.Failed)
+        self.assertEqual(agent.craft(Items.All.bread, [], timeout=0), ActionStatus.Pending)
+        agent.nextTick()
+        self.assertEqual(agent.craft(Items.All.bread, []), ActionStatus.Failed)
+        self.assertEqual(self.reports(agent, "CraftReport"), [])
+
+    def testLookAtAndMoveTo(self):
+        '''
+        An agent turns to face its target, and only then walks to it.
+        '''
+        agent = self.createAgent("Alpha")
+        cow = Entity("cow", "Cow", Vector(8.5, 4, 6.5), 0)
+        self.assertFalse(agent.moveTo(cow))
+        self.assertTrue(self.runUntil(agent, lambda: agent.lookAt(cow) and agent.moveTo(cow), 200))
+        position = self.generators["Alpha"].position
+        self.assertLessEqual(math.hypot(position.x - cow.position.x, position.z - cow.position.z), STRIKING_DISTANCE)
+        self.assertEqual(self.reports(agent, "MoveToReport")[-1].entity, cow)
+        agent.nextTick()
+        self.assertEqual(agent.getMalmoAgent().continuousValue("move"), 0)
+
+    def runUntil(self, agent, action, ticks, voxelMap=None):
+        '''
+        Repeat an action once per tick until it returns true, returning false if it does not within the given number
+        of ticks.
+        '''
+        for i in range(0, ticks):
+            agent.nextTick()
+            if voxelMap != None:
+                voxelMap.update()
+            if action():
+                return True
+        return False
+
+    def walkAround(self, blocks, cowPosition):
+        '''
+        Walk an agent with a path planner to a cow beyond the given blocks. Returns the agent and whether it arrived.
+        '''
+        generator = WalledGenerator(blocks, name="Alpha")
+        cow = {"yaw": 0.0, "x": cowPosition.x, "y": cowPosition.y, "z": cowPosition.z, "pitch": 0.0, "id": "walled-cow",
+            "motionX": 0.0, "motionY": 0.0, "motionZ": 0.0, "name": "Cow", "life": 10.0}
+        generator.entities.append(cow)
+        agent = self.createAgent("Alpha", generator)
+        voxelMap = VoxelMap()
+        agent.setPlanner(PathPlanner(voxelMap))
+
+        def action():
+            mob = agent.closestMob()
+            return mob != None and agent.lookAt(mob) and agent.moveTo(mob)
+        return agent, self.runUntil(agent, action, 1500, voxelMap)
+
+    def testWalksAroundWall(self):
+        '''
+        With a path planner, agents walk around walls between them and their target.
+        '''
+        blocks = {(x, y, 5): "stone" for x in range(-6, 7) for y in (4, 5)}
+        agent, arrived = self.walkAround(blocks, Vector(0.5, 4, 10.5))
+        self.assertTrue(arrived)
+        self.assertGreater(self.generators["Alpha"].position.z, 5)
+
+    def testWalksAroundFence(self):
+        '''
+        With a path planner, agents walk around fences rather than trying to jump onto them.
+        '''
+        blocks = {(x, 4, 5): "fence" for x in range(-6, 7)}
+        agent, arrived = self.walkAround(blocks, Vector(0.5, 4, 10.5))
+        self.assertTrue(arrived)
+        self.assertEqual(self.generators["Alpha"].position.y, 4)
+
+    def testMoveToFailsWithoutPath(self):
+        '''
+        With a path planner, moving to a mob enclosed by walls fails, rather than following a path that does not exist.
+        '''
+        blocks = {(x, y, z): "stone" for x in (-1, 0, 1) for y in (4, 5) for z in (3, 4, 5) if (x, z) != (0, 4)}
+        generator = WalledGenerator(blocks, name="Alpha")
+        generator.entities.append({"yaw": 0.0, "x": 0.5, "y": 4.0, "z": 4.5, "pitch": 0.0, "id": "penned-cow",
+            "motionX": 0.0, "motionY": 0.0, "motionZ": 0.0, "name": "Cow", "life": 10.0})
+        agent = self.createAgent("Alpha", generator)
+        voxelMap = VoxelMap()
+        voxelMap.update()
+        agent.setPlanner(PathPlanner(voxelMap))
+        mob = agent.closestMob()
+        self.assertTrue(self.runUntil(agent, lambda: agent.lookAt(mob), 100))
+        self.assertEqual(agent.moveTo(mob), ActionStatus.Failed)
+        self.assertEqual(agent.moveTo(mob), ActionStatus.Failed)
+        self.assertEqual(agent.getMalmoAgent().continuousValue("move"), 0)
+
+    def testJumpsUpSteps(self):
+        '''
+        With a path planner, agents jump onto blocks one block high.
+        '''
+        blocks = {(x, 4, z): "stone" for x in range(-20, 21) for z in range(5, 20)}
+        agent, arrived = self.walkAround(blocks, Vector(0.5, 5, 10.5))
+        self.assertTrue(arrived)
+        self.assertEqual(self.generators["Alpha"].position.y, 5)
+        self.assertIn("jump 1", agent.getMalmoAgent().commands)
@@ -0,0 +1,104 @@
+# ==============================================================================================
+# Tests for the asyncio facade over Agent, run against a FakeAgentHost whose world changes while
+# actions are being awaited.
+# ==============================================================================================
+import asyncio
+import math
+import unittest
+from malmoext import *
+
+class PollingHost(FakeAgentHost):
+    '''
+    A FakeAgentHost that receives a new observation each time it is polled for one, as an AsyncAgent does while
+    waiting for the next observation.
+    '''
+    def peekWorldState(self):
+        self.tick()
+        return FakeAgentHost.peekWorldState(self)
+
+class ChangingGenerator(ObservationGenerator):
+    '''
+    An ObservationGenerator that calls the given function with itself before each observation, so that the world can
+    change from one observation to the next.
+    '''
+    def __init__(self, change, **kwargs):
+        ObservationGenerator.__init__(self, **kwargs)
+        self.change = change        # The function changing the world before each observation
+
+    def __call__(self, host):
+        self.change(self)
+        return ObservationGenerator.__call__(self, host)
+
+class TestAsyncAgent(unittest.TestCase):
+
+    def setUp(self):
+        Agent.setHostFactory(lambda agentID: PollingHost(self.generator, autoTick=False))
+
+    def tearDown(self):
+        Agent.setHostFactory(None)
+        Agent.allAgents.clear()
+
+    def createAgent(self, entity, change):
+        '''
+        Create an AsyncAgent seeing the given entity JSON, where the world is changed by the given function before each
+        observation. Returns the AsyncAgent along with the entity as observed by the agent.
+        '''
+        self.generator = ChangingGenerator(change, name="Alpha")
+        self.generator.entities.append(entity)
+        agent = Agent("Alpha", AgentType.Hardcoded)
+        agent.getMalmoAgent().tick()
+        return AsyncAgent(agent), agent.nearbyEntities()[-1]
+
+    def complete(self, coroutine):
+        '''
+        Run a coroutine to completion, failing if it takes too long.
+        '''
+        return asyncio.run(asyncio.wait_for(coroutine, 10))
+
+    def testMoveToFollowsMovingTarget(self):
+        '''
+        Moving to an entity walks to where it is now, rather than to where it was when the action started.
+        '''
+        cow = {"x": 0.5, "y": 4.0, "z": 8.5, "id": "moving-cow", "name": "Cow", "life": 10.0}
+        def change(generator):
+            cow["x"] += 0.1
+        agent, entity = self.createAgent(cow, change)
+        self.assertTrue(self.complete(agent.moveTo(entity)))
+        position = self.generator.position
+        self.assertLessEqual(math.hypot(position.x - cow["x"], position.z - cow["z"]), STRIKING_DISTANCE)
+
+    def testPickUpItemFailsOnceGone(self):
+        '''
+        Picking up an item fails once the item can no longer be seen, after which the agent stops walking once its
+        commands are sent.
+        '''
+        beef = {"x": 0.5, "y": 4.0, "z": 20.5, "id": "vanishing-beef", "name": "beef", "quantity": 1}
+        def change(generator):
+            if generator.ticks == 10:
+                generator.entities.clear()
+        agent, item = self.createAgent(beef, change)
+        self.assertEqual(self.complete(agent.pickUpItem(item)), ActionStatus.Failed)
+        agent.flushCommands()
+        self.assertEqual(agent.getMalmoAgent().continuousValue("move"), 0)
+
+    def testPickUpItemTimesOut(self):
+        '''
+        Picking up an item fails if it is not picked up in time once the agent is close to it.
+        '''
+        beef = {"x": 0.5, "y": 4.0, "z": 2.5, "id": "stuck-beef", "name": "beef", "quantity": 1}
+        agent, item = self.createAgent(beef, lambda generator: None)
+        self.assertEqual(self.complete(agent.pickUpItem(item, timeout=0)), ActionStatus.Failed)
+        self.assertEqual(self.complete(agent.lookAt(item)), True)
+
+    def testPickUpItem(self):
+        '''
+        Picking up an item succeeds once it shows up in the agent's inventory.
+        '''
+        beef = {"x": 0.5, "y": 4.0, "z": 2.5, "id": "nearby-beef", "name": "beef", "quantity": 1}
+        def change(generator):
+            if generator.ticks == 10:
+                generator.entities.clear()
+                generator.inventory = [{"type": "beef", "index": 0, "quantity": 1, "inventory": "inventory"}]
+        agent, item = self.createAgent(beef, change)
+        self.assertEqual(self.complete(agent.pickUpItem(item)), ActionStatus.Succeeded)
+        self.assertEqual(agent.inventory.amountOfItem(Items.Food.beef), 1)
@@ -0,0 +1,102 @@
+# ==============================================================================================
+# Tests for the buffer that coalesces the commands sent to a Malmo AgentHost.
+# ==============================================================================================
+import unittest
+from malmoext import *
+from malmoext.CommandBuffer import CommandBuffer
+
+class TestCommandBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.host = FakeAgentHost([])
+        self.buffer = CommandBuffer(self.host)
+
+    def testSendsImmediatelyUntilBuffering(self):
+        '''
+        Without buffering, every command that is not redundant is sent as soon as it is given.
+        '''
+        self.buffer.send("move 1")
+        self.buffer.send("turn 0.5")
+        self.buffer.send("move 1")
+        self.assertEqual(self.host.commands, ["move 1", "turn 0.5"])
+        self.assertEqual(self.buffer.stats(), CommandBuffer.Stats(2, 1))
+
+    def testSteeringTakesLastValuePerFlush(self):
+        '''
+        While buffering, steering commands only take on their last value, and are dropped if that value was already sent.
+        '''
+        self.buffer.setBuffering(True)
+        self.buffer.send("move 1")
+        self.buffer.send("move 0.5")
+        self.buffer.send("turn 1")
+        self.assertEqual(self.host.commands, [])
+        self.buffer.flush()
+        self.assertEqual(self.host.commands, ["move 0.5", "turn 1"])
+
+        self.buffer.send("move 0")
+        self.buffer.send("move 0.5")
+        self.buffer.flush()
+        self.assertEqual(self.host.commands, ["move 0.5", "turn 1"])
+        self.assertEqual(self.buffer.stats(), CommandBuffer.Stats(2, 3))
+
+    def testTogglesKeepTheirOrder(self):
+        '''
+        Toggle commands are sent in order, unless they would not change the last value given.
+        '''
+        self.buffer.setBuffering(True)
+        self.buffer.send("attack 1")
+        self.buffer.send("attack 1")
+        self.buffer.send("attack 0")
+        self.buffer.send("attack 1")
+        self.buffer.flush()
+        self.assertEqual(self.host.commands, ["attack 1", "attack 0", "attack 1"])
+
+        self.buffer.send("attack 1")
+        self.buffer.flush()
+        self.assertEqual(self.host.commands, ["attack 1", "attack 0", "attack 1"])
+
+    def testOtherCommandsFlushInOrder(self):
+        '''
+        Commands that can not be coalesced flush any held commands and are sent immediately, preserving order.
+        '''
+        self.buffer.setBuffering(True)
+        self.buffer.send("move 1")
+        self.buffer.send("craft bread")
+        self.assertEqual(self.host.commands, ["move 1", "craft bread"])
+        self.buffer.send("craft bread")
+        self.buffer.send("hotbar.1 1")
+        self.assertEqual(self.host.commands, ["move 1", "craft bread", "craft bread", "hotbar.1 1"])
+
+    def testStoppingBufferingFlushes(self):
+        '''
+        Turning buffering off sends any held commands.
+        '''
+        self.buffer.setBuffering(True)
+        self.buffer.send("pitch -0.5")
+        self.buffer.setBuffering(False)
+        self.assertEqual(self.host.commands, ["pitch -0.5"])
+        self.buffer.send("pitch 0")
+        self.assertEqual(self.host.commands, ["pitch -0.5", "pitch 0"])
+
+    def testAgentsBufferOnceTicked(self):
+        '''
+        Agents send commands immediately until they are first ticked, and once per tick from then on.
+        '''
+        Agent.setHostFactory(lambda agentID: FakeAgentHost(ObservationGenerator(agentID)))
+        try:
+            agent = Agent("CommandBufferAgent", AgentType.Hardcoded)
+        finally:
+            Agent.setHostFactory(None)
+        try:
+            host = agent.getMalmoAgent()
+            agent.stopMoving()
+            self.assertEqual(host.commands, ["pitch 0", "turn 0", "move 0", "attack 0"])
+
+            agent.nextTick()
+            agent.lookAt(Entity("target", "Cow", Vector(10.5, 4, 0.5), 0))
+            self.assertEqual(host.commands, ["pitch 0", "turn 0", "move 0", "attack 0"])
+            agent.nextTick()
+            self.assertEqual(sorted(command.split(" ")[0] for command in host.commands[4:]), ["pitch", "turn"])
+            self.assertNotEqual(host.continuousValue("turn"), 0)
+        finally:
+            del Agent.allAgents[agent.id]
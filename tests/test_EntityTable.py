@@ -0,0 +1,161 @@
+# ==============================================================================================
+# Tests for the vectorized nearby entity queries, checking them against brute force searches.
+# ==============================================================================================
+import math
+import random
+import unittest
+import numpy
+from malmoext import *
+from malmoext.EntityTable import EntityTable, SpatialIndex
+from malmoext.Utils import EntityIds
+
+class TestEntityTable(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(0)
+        types = [x.value for x in Mobs.All] + [x.value for x in Items.All]
+        self.json = []
+        for i in range(0, 300):
+            self.json.append({
+                "x": round(rng.uniform(-40, 40), 1),
+                "y": float(rng.randint(3, 6)),
+                "z": round(rng.uniform(-40, 40), 1),
+                "id": "entity-table-{}".format(i),
+                "name": types[rng.randrange(len(types))]
+            })
+        self.table = EntityTable(self.json)
+        self.origin = Vector(1.5, 4.0, -2.5)
+
+    def bruteForce(self, position, variant=None, xzOnly=False):
+        '''
+        Returns the (distance, index) of each entity, filtered by an enumerated type, sorted from closest to farthest.
+        '''
+        result = []
+        for i, k in enumerate(self.json):
+            if variant != None and not variant.isMember(k["name"]):
+                continue
+            dy = 0 if xzOnly else k["y"] - position.y
+            result.append((math.sqrt((k["x"] - position.x) ** 2 + dy ** 2 + (k["z"] - position.z) ** 2), i))
+        result.sort()
+        return result
+
+    def positions(self, entities):
+        '''
+        Returns the (x,y,z) position of each of the given entities.
+        '''
+        return [tuple(entity.position) for entity in entities]
+
+    def jsonPositions(self, indices):
+        '''
+        Returns the (x,y,z) position of the entity at each of the given indices.
+        '''
+        return [(self.json[i]["x"], self.json[i]["y"], self.json[i]["z"]) for i in indices]
+
+    def testWithin(self):
+        '''
+        Entities within a radius are found in order of distance, optionally filtered by type and ignoring height.
+        '''
+        for radius in [0.5, 4.0, 10.0, 100.0]:
+            for variant in [None, Mobs.All, Mobs.Hostile, Items.All]:
+                for xzOnly in [False, True]:
+                    expected = [i for distance, i in self.bruteForce(self.origin, variant, xzOnly) if distance <= radius]
+                    result = self.table.within(self.origin, radius, variant, xzOnly)
+                    self.assertEqual(self.positions(result), self.jsonPositions(expected))
+
+    def testNearest(self):
+        '''
+        The k nearest entities are found in order of distance, even when k exceeds the number of entities.
+        '''
+        for k in [0, 1, 5, 50, 1000]:
+            for variant in [None, Mobs.Peaceful, Items.Food]:
+                expected = [i for distance, i in self.bruteForce(self.origin, variant)][:k]
+                result = self.table.nearest(self.origin, k, variant)
+                self.assertEqual(self.positions(result), self.jsonPositions(expected))
+
+    def testClosestByVariant(self):
+        '''
+        The closest entity of each enumerated type is found, or None if there is no entity of that type.
+        '''
+        variants = [Mobs.All, Mobs.Peaceful, Mobs.Hostile, Mobs.Food, Items.All, Items.Food]
+        result = self.table.closestByVariant(self.origin, variants)
+        for variant in variants:
+            expected = self.bruteForce(self.origin, variant)
+            self.assertEqual(self.positions([result[variant]]), self.jsonPositions([expected[0][1]]))
+            self.assertEqual(self.table.closest(self.origin, variant), result[variant])
+
+        table = EntityTable([k for k in self.json if not Items.All.isMember(k["name"])])
+        self.assertEqual(table.closest(self.origin, Items.All), None)
+
+    def testEqualDistancesKeepObservedOrder(self):
+        '''
+        Entities at the same distance are returned in the order they were observed.
+        '''
+        json = [{"x": 3.0 * (-1) ** i, "y": 4.0, "z": 0.0, "id": "equal-{}".format(i), "name": "Cow"} for i in range(0, 6)]
+        table = EntityTable(json)
+        result = table.within(Vector(0.0, 4.0, 0.0), 5.0)
+        self.assertEqual([entity.position.x for entity in result], [3.0, -3.0, 3.0, -3.0, 3.0, -3.0])
+        self.assertEqual(result, table.entities())
+
+    def testEntitiesAreInterned(self):
+        '''
+        Entity tuples are created once per table, and the same entity is given the same ID in every table.
+        '''
+        other = EntityTable(list(reversed(self.json)))
+        self.assertIs(self.table.entity(0), self.table.entity(0))
+        self.assertEqual(self.table.entity(0).id, other.entity(len(self.json) - 1).id)
+        self.assertEqual(len(set(entity.id for entity in self.table.entities())), len(self.json))
+
+    def testEntityIdsReset(self):
+        '''
+        Once the intern table is reset, entities are numbered from 1 again.
+        '''
+        alias = self.table.entity(0).id
+        EntityIds.reset()
+        self.assertEqual(EntityIds.idOf(self.json[0]["id"]), None)
+        self.assertEqual(EntityTable(self.json).entity(5).id, self.json[5]["name"] + "1")
+        self.assertEqual(EntityIds.nextID(), 2)
+        self.assertNotEqual(EntityTable(self.json).entity(0).id, alias)
+
+    def testAliasesSkipReservedNames(self):
+        '''
+        Entities and items are never given an alias already taken by a reserved name, such as the ID of an agent.
+        '''
+        EntityIds.reset()
+        EntityIds.reserve("Cow1")
+        EntityIds.reserve("beef3")
+        cow = EntityTable([{"x": 0.0, "y": 4.0, "z": 0.0, "id": "reserved-cow", "name": "Cow"}]).entity(0)
+        self.assertEqual(cow.id, "Cow2")
+        self.assertEqual(Inventory(None).addItem(Items.Food.beef).id, "beef4")
+
+    def testEmptyTable(self):
+        '''
+        Queries over a table without entities return nothing.
+        '''
+        table = EntityTable([])
+        self.assertEqual(len(table), 0)
+        self.assertEqual(table.within(self.origin, 100.0), [])
+        self.assertEqual(table.nearest(self.origin, 3), [])
+        self.assertEqual(table.closest(self.origin, Mobs.All), None)
+
+    def testInvalidVariant(self):
+        '''
+        Filtering by anything but an enumerated type of entity is an error.
+        '''
+        with self.assertRaises(Exception):
+            self.table.within(self.origin, 10.0, AgentType.Hardcoded)
+
+    def testSpatialIndexCandidates(self):
+        '''
+        The candidates for a region include every position within it.
+        '''
+        index = SpatialIndex(self.table.positions)
+        for radius in [0.1, 3.9, 4.0, 25.0]:
+            candidates = set(index.candidates(self.origin, radius).tolist())
+            for distance, i in self.bruteForce(self.origin, xzOnly=True):
+                if distance <= radius:
+                    self.assertIn(i, candidates)
+        self.assertGreaterEqual(index.maxDistance(self.origin), self.bruteForce(self.origin)[-1][0])
+
+        empty = SpatialIndex(numpy.zeros((0, 3)))
+        self.assertEqual(len(empty.candidates(self.origin, 10.0)), 0)
+        self.assertEqual(empty.maxDistance(self.origin), 0.0)
@@ -0,0 +1,167 @@
+# ==============================================================================================
+# Tests for the indexed reader of the text logs output by the Logger.
+# ==============================================================================================
+import os
+import shutil
+import tempfile
+import unittest
+from malmoext import *
+
+class TestLogReader(unittest.TestCase):
+    Log = [
+        "none-None-NoneType",
+        "agent-Alpha",
+        "agent-Beta",
+        "mob-Zombie3-Zombie",
+        "at-Alpha-None",
+        "START",
+        "",
+        "looking_at-Alpha-Zombie3",
+        "!ATTACK-Alpha-Zombie3",
+        "status-Zombie3-dead",
+        "",
+        "item-beef4-beef",
+        "at-beef4-Beta",
+        "!GIVE-Beta-beef4-Alpha",
+        "at-beef4-Alpha",
+        "",
+        "!ATTACK-Beta-Zombie3",
+        "END"
+    ]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filepath = os.path.join(self.directory, "mission.log")
+        self.writeLog(TestLogReader.Log)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def writeLog(self, lines, newline="\n"):
+        '''
+        Write the given lines to the log file.
+        '''
+        with open(self.filepath, "w", newline="") as f:
+            f.write(newline.join(lines))
+
+    def open(self, saveIndex=True):
+        '''
+        Open a reader for the log file, closing it once the test is done.
+        '''
+        reader = LogReader(self.filepath, saveIndex)
+        self.addCleanup(reader.close)
+        return reader
+
+    def testIndex(self):
+        '''
+        Every line is indexed by its predicate and by the entities among its arguments.
+        '''
+        reader = self.open()
+        self.assertEqual(reader.predicates()["at"], 3)
+        self.assertEqual(reader.predicates()["!ATTACK"], 2)
+        self.assertEqual(reader.predicates()["START"], 1)
+        self.assertNotIn("", reader.predicates())
+        self.assertEqual(reader.entities()["Zombie3"], 5)
+        self.assertEqual(reader.entities()["beef4"], 4)
+        self.assertNotIn("None", reader.entities())
+        self.assertEqual(reader.actionCount(), 3)
+
+    def testRecords(self):
+        '''
+        Lines are split into their predicate and arguments.
+        '''
+        reader = self.open()
+        self.assertEqual(reader.action(1).predicate, "!GIVE")
+        self.assertEqual(reader.action(1).args, ["Beta", "beef4", "Alpha"])
+        self.assertEqual(reader.line(reader.action(0).offset), "!ATTACK-Alpha-Zombie3")
+        self.assertEqual(reader.record(0), LogReader.Record(0, "none", ["None", "NoneType"]))
+
+    def testQuery(self):
+        '''
+        Lines are queried by predicate, entity, argument and whether or not they are actions, in log order.
+        '''
+        reader = self.open()
+        lines = lambda records: [reader.line(record.offset) for record in records]
+        self.assertEqual(lines(reader.query("!ATTACK")), ["!ATTACK-Alpha-Zombie3", "!ATTACK-Beta-Zombie3"])
+        self.assertEqual(lines(reader.query("!ATTACK", "Alpha", argument=0)), ["!ATTACK-Alpha-Zombie3"])
+        self.assertEqual(lines(reader.query("!ATTACK", "Alpha", argument=1)), [])
+        self.assertEqual(lines(reader.query(entity="beef4", isAction=False)), ["item-beef4-beef", "at-beef4-Beta", "at-beef4-Alpha"])
+        self.assertEqual(lines(reader.query(entity="Zombie3", isAction=True)), ["!ATTACK-Alpha-Zombie3", "!ATTACK-Beta-Zombie3"])
+        self.assertEqual(reader.query("at", "Zombie3"), [])
+        self.assertEqual(reader.query("unknown"), [])
+        with self.assertRaises(Exception):
+            reader.query()
+
+    def testSavedIndex(self):
+        '''
+        The index is saved next to the log and reused, until the log changes.
+        '''
+        first = self.open()
+        self.assertTrue(os.path.isfile(self.filepath + LogReader.IndexExtension))
+        second = self.open()
+        self.assertEqual(second.predicates(), first.predicates())
+        self.assertEqual(second.entities(), first.entities())
+        self.assertEqual(second.actionCount(), first.actionCount())
+
+        self.writeLog(TestLogReader.Log + ["", "!ATTACK-Alpha-Zombie9"])
+        third = self.open()
+        self.assertEqual(third.actionCount(), 4)
+        self.assertEqual(third.entities()["Zombie9"], 1)
+
+    def testUnsavedIndex(self):
+        '''
+        The index is only saved if asked for.
+        '''
+        self.open(saveIndex=False)
+        self.assertFalse(os.path.isfile(self.filepath + LogReader.IndexExtension))
+
+    def testWindowsLineEndings(self):
+        '''
+        Carriage returns are not part of the lines.
+        '''
+        self.writeLog(TestLogReader.Log, "\r\n")
+        reader = self.open()
+        self.assertEqual(reader.action(0).args, ["Alpha", "Zombie3"])
+        self.assertEqual(reader.query("END")[0].predicate, "END")
+
+    def testHyphenatedIds(self):
+        '''
+        Arguments may contain a '-', such as the IDs of agents, and are split by the number of arguments each
+        predicate takes.
+        '''
+        self.writeLog([
+            "agents-red-team-Agent",
+            "agents-Beta-Agent",
+            "items-cooked-beef4-cooked-beef",
+            "START",
+            "",
+            "at-red-team-None",
+            "!GIVEITEM-Beta-cooked-beef4-red-team",
+            "!LOOKAT-red-team-cooked-beef4-red-team",
+            "at-cooked-beef4-red-team",
+            "END"
+        ])
+        reader = self.open()
+        self.assertEqual(reader.record(0).args, ["red-team", "Agent"])
+        self.assertEqual(reader.query("items")[0].args, ["cooked-beef4", "cooked-beef"])
+        self.assertEqual(reader.query("at")[0].args, ["red-team", "None"])
+        self.assertEqual(reader.action(0).args, ["Beta", "cooked-beef4", "red-team"])
+        self.assertEqual(reader.action(1).args, ["red-team", "cooked-beef4", "red-team"])
+        self.assertEqual(reader.query("at", "red-team", argument=1)[0].args, ["cooked-beef4", "red-team"])
+        self.assertEqual(reader.entities()["red-team"], 5)
+        self.assertEqual(reader.entities()["cooked-beef4"], 4)
+        self.assertNotIn("team", reader.entities())
+        self.assertEqual(reader.predicates()["START"], 1)
+
+        # IDs learned while indexing are saved along with the index
+        self.assertEqual(self.open().action(0).args, ["Beta", "cooked-beef4", "red-team"])
+
+    def testEmptyLog(self):
+        '''
+        An empty log has nothing in it.
+        '''
+        self.writeLog([])
+        reader = self.open()
+        self.assertEqual(reader.predicates(), {})
+        self.assertEqual(reader.actionCount(), 0)
+        self.assertEqual(reader.query("at"), [])
@@ -0,0 +1,218 @@
+# ==============================================================================================
+# Tests for the sinks that mission logs are written to, checking that every sink and converter
+# round-trips to exactly the text written by exporting a MemorySink.
+# ==============================================================================================
+import os
+import gzip
+import lzma
+import shutil
+import tempfile
+import unittest
+from malmoext import *
+
+class TestLogSinks(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.workingDirectory = os.getcwd()
+        os.chdir(self.directory)
+
+        # A log in the format output by the Logger, made up of blocks of preconditions, an action and postconditions
+        self.records = [("none-None-NoneType", ()), ("agent-{}", ("Alpha",)), ("at-{}-None", ("Alpha",)), ("START", ()), ("", ())]
+        for i in range(0, 60):
+            mob = "Zombie{}".format(i)
+            self.records += [
+                ("mob-{}-{}", (mob, "Zombie")),
+                ("looking_at-{}-{}", ("Alpha", mob)),
+                ("!ATTACK-{}-{}", ("Alpha", mob)),
+                ("status-{}-{}", (mob, "dead" if i % 2 == 0 else "alive")),
+                ("", ())
+            ]
+            if i % 7 == 0:
+                self.records += [("item-{}-{}", ("ébène{}".format(i), "{braced}")), ("", ())]
+        self.records.append(("END", ()))
+        self.lines = [template.format(*args) for template, args in self.records]
+        self.text = "\n".join(self.lines)
+
+    def tearDown(self):
+        os.chdir(self.workingDirectory)
+        shutil.rmtree(self.directory)
+
+    def write(self, sink):
+        '''
+        Append the whole log to a sink, and return the path it was exported to.
+        '''
+        for template, args in self.records:
+            sink.append(template, *args)
+        return sink.export()
+
+    def read(self, filepath):
+        '''
+        Returns the contents of a text file.
+        '''
+        with open(filepath, "r") as f:
+            return f.read()
+
+    def actionBlocks(self):
+        '''
+        Returns the lines of the block around each action, from its preconditions to its postconditions.
+        '''
+        blocks = []
+        block = []
+        for line in self.lines:
+            if line == "":
+                if any(x.startswith("!") for x in block):
+                    blocks.append(block)
+                block = []
+            else:
+                block.append(line)
+        return blocks
+
+    def testLogSinkIsAbstract(self):
+        '''
+        Sinks must say how the log is exported.
+        '''
+        with self.assertRaises(TypeError):
+            LogSink()
+
+    def testMemorySink(self):
+        '''
+        A MemorySink holds every line, and writes them all when exported.
+        '''
+        sink = MemorySink()
+        filepath = self.write(sink)
+        self.assertEqual(sink.lines(), self.lines)
+        self.assertEqual(sink.lineCount, len(self.lines))
+        self.assertEqual(sink.lastTemplate, "END")
+        self.assertEqual(self.read(filepath), self.text)
+
+        sink.clear()
+        self.assertEqual(sink.lines(), [])
+        self.assertEqual(sink.lineCount, 0)
+
+    def testFileSink(self):
+        '''
+        A FileSink streams the log in several writes, producing the same file as a MemorySink.
+        '''
+        sink = FileSink(os.path.join("streamed", "mission.log"), maxBufferSize=256)
+        filepath = self.write(sink)
+        self.assertGreater(sink.flushes, 1)
+        self.assertEqual(self.read(filepath), self.text)
+
+    def testFileSinkClear(self):
+        '''
+        Clearing a FileSink truncates the file, so that only lines appended afterwards are written.
+        '''
+        sink = FileSink("mission.log", maxBufferSize=64)
+        sink.append("at-{}-None", "Alpha")
+        sink.flush()
+        sink.clear()
+        self.assertEqual(self.write(sink), "mission.log")
+        self.assertEqual(self.read("mission.log"), self.text)
+
+    def testThreadedSink(self):
+        '''
+        A ThreadedSink writes the same file as the sink it wraps, including when its writer's queue fills up, whatever
+        the writer's drop policy.
+        '''
+        self.assertEqual(self.read(self.write(ThreadedSink(FileSink("threaded.log")))), self.text)
+
+        for policy in BackgroundWriter.DropPolicy:
+            with self.subTest(policy=policy):
+                writer = BackgroundWriter(maxQueueSize=4, batchSize=2, dropPolicy=policy)
+                self.assertEqual(self.read(self.write(ThreadedSink(FileSink(policy.name + ".log"), writer))), self.text)
+                self.assertEqual(writer.stats().dropped, 0)
+                writer.close()
+
+    def testBinarySink(self):
+        '''
+        A BinarySink written in several blocks converts back to the same text as a MemorySink.
+        '''
+        sink = BinarySink("mission" + BinaryLog.Extension, blockSize=128)
+        filepath = self.write(sink)
+        self.assertGreater(sink.blocks, 1)
+        self.assertEqual(list(BinaryLog.lines(filepath)), self.lines)
+        self.assertEqual(list(BinaryLog.records(filepath)), self.records)
+        self.assertEqual(self.read(BinaryLog.toText(filepath)), self.text)
+        self.assertEqual(self.read(BinaryLog.toText(filepath, "converted.txt")), self.text)
+
+    def testBinaryLogCorruption(self):
+        '''
+        A truncated last block is ignored, while a corrupt block is an error.
+        '''
+        filepath = self.write(BinarySink("mission" + BinaryLog.Extension, blockSize=128))
+        with open(filepath, "rb") as f:
+            data = f.read()
+        blocks = list(BinaryLog.blocks(filepath))
+
+        with open("truncated.mlog", "wb") as f:
+            f.write(data[:-3])
+        self.assertEqual(list(BinaryLog.blocks("truncated.mlog")), blocks[:-1])
+
+        corrupt = bytearray(data)
+        corrupt[len(BinaryLog.Magic) + 4] ^= 0xFF
+        with open("corrupt.mlog", "wb") as f:
+            f.write(corrupt)
+        with self.assertRaises(Exception):
+            list(BinaryLog.lines("corrupt.mlog"))
+
+        with open("other.mlog", "wb") as f:
+            f.write(b"MXLOG\x02")
+        with self.assertRaises(Exception):
+            list(BinaryLog.blocks("other.mlog"))
+
+    def testVarints(self):
+        '''
+        Varints round-trip for values of every length.
+        '''
+        for value in [0, 1, 0x7F, 0x80, 0x3FFF, 0x4000, 1 << 35]:
+            buffer = bytearray(b"\x00")
+            BinaryLog.writeVarint(buffer, value)
+            self.assertEqual(BinaryLog.readVarint(buffer, 1), (value, len(buffer)))
+
+    def testCompressedSink(self):
+        '''
+        A CompressedSink written in several frames converts back to the same text as a MemorySink, and decompresses
+        as a whole with standard tools. Every action block can be read on its own.
+        '''
+        blocks = self.actionBlocks()
+        for compression in CompressedLog.Compressions:
+            for actionsPerFrame in [1, 3, 1000]:
+                with self.subTest(compression=compression, actionsPerFrame=actionsPerFrame):
+                    sink = CompressedSink("mission-{}-{}.log".format(compression, actionsPerFrame), compression, actionsPerFrame)
+                    filepath = self.write(sink)
+                    log = CompressedLog(filepath)
+                    self.assertEqual(len(log.frames), sink.frames)
+                    self.assertEqual(log.compression, compression)
+                    self.assertEqual(list(log.lines()), self.lines)
+                    self.assertEqual(self.read(log.toText(filepath + ".txt")), self.text)
+
+                    with open(filepath, "rb") as f:
+                        data = f.read()
+                    if compression == "gzip":
+                        self.assertEqual(gzip.decompress(data).decode("utf-8"), self.text)
+                    else:
+                        self.assertEqual(lzma.decompress(data).decode("utf-8"), self.text)
+
+                    for action, block in enumerate(blocks):
+                        self.assertEqual(log.action(action), block)
+                    self.assertEqual(log.action(len(blocks)), None)
+                    self.assertEqual(list(log.linesFromAction(5))[:len(blocks[5])], blocks[5])
+
+    def testCompressedSinkFrames(self):
+        '''
+        Frames start at the blank line beginning an action block, once the frame holds enough actions.
+        '''
+        sink = CompressedSink("mission.log.gz", actionsPerFrame=3, maxFrameSize=1 << 30)
+        log = CompressedLog(self.write(sink))
+        self.assertEqual(len(log.frames), 60 // 3 + 1)
+        for index in range(1, len(log.frames)):
+            self.assertEqual(log.frameLines(index)[0], "")
+            self.assertEqual(log.frames[index].firstAction, 3 * index)
+
+    def testCompressedSinkRejectsUnknownCompression(self):
+        '''
+        Only the supported compression formats can be used.
+        '''
+        with self.assertRaises(Exception):
+            CompressedSink("mission.log.bz2", compression="bz2")
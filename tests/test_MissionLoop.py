@@ -0,0 +1,82 @@
+# ==============================================================================================
+# Tests for the mission loop driver, run against a FakeAgentHost.
+# ==============================================================================================
+import unittest
+from malmoext import *
+
+class RecordingPlugin:
+    '''
+    A plugin recording the calls made to it by the mission loop.
+    '''
+    def __init__(self):
+        self.calls = []     # The names of the methods called, in order
+
+    def start(self):
+        self.calls.append("start")
+
+    def update(self):
+        self.calls.append("update")
+
+    def stop(self):
+        self.calls.append("stop")
+
+class TestMissionLoop(unittest.TestCase):
+
+    def setUp(self):
+        Agent.setHostFactory(lambda agentID: FakeAgentHost(ObservationGenerator(agentID)))
+        self.agent = Agent("Alpha", AgentType.Hardcoded)
+        self.cow = Entity("cow", "Cow", Vector(8.5, 4, 6.5), 0)
+
+    def tearDown(self):
+        Agent.setHostFactory(None)
+        Agent.allAgents.clear()
+
+    def turnCommands(self):
+        '''
+        Returns the turn commands received by the agent's host so far.
+        '''
+        return [command for command in self.agent.getMalmoAgent().commands if command.startswith("turn")]
+
+    def testCommandsSentAtEndOfTick(self):
+        '''
+        Commands given during a tick are sent once the tick ends, including on the last tick.
+        '''
+        sent = []
+        def behave():
+            sent.append(len(self.turnCommands()))
+            self.agent.lookAt(self.cow)
+        loop = MissionLoop(1000)
+        loop.addPlugin(behave)
+        loop.run(maxTicks=3)
+        self.assertEqual(sent, [0, 1, 2])
+        self.assertEqual(len(self.turnCommands()), 3)
+        self.assertEqual(loop.stats().ticks, 3)
+
+    def testCommandsSentWhenStopped(self):
+        '''
+        Commands given during the tick that stops the loop are sent, and every plugin is started and stopped.
+        '''
+        plugin = RecordingPlugin()
+        loop = MissionLoop(1000)
+        loop.addPlugin(plugin)
+        def behave():
+            self.agent.lookAt(self.cow)
+            loop.stop()
+        loop.addPlugin(behave)
+        loop.run()
+        self.assertEqual(len(self.turnCommands()), 1)
+        self.assertEqual(plugin.calls, ["start", "update", "stop"])
+
+    def testPluginsStoppedOnCrash(self):
+        '''
+        Plugins are stopped even if a tick raises an exception.
+        '''
+        plugin = RecordingPlugin()
+        loop = MissionLoop(1000)
+        loop.addPlugin(plugin)
+        def crash():
+            raise RuntimeError("crashed")
+        loop.addPlugin(crash)
+        with self.assertRaises(RuntimeError):
+            loop.run()
+        self.assertEqual(plugin.calls, ["start", "update", "stop"])
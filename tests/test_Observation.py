@@ -0,0 +1,114 @@
+# ==============================================================================================
+# Tests for the lazily decoded Malmo observations, checking that skipping over containers always
+# finds the same values as decoding the whole payload.
+# ==============================================================================================
+import json
+import random
+import unittest
+from malmoext import *
+
+class TestObservation(unittest.TestCase):
+
+    def assertDecodesLike(self, text):
+        '''
+        Assert that an observation of the given JSON text holds the same fields and values as the decoded text.
+        '''
+        expected = json.loads(text)
+        observation = Observation(text)
+        self.assertEqual(list(observation), list(expected))
+        for key in expected:
+            self.assertEqual(observation[key], expected[key], "Field {} of {}".format(key, text))
+
+    def testScalarsAreDecodedUpFront(self):
+        '''
+        Scalar fields are decoded when the observation is created, while containers are left until accessed.
+        '''
+        inventory = '[{"type": "dirt", "quantity": 3}]'
+        text = '{"Life": 20.0, "Name": "Alpha", "IsAlive": true, "inventory": ' + inventory + '}'
+        observation = Observation(text)
+        self.assertEqual(observation["Life"], 20.0)
+        self.assertEqual(observation["Name"], "Alpha")
+        decoded = observation.bytesDecoded
+        self.assertEqual(observation["inventory"], [{"type": "dirt", "quantity": 3}])
+        self.assertEqual(observation.bytesDecoded, decoded + len(inventory))
+        self.assertEqual(observation["inventory"], [{"type": "dirt", "quantity": 3}])
+        self.assertEqual(observation.bytesDecoded, decoded + len(inventory))
+
+    def testEmptyObservation(self):
+        '''
+        An empty object has no fields.
+        '''
+        observation = Observation(" { } ")
+        self.assertEqual(len(observation), 0)
+        self.assertNotIn("Life", observation)
+
+    def testMissingField(self):
+        '''
+        Accessing a field that was not observed raises a KeyError.
+        '''
+        observation = Observation('{"Life": 20.0}')
+        with self.assertRaises(KeyError):
+            observation["XPos"]
+        self.assertEqual(observation.get("XPos"), None)
+
+    def testMalformedObservation(self):
+        '''
+        Payloads that are not a JSON object are rejected.
+        '''
+        for text in ['[1, 2]', '{"Life" 20.0}', '{"Life": 20.0 "XP": 0}']:
+            with self.assertRaises(ValueError):
+                Observation(text)
+
+    def testStringsHoldingBrackets(self):
+        '''
+        Brackets within strings do not end a container early.
+        '''
+        self.assertDecodesLike('{"a": ["]", "[", "}"], "b": 1}')
+        self.assertDecodesLike('{"a": {"name": "x]y", "other": "{"}, "b": [1]}')
+        self.assertDecodesLike('{"a": ["[[[", "]]]"], "b": {"c": "}}}"}}')
+        self.assertDecodesLike('{"a": [{"k": "]"}, {"k": "]"}], "b": "]"}')
+
+    def testEscapedCharacters(self):
+        '''
+        Escaped quotes and backslashes within strings are skipped over correctly.
+        '''
+        self.assertDecodesLike(r'{"a": ["\"]", "\\"], "b": 2}')
+        self.assertDecodesLike(r'{"a": {"k": "\\\"}"}, "b": [3]}')
+        self.assertDecodesLike(r'{"a\"b": [1], "c": "]"}')
+
+    def testNonAsciiStrings(self):
+        '''
+        Strings with characters outside of ASCII are skipped over correctly.
+        '''
+        self.assertDecodesLike('{"a": ["café", "]é["], "b": {"é": "☃"}}')
+
+    def testNestedContainers(self):
+        '''
+        Deeply nested containers are skipped over as a whole, even when they hold many closing brackets.
+        '''
+        nested = "[" * 40 + "]" * 40
+        self.assertDecodesLike('{{"a": {}, "b": {{"c": {}}}}}'.format(nested, nested))
+        self.assertDecodesLike('{"a": [' + ", ".join(["[1]"] * 100) + '], "b": 1}')
+
+    def testRandomPayloads(self):
+        '''
+        Randomly generated payloads, full of strings holding brackets and escapes, decode like the JSON module.
+        '''
+        rng = random.Random(0)
+        alphabet = 'ab[]{},:"\\ é'
+
+        def value(depth):
+            kind = rng.randrange(6 if depth < 4 else 3)
+            if kind == 0:
+                return rng.randint(-100, 100)
+            if kind == 1:
+                return "".join(rng.choice(alphabet) for i in range(0, rng.randrange(6)))
+            if kind == 2:
+                return rng.choice([True, False, None, 1.5])
+            if kind < 5:
+                return [value(depth + 1) for i in range(0, rng.randrange(4))]
+            return {"k{}".format(i): value(depth + 1) for i in range(0, rng.randrange(4))}
+
+        for i in range(0, 2000):
+            payload = {"k{}".format(j): value(0) for j in range(0, rng.randrange(1, 5))}
+            self.assertDecodesLike(json.dumps(payload, ensure_ascii=rng.random() < 0.5))
@@ -0,0 +1,186 @@
+# ==============================================================================================
+# Tests for planning walkable paths around obstacles over a VoxelMap.
+# ==============================================================================================
+import unittest
+import numpy
+from malmoext import *
+
+class TestPathPlanner(unittest.TestCase):
+    Size = 10       # The number of blocks observed on each side of the origin, in x and z
+    Height = 8      # The number of layers observed, with the ground at y = 3
+
+    def setUp(self):
+        self.map = VoxelMap()
+        self.planner = PathPlanner(self.map)
+        self.blocks = {}
+
+    def build(self, blocks):
+        '''
+        Merge a flat world into the map, along with the given map of (x,y,z) cells to block names.
+        '''
+        self.blocks.update(blocks)
+        width = 2 * TestPathPlanner.Size + 1
+        grid = numpy.full((TestPathPlanner.Height, width, width), BlockGrid.BlockIds["air"], dtype=numpy.uint16)
+        grid[:3] = BlockGrid.BlockIds["dirt"]
+        grid[3] = BlockGrid.BlockIds["grass"]
+        for (x, y, z), name in self.blocks.items():
+            grid[y, z + TestPathPlanner.Size, x + TestPathPlanner.Size] = BlockGrid.BlockIds[name]
+        self.map.merge(grid, (-TestPathPlanner.Size, 0, -TestPathPlanner.Size))
+
+    def wall(self, name, xs, ys, z):
+        '''
+        Returns a map of cells to block names for a wall of the given block along the x-axis.
+        '''
+        return {(x, y, z): name for x in xs for y in ys}
+
+    def assertWalkablePath(self, path, start, goal):
+        '''
+        Assert that a path leads from the start cell to the goal cell, one step at a time, through walkable cells.
+        '''
+        self.assertNotEqual(path, None)
+        self.assertEqual(path[0], start)
+        self.assertEqual(path[-1][0], goal[0])
+        self.assertEqual(path[-1][2], goal[2])
+        isPassable = lambda cell: BlockGrid.IsPassable[self.map.block(cell)]
+        for i, (x, y, z) in enumerate(path):
+            self.assertTrue(isPassable((x, y, z)) and isPassable((x, y + 1, z)), "Cell {} is blocked".format((x, y, z)))
+            self.assertTrue(BlockGrid.IsStandable[self.map.block((x, y - 1, z))], "Cell {} can not be stood in".format((x, y, z)))
+            if i > 0:
+                px, py, pz = path[i - 1]
+                self.assertEqual(abs(x - px) + abs(z - pz), 1)
+                self.assertLessEqual(abs(y - py), 1)
+
+    def testOpenGround(self):
+        '''
+        Over open ground, the path is a straight line, and the goal can be walked to directly.
+        '''
+        self.build({})
+        path = self.planner.plan((0, 4, -3), (0, 4, 3))
+        self.assertEqual(path, [(0, 4, z) for z in range(-3, 4)])
+        self.assertTrue(self.planner.isDirect((0, 4, -3), (4, 4, 3)))
+        self.assertEqual(self.planner.pathDistance((0, 4, -3), (0, 4, 3)), 6)
+
+    def testWalksAroundWall(self):
+        '''
+        Paths lead around a wall two blocks high, which can not be walked through directly.
+        '''
+        self.build(self.wall("stone", range(-5, 6), [4, 5], 0))
+        start, goal = (0, 4, -3), (0, 4, 3)
+        self.assertFalse(self.planner.isDirect(start, goal))
+        path = self.planner.plan(start, goal)
+        self.assertWalkablePath(path, start, goal)
+        self.assertEqual(len(path) - 1, 6 + 2 * 6)
+        self.assertEqual(self.planner.pathDistance(start, goal), 6 + 2 * 6)
+
+    def testFencesCanNotBeJumpedOnto(self):
+        '''
+        Fences and walls are taller than a block, so paths lead around them rather than over them.
+        '''
+        for name in ["fence", "cobblestone_wall", "fence_gate"]:
+            with self.subTest(block=name):
+                self.setUp()
+                self.build(self.wall(name, range(-5, 6), [4], 0))
+                start, goal = (0, 4, -3), (0, 4, 3)
+                self.assertFalse(self.planner.isDirect(start, goal))
+                path = self.planner.plan(start, goal)
+                self.assertWalkablePath(path, start, goal)
+                self.assertTrue(all(y == 4 for _, y, _ in path), "Path over a {}: {}".format(name, path))
+
+    def testStepsUpAndDown(self):
+        '''
+        Paths climb onto blocks one block high. Stepping up is never direct, while stepping down is.
+        '''
+        self.build({(x, 4, z): "stone" for x in range(-10, 11) for z in range(1, 11)})
+        start, goal = (0, 4, -3), (0, 5, 3)
+        path = self.planner.plan(start, goal)
+        self.assertWalkablePath(path, start, goal)
+        self.assertEqual(path[-1], goal)
+        self.assertFalse(self.planner.isDirect(start, goal))
+        self.assertTrue(self.planner.isDirect(goal, start))
+
+    def testEnclosedGoal(self):
+        '''
+        No path is found to a goal enclosed by walls.
+        '''
+        blocks = {}
+        for x in range(-2, 3):
+            for z in range(1, 6):
+                if x in (-2, 2) or z in (1, 5):
+                    blocks[(x, 4, z)] = "stone"
+                    blocks[(x, 5, z)] = "stone"
+        self.build(blocks)
+        self.assertEqual(self.planner.plan((0, 4, -3), (0, 4, 3)), None)
+        self.assertEqual(self.planner.pathDistance((0, 4, -3), (0, 4, 3)), None)
+        self.assertEqual(self.planner.nextWaypoint((0, 4, -3), (0, 4, 3)), None)
+
+    def testCachedPaths(self):
+        '''
+        Paths are reused for the same goal, including from any cell along a path already planned.
+        '''
+        self.build(self.wall("stone", range(-5, 6), [4, 5], 0))
+        start, goal = (0, 4, -3), (0, 4, 3)
+        path = self.planner.plan(start, goal)
+        self.assertEqual(self.planner.plan(start, goal), path)
+        self.assertEqual(self.planner.plan(path[3], goal), path[3:])
+        self.assertEqual(self.planner.searches, 1)
+        self.assertEqual(self.planner.cacheHits, 2)
+
+    def testRepairsBlockedPaths(self):
+        '''
+        Once a cached path is blocked, the rest of it is replanned around the new obstacle.
+        '''
+        self.build(self.wall("stone", range(-5, 6), [4, 5], 0))
+        start, goal = (0, 4, -3), (0, 4, 3)
+        path = self.planner.plan(start, goal)
+        blocked = path[len(path) // 2]
+        self.build({blocked: "stone", (blocked[0], blocked[1] + 1, blocked[2]): "stone"})
+        repaired = self.planner.plan(start, goal)
+        self.assertWalkablePath(repaired, start, goal)
+        self.assertNotIn(blocked, repaired)
+        self.assertEqual(self.planner.repairs, 1)
+
+        # Changes away from the path leave it in place
+        self.build({(9, 4, 9): "stone"})
+        self.assertEqual(self.planner.plan(start, goal), repaired)
+        self.assertEqual(self.planner.repairs, 1)
+
+    def testNextWaypoint(self):
+        '''
+        Waypoints skip ahead along the path as far as the agent can walk in a straight line.
+        '''
+        self.build(self.wall("stone", range(-5, 6), [4, 5], 0))
+        start, goal = (0, 4, -3), (0, 4, 3)
+        waypoint = self.planner.nextWaypoint(start, goal)
+        cell = PathPlanner.cellOf(waypoint)
+        self.assertTrue(self.planner.isDirect(start, cell))
+        self.assertGreater(abs(cell[0] - start[0]) + abs(cell[2] - start[2]), 1)
+        self.assertIs(self.planner.distanceField(goal), self.planner.distanceField(goal))
+        self.assertEqual(self.planner.fieldsComputed, 1)
+
+    def testFieldsKeptWhenDistantChunksChange(self):
+        '''
+        Distance fields are only checked again once a chunk they cover changes, and only recomputed if the walkable
+        cells they cover changed.
+        '''
+        self.build(self.wall("stone", range(-5, 6), [4, 5], 0))
+        goal = (0, 4, 3)
+        field = self.planner.distanceField(goal)
+        self.map.merge(numpy.full((1, 1, 1), BlockGrid.BlockIds["stone"], dtype=numpy.uint16), (200, 4, 200))
+        self.assertIs(self.planner.distanceField(goal), field)
+        self.assertEqual(field.version, self.map.chunkVersions(field.region.origin, field.region.walkable.shape))
+
+        self.build({(9, 7, 9): "stone"})
+        self.assertIs(self.planner.distanceField(goal), field)
+        self.build({(2, 4, 6): "stone", (2, 5, 6): "stone"})
+        self.assertIsNot(self.planner.distanceField(goal), field)
+        self.assertEqual(self.planner.fieldsComputed, 2)
+
+    def testRankByPathDistance(self):
+        '''
+        Goals are ranked by the number of steps needed to walk to them, leaving out those that can not be reached.
+        '''
+        blocks = self.wall("stone", range(-5, 6), [4, 5], 0)
+        blocks.update({(x, y, z): "stone" for x in (-1, 0, 1) for y in (4, 5) for z in (-5, -4, -3) if (x, z) != (0, -4)})
+        self.build(blocks)
+        goals = [(0, 4, 3), (3, 4, -3), (0, 4, -4)]
+        self.assertEqual(self.planner.rankByPathDistance((3, 4, -2), goals), [(1, 1), (0, 3 + 5 + 6)])